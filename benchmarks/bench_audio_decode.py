@@ -0,0 +1,84 @@
+"""
+Бенчмарк декодирования голосовых сообщений: записи 10 сек, 60 сек и 10 мин.
+
+Сравнивает прежний способ (AudioSegment.from_ogg, экспорт во временный WAV,
+чтение через sr.AudioFile и понижение частоты до 16 кГц, которое движок
+распознавания делал перед отправкой) с декодированием ffmpeg сразу в PCM
+16 кГц в памяти из speech_recognition.decode_audio.
+
+Нужен ffmpeg в PATH. Запуск из корня репозитория:
+    python -m benchmarks.bench_audio_decode
+"""
+
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import speech_recognition as sr
+from pydub import AudioSegment
+
+from src.utils.speech_recognition import ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH, decode_audio
+
+DURATIONS = (10, 60, 600)
+ROUNDS = 3
+
+
+def make_voice(path: Path, seconds: int) -> None:
+    """Создает запись как у голосового сообщения Telegram: ogg/opus 48 кГц моно"""
+    subprocess.run(
+        [AudioSegment.converter, "-nostdin", "-v", "error", "-y",
+         "-f", "lavfi", "-i", f"anoisesrc=duration={seconds}:amplitude=0.3:seed=1",
+         "-ac", "1", "-ar", "48000", "-c:a", "libopus", "-b:a", "32k", str(path)],
+        check=True
+    )
+
+
+def legacy_decode(audio_path: Path) -> sr.AudioData:
+    """Прежняя реализация: полноценный WAV во временном файле"""
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_wav:
+        wav_path = temp_wav.name
+    try:
+        sound = AudioSegment.from_ogg(audio_path)
+        sound.export(wav_path, format="wav")
+        with sr.AudioFile(wav_path) as source:
+            audio_data = sr.Recognizer().record(source)
+        pcm = audio_data.get_raw_data(convert_rate=ASR_SAMPLE_RATE, convert_width=ASR_SAMPLE_WIDTH)
+        return sr.AudioData(pcm, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH)
+    finally:
+        os.unlink(wav_path)
+
+
+def measure(func, audio_path: Path):
+    """Возвращает лучшее время в мс, пик памяти Python в МБ и размер PCM в МБ"""
+    best = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func(audio_path)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    audio_data = func(audio_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20, len(audio_data.frame_data) / 2**20
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Декодирование ogg/opus 48 кГц моно, лучшее из {ROUNDS} запусков")
+        for seconds in DURATIONS:
+            audio_path = Path(tmp) / f"voice_{seconds}.ogg"
+            make_voice(audio_path, seconds)
+            legacy, legacy_peak, legacy_size = measure(legacy_decode, audio_path)
+            current, current_peak, current_size = measure(decode_audio, audio_path)
+            print(f"  {seconds:4} сек: WAV-файл {legacy:8.0f} мс (пик {legacy_peak:6.1f} МБ, PCM {legacy_size:5.1f} МБ), "
+                  f"в памяти {current:7.0f} мс (пик {current_peak:5.1f} МБ, PCM {current_size:5.1f} МБ), "
+                  f"ускорение x{legacy / current:.1f}")
+
+
+if __name__ == "__main__":
+    main()
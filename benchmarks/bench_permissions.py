@@ -0,0 +1,106 @@
+"""
+Бенчмарк проверок доступа: 10 000 пользователей и 2 000 папок.
+
+Сравнивает прежний способ (чтение и разбор JSON-файла на каждый вызов)
+с индексом прав из admin_utils поверх JSON- и SQLite-хранилища.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_permissions
+"""
+
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.utils import acl_storage, admin_utils
+from src.utils.acl_storage import JsonAclStorage, SqliteAclStorage
+
+USERS = 10_000
+FOLDERS = 2_000
+# Доля папок, доступных всем, и число пользователей в закрытой папке
+OPEN_SHARE = 0.2
+USERS_PER_FOLDER = 50
+CALLS = 2_000
+
+
+def make_data(rng: random.Random):
+    users = [
+        {'id': user_id, 'username': f"user{user_id}", 'first_name': "Имя", 'last_name': "Фамилия",
+         'added_at': "2025-01-01 00:00:00"}
+        for user_id in range(1, USERS + 1)
+    ]
+    folders = []
+    for number in range(FOLDERS):
+        allowed = [] if rng.random() < OPEN_SHARE else rng.sample(range(1, USERS + 1), USERS_PER_FOLDER)
+        folders.append({'path': f"/Выставка/Клиенты/Клиент {number}", 'allowed_users': allowed})
+    return users, folders
+
+
+def legacy_calls(folders_file: Path, users_file: Path, user_id: int, folder_path: str):
+    """Прежняя реализация: каждый вызов читает файлы заново и перебирает списки"""
+    with open(folders_file) as f:
+        folders = json.load(f)
+    [folder['path'] for folder in folders if not folder['allowed_users'] or user_id in folder['allowed_users']]
+    with open(folders_file) as f:
+        folders = json.load(f)
+    next((not folder['allowed_users'] or user_id in folder['allowed_users']
+          for folder in folders if folder['path'] == folder_path), False)
+    with open(users_file) as f:
+        users = json.load(f)
+    any(user['id'] == user_id for user in users)
+
+
+def indexed_calls(user_id: int, folder_path: str):
+    admin_utils.get_allowed_folders_for_user(user_id)
+    admin_utils.is_folder_allowed_for_user(folder_path, user_id)
+    admin_utils.is_user_allowed(user_id)
+
+
+def measure(func, args_list) -> float:
+    """Возвращает среднее время вызова в микросекундах"""
+    started = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def main() -> None:
+    rng = random.Random(1)
+    users, folders = make_data(rng)
+    calls = [(rng.randint(1, USERS), rng.choice(folders)['path']) for _ in range(CALLS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_storage = JsonAclStorage(tmp / "allowed_folders.json", tmp / "allowed_users.json")
+        json_storage.replace_folders(folders)
+        json_storage.replace_users(users)
+        sqlite_storage = SqliteAclStorage(tmp / "acl.sqlite3")
+        sqlite_storage.replace_folders(folders)
+        sqlite_storage.replace_users(users)
+
+        print(f"{USERS} пользователей, {FOLDERS} папок, {CALLS} наборов проверок (папки пользователя, папка, пользователь)")
+        legacy = measure(lambda u, p: legacy_calls(tmp / "allowed_folders.json", tmp / "allowed_users.json", u, p),
+                         calls[:50])
+        print(f"  JSON на каждый вызов:      {legacy:10.1f} мкс/набор")
+
+        for name, storage in (("json", json_storage), ("sqlite", sqlite_storage)):
+            acl_storage._acl_storage = storage
+            admin_utils._reset_indexes()
+            started = time.perf_counter()
+            indexed_calls(*calls[0])
+            build = (time.perf_counter() - started) * 1000
+            indexed = measure(indexed_calls, calls)
+
+            # Изменение прав сбрасывает индекс; следующая проверка строит его заново
+            started = time.perf_counter()
+            admin_utils.add_user_to_folder(folders[-1]['path'], 1)
+            indexed_calls(1, folders[-1]['path'])
+            rebuild = (time.perf_counter() - started) * 1000
+            print(f"  индекс ({name:6}):          {indexed:10.1f} мкс/набор, построение {build:.0f} мс, "
+                  f"запись + перестроение {rebuild:.0f} мс, ускорение x{legacy / indexed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Бенчмарк маршрутизации текстовых сообщений: 10 000 пользователей с активными встречами.
+
+Сравнивает прежний способ (три последовательные проверки флагов
+awaiting_* и затем поиск сессии) с одним обращением к менеджеру
+состояний за сессией и AWAITING_TEXT и выбором обработчика из
+TEXT_ROUTES. Измеряется только выбор обработчика, без его выполнения.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_text_routing
+"""
+
+import random
+import time
+
+from src.handlers.file_handler import TEXT_ROUTES, append_text
+from src.handlers.media_handlers import (
+    process_caption, process_transcription, process_transcription_edit,
+    AWAITING_TEXT, AWAITING_CAPTION, AWAITING_TRANSCRIPTION, AWAITING_TRANSCRIPTION_EDIT
+)
+from src.utils.state_manager import SessionState, StateManager
+
+USERS = 10_000
+CALLS = 200_000
+# Доля сообщений, на которые бот ждет подпись или расшифровку
+AWAITING_SHARE = 0.1
+
+_LEGACY_FLAGS = {
+    AWAITING_TRANSCRIPTION: "awaiting_transcription",
+    AWAITING_TRANSCRIPTION_EDIT: "awaiting_transcription_edit",
+    AWAITING_CAPTION: "awaiting_caption",
+}
+
+
+def legacy_route(manager: StateManager, user_id: int):
+    """Прежняя реализация: флаги проверяются по очереди, затем ищется сессия"""
+    if manager.get_data(user_id, "awaiting_transcription"):
+        return process_transcription
+    if manager.get_data(user_id, "awaiting_transcription_edit"):
+        return process_transcription_edit
+    if manager.get_data(user_id, "awaiting_caption"):
+        return process_caption
+    manager.get_session(user_id)
+    return append_text
+
+
+def table_route(manager: StateManager, user_id: int):
+    _, awaiting = manager.get_session_with_data(user_id, AWAITING_TEXT)
+    return TEXT_ROUTES.get(awaiting, append_text)
+
+
+def make_managers(rng: random.Random):
+    """Создает менеджеры состояний с одинаковыми встречами в прежнем и новом формате"""
+    legacy, table = StateManager(), StateManager()
+    awaiting = list(_LEGACY_FLAGS)
+    for user_id in range(1, USERS + 1):
+        for manager in (legacy, table):
+            manager.set_session(user_id, SessionState("/Выставка", f"/Выставка/{user_id}", str(user_id), user_id))
+        if rng.random() < AWAITING_SHARE:
+            value = rng.choice(awaiting)
+            legacy.set_data(user_id, _LEGACY_FLAGS[value], True)
+            table.set_data(user_id, AWAITING_TEXT, value)
+    return legacy, table
+
+
+def measure(route, manager: StateManager, user_ids) -> float:
+    """Возвращает среднее время выбора обработчика в микросекундах"""
+    started = time.perf_counter()
+    for user_id in user_ids:
+        route(manager, user_id)
+    return (time.perf_counter() - started) / len(user_ids) * 1e6
+
+
+def main() -> None:
+    rng = random.Random(1)
+    legacy, table = make_managers(rng)
+    user_ids = [rng.randint(1, USERS) for _ in range(CALLS)]
+    # Оба способа выбирают один и тот же обработчик
+    assert all(legacy_route(legacy, user_id) is table_route(table, user_id) for user_id in user_ids[:1000])
+
+    legacy_time = measure(legacy_route, legacy, user_ids)
+    table_time = measure(table_route, table, user_ids)
+    print(f"{USERS} пользователей, {CALLS} сообщений, {AWAITING_SHARE:.0%} ждут подпись или расшифровку")
+    print(f"  три флага подряд:  {legacy_time:6.2f} мкс/сообщение")
+    print(f"  TEXT_ROUTES:       {table_time:6.2f} мкс/сообщение, ускорение x{legacy_time / table_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
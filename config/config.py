@@ -20,6 +20,99 @@ DATA_DIR = Path('data')
 UPLOAD_DIR = DATA_DIR / 'uploads'  # Директория для временного хранения загружаемых файлов
 FOLDERS_FILE = DATA_DIR / 'allowed_folders.json'
 USERS_FILE = DATA_DIR / 'allowed_users.json'
+MEETING_LOGS_DIR = DATA_DIR / 'meeting_logs'  # Локальные копии текстовых файлов встреч
+OUTBOX_DIR = UPLOAD_DIR / 'outbox'  # Файлы, ожидающие отправки на Яндекс.Диск
+OUTBOX_DB_FILE = UPLOAD_DIR / 'outbox.sqlite3'  # Очередь отложенных операций с Яндекс.Диском
+ACL_DB_FILE = DATA_DIR / 'acl.sqlite3'  # Пользователи, папки и права доступа (при ACL_STORAGE=sqlite)
+TRANSCRIPTION_CACHE_FILE = DATA_DIR / 'transcriptions.sqlite3'  # Кэш расшифровок голосовых сообщений
+MEDIA_SEQUENCE_FILE = DATA_DIR / 'media_sequences.sqlite3'  # Порядковые номера медиафайлов встреч
+CONTENT_INDEX_FILE = DATA_DIR / 'content_index.sqlite3'  # Индекс загруженных файлов по содержимому
+STATE_DIR = DATA_DIR / 'state'  # Снимок и журнал сессий пользователей
+
+# Сколько номеров медиафайлов резервировать за одну запись в базу
+MEDIA_SEQUENCE_BLOCK = int(os.getenv('MEDIA_SEQUENCE_BLOCK', '16'))
+
+# Хранилище списков доступа: 'sqlite' (данные из JSON-файлов импортируются при первом запуске) или 'json'
+ACL_STORAGE = os.getenv('ACL_STORAGE', 'sqlite').lower()
+
+# Интервал проверки соединения (сек) и максимальная пауза между повторами операций из очереди
+OUTBOX_PROBE_INTERVAL = float(os.getenv('OUTBOX_PROBE_INTERVAL', '30'))
+OUTBOX_MAX_BACKOFF = float(os.getenv('OUTBOX_MAX_BACKOFF', '600'))
+# Количество попыток операции из очереди, после которого она откладывается как неудачная
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+
+# Задержка (в секундах) перед синхронизацией файла встречи с Яндекс.Диском
+MEETING_LOG_SYNC_DELAY = float(os.getenv('MEETING_LOG_SYNC_DELAY', '10'))
+
+# Настройки работы с Яндекс.Диском из асинхронных обработчиков
+YADISK_MAX_WORKERS = int(os.getenv('YADISK_MAX_WORKERS', '8'))  # Потоков для вызовов API Яндекс.Диска
+YADISK_UPLOAD_WORKERS = int(os.getenv('YADISK_UPLOAD_WORKERS', '4'))  # Потоков для загрузки файлов
+YADISK_CALL_TIMEOUT = float(os.getenv('YADISK_CALL_TIMEOUT', '60'))  # Таймаут обычного вызова API (сек)
+YADISK_UPLOAD_TIMEOUT = float(os.getenv('YADISK_UPLOAD_TIMEOUT', '1800'))  # Таймаут загрузки файла (сек)
+YADISK_POOL_SIZE = int(os.getenv('YADISK_POOL_SIZE', '4'))  # Keep-alive соединений на хост в каждом потоке
+
+# Загрузка файлов из Telegram по ссылке: Яндекс.Диск скачивает файл сам, без передачи через бота.
+# Выключено по умолчанию: ссылка на файл Telegram содержит токен бота, который при этом передается Яндексу.
+YADISK_URL_UPLOAD = os.getenv('YADISK_URL_UPLOAD', '0').lower() in ('1', 'true', 'yes')
+YADISK_URL_UPLOAD_MIN_SIZE = int(os.getenv('YADISK_URL_UPLOAD_MIN_SIZE', str(1024 * 1024)))  # Минимальный размер файла (байт)
+YADISK_URL_UPLOAD_TIMEOUT = float(os.getenv('YADISK_URL_UPLOAD_TIMEOUT', '600'))  # Ожидание завершения операции (сек)
+YADISK_URL_UPLOAD_POLL = float(os.getenv('YADISK_URL_UPLOAD_POLL', '1.0'))  # Максимальный интервал опроса статуса (сек)
+
+# Сохранение сессий и состояний пользователей между перезапусками
+STATE_PERSIST = os.getenv('STATE_PERSIST', '1').lower() in ('1', 'true', 'yes')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', '1.0'))  # Максимальная задержка записи изменений (сек)
+STATE_COMPACT_RECORDS = int(os.getenv('STATE_COMPACT_RECORDS', '10000'))  # Записей журнала до перезаписи снимка
+
+# Ограничение памяти: простаивающие временные данные и сессии удаляются, число пользователей в памяти ограничено
+STATE_DATA_TTL = float(os.getenv('STATE_DATA_TTL', str(6 * 3600)))  # Время жизни временных данных без обращений (сек)
+STATE_SESSION_TTL = float(os.getenv('STATE_SESSION_TTL', str(24 * 3600)))  # Время жизни сессии без активности (сек)
+STATE_MAX_USERS = int(os.getenv('STATE_MAX_USERS', '10000'))  # Максимум пользователей с сессиями или данными
+SESSION_HISTORY_LIMIT = int(os.getenv('SESSION_HISTORY_LIMIT', '20'))  # Последних сообщений в сводке встречи
+
+# Напоминание о завершении встречи после простоя
+SESSION_IDLE_TIMEOUT = int(os.getenv('SESSION_IDLE_TIMEOUT', '600'))  # Время без активности до напоминания (сек)
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '30'))  # Интервал проверки неактивных встреч (сек)
+
+# Параллельная обработка обновлений: разные пользователи параллельно, сообщения одного пользователя по порядку
+UPDATE_WORKERS = int(os.getenv('UPDATE_WORKERS', '16'))  # Одновременно обрабатываемых обновлений
+UPDATE_QUEUE_SIZE = int(os.getenv('UPDATE_QUEUE_SIZE', '1024'))  # Обновлений, ожидающих своей очереди
+
+# Настройки фонового планировщика загрузок
+UPLOAD_SCHEDULER_WORKERS = int(os.getenv('UPLOAD_SCHEDULER_WORKERS', '3'))  # Одновременных загрузок
+UPLOAD_BANDWIDTH_LIMIT = int(os.getenv('UPLOAD_BANDWIDTH_LIMIT', '0'))  # Общий лимит полосы (байт/сек, 0 - без лимита)
+UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', '3'))  # Попыток загрузки до передачи в очередь офлайн
+
+# Повторно присланные файлы копируются на стороне Яндекс.Диска из первой загруженной копии
+CONTENT_DEDUP = os.getenv('CONTENT_DEDUP', '1').lower() in ('1', 'true', 'yes')
+CONTENT_INDEX_MAX_ENTRIES = int(os.getenv('CONTENT_INDEX_MAX_ENTRIES', '20000'))  # Файлов в индексе содержимого
+
+# Время ожидания следующего файла альбома (сек): файлы альбома приходят отдельными сообщениями
+MEDIA_GROUP_WINDOW = float(os.getenv('MEDIA_GROUP_WINDOW', '1.0'))
+
+# Кэш списков папок: время свежести, время допустимой устарелости (сек) и размер
+FOLDER_CACHE_TTL = float(os.getenv('FOLDER_CACHE_TTL', '60'))
+FOLDER_CACHE_STALE_TTL = float(os.getenv('FOLDER_CACHE_STALE_TTL', '600'))
+FOLDER_CACHE_MAX_ENTRIES = int(os.getenv('FOLDER_CACHE_MAX_ENTRIES', '512'))
+
+# Настройки потоковой передачи файлов из Telegram на Яндекс.Диск
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', str(1024 * 1024)))  # Размер блока (байт)
+STREAM_BUFFER_CHUNKS = int(os.getenv('STREAM_BUFFER_CHUNKS', '8'))  # Блоков в памяти между скачиванием и загрузкой
+
+# Распознавание речи: движок 'google' (через интернет) или 'vosk' (локально, требуется пакет vosk и модель)
+ASR_BACKEND = os.getenv('ASR_BACKEND', 'google').lower()
+ASR_LANGUAGE = os.getenv('ASR_LANGUAGE', 'ru-RU')  # Язык для Google Speech Recognition
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', str(DATA_DIR / 'models' / 'vosk-model-small-ru'))  # Каталог модели Vosk
+
+# Длинные записи делятся по паузам на фрагменты, которые распознаются параллельно
+ASR_SEGMENT_SECONDS = float(os.getenv('ASR_SEGMENT_SECONDS', '50'))  # Максимальная длина фрагмента (сек)
+ASR_SILENCE_MIN_MS = int(os.getenv('ASR_SILENCE_MIN_MS', '500'))  # Минимальная длина паузы (мс)
+ASR_SILENCE_THRESH_DB = float(os.getenv('ASR_SILENCE_THRESH_DB', '16'))  # Насколько тише средней громкости пауза (дБ)
+
+# Пул процессов распознавания речи
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', str(min(4, os.cpu_count() or 1))))  # Процессов распознавания
+TRANSCRIPTION_QUEUE_SIZE = int(os.getenv('TRANSCRIPTION_QUEUE_SIZE', '32'))  # Задач, ожидающих свободного процесса
+TRANSCRIPTION_TIMEOUT = float(os.getenv('TRANSCRIPTION_TIMEOUT', '300'))  # Таймаут распознавания одного файла (сек)
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPTION_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))  # Размер кэша расшифровок (байт)
 
 # Настройки логирования
 LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper())
@@ -54,6 +147,8 @@ def validate_config():
     # Создаем директории, если они еще не существуют
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    MEETING_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    OUTBOX_DIR.mkdir(parents=True, exist_ok=True)
     
     # Создаем файлы с разрешенными папками и пользователями, если они еще не существуют
     if not FOLDERS_FILE.exists():
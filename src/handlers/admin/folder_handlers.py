@@ -10,7 +10,7 @@ from src.utils.admin_utils import (
     add_allowed_folder, remove_allowed_folder, list_allowed_folders
 )
 from src.utils.folder_navigation import FolderNavigator
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.async_yadisk import get_async_yadisk
 from src.utils.config_constants import (
     BUTTON_BACK, BUTTON_CANCEL, BUTTON_ADD_FOLDER, BUTTON_CREATE_FOLDER, BUTTON_RETURN_TO_ROOT,
     FOLDER_PERMISSIONS_PROMPT, FOLDER_ADDED_SUCCESS, FOLDER_ADDED_EXISTS
@@ -23,11 +23,10 @@ from src.handlers.admin.states import (
 )
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 # Создаем экземпляр навигатора по папкам
 folder_navigator = FolderNavigator(
-    yadisk_helper=yadisk_helper,
+    yadisk_helper=get_async_yadisk(),
     title="Выберите папку для добавления в список разрешенных:",
     add_current_folder_button=True,
     create_folder_button=True,
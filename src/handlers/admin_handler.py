@@ -9,7 +9,8 @@ from src.utils.admin_utils import (
     load_allowed_users, load_allowed_folders
 )
 from src.utils.state_manager import state_manager
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.api_metrics import track_api_calls
+from src.utils.async_yadisk import get_disk, get_async_yadisk
 from src.utils.folder_navigation import FolderNavigator
 from src.utils.config_constants import (
     BUTTON_BACK, BUTTON_CANCEL, BUTTON_ADD_FOLDER, BUTTON_CREATE_FOLDER, BUTTON_RETURN_TO_ROOT,
@@ -37,11 +38,10 @@ ADMIN_USER_FIRST_NAME = 14
 ADMIN_USER_LAST_NAME = 15
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 # Создаем экземпляр навигатора по папкам
 folder_navigator = FolderNavigator(
-    yadisk_helper=yadisk_helper,
+    yadisk_helper=get_async_yadisk(),
     title="Выберите папку для добавления в список разрешенных:",
     add_current_folder_button=True,
     create_folder_button=True,
@@ -75,8 +75,10 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     return ADMIN_MENU
 
+@track_api_calls
 async def admin_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик выбора действия в административном меню"""
+    async_yadisk = get_disk(context)
     text = update.message.text
     
     if text == "🔙 Выход":
@@ -93,8 +95,7 @@ async def admin_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         # Получаем список папок в корне
         try:
-            items = list(yadisk_helper.disk.listdir("/"))
-            folders = [item for item in items if item.type == "dir"]
+            folders = await async_yadisk.list_folders("/")
             
             if not folders:
                 await update.message.reply_text(
@@ -242,8 +243,10 @@ async def admin_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         return await admin(update, context)
 
+@track_api_calls
 async def browse_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик навигации по папкам Яндекс.Диска"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     text = update.message.text
     current_path = context.user_data.get("current_path", "/")
@@ -293,8 +296,7 @@ async def browse_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
             # Получаем подпапки
             try:
-                items = list(yadisk_helper.disk.listdir(selected_path))
-                subfolders = [item for item in items if item.type == "dir"]
+                subfolders = await async_yadisk.list_folders(selected_path)
                 
                 if not subfolders:
                     # Если подпапок нет, предлагаем добавить эту папку
@@ -364,6 +366,7 @@ async def browse_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
     return BROWSE_FOLDERS
 
+@track_api_calls
 async def select_subfolder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик выбора подпапки или добавления текущей папки"""
     text = update.message.text
@@ -413,8 +416,10 @@ async def select_subfolder(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     )
     return SELECT_SUBFOLDER
 
+@track_api_calls
 async def create_subfolder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Создает новую подпапку в текущем пути"""
+    async_yadisk = get_disk(context)
     text = update.message.text
     current_path = context.user_data.get("current_path", "/")
     
@@ -434,7 +439,7 @@ async def create_subfolder(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     try:
         # Проверяем, существует ли уже такая папка
-        if yadisk_helper.disk.exists(new_folder_path):
+        if await async_yadisk.exists(new_folder_path):
             await update.message.reply_text(
                 f"❌ Папка '{text}' уже существует",
                 reply_markup=ReplyKeyboardMarkup([["🔙 Назад"]], one_time_keyboard=True, resize_keyboard=True)
@@ -442,7 +447,7 @@ async def create_subfolder(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             return CREATE_SUBFOLDER
         
         # Создаем папку
-        yadisk_helper.disk.mkdir(new_folder_path)
+        await async_yadisk.mkdir(new_folder_path)
         logger.info(f"Создана папка '{new_folder_path}'")
         
         # Спрашиваем, добавить ли созданную папку в список разрешенных
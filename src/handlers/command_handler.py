@@ -1,14 +1,16 @@
 import logging
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardMarkup, InlineKeyboardButton
-from telegram.ext import ContextTypes, ConversationHandler, CallbackContext
+from telegram import Bot, Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.ext import ContextTypes, ConversationHandler
 from src.utils.state_manager import state_manager
-from src.utils.yadisk_helper import YaDiskHelper
-from src.utils.admin_utils import load_allowed_folders, get_allowed_folders_for_user, is_folder_allowed_for_user, get_user_data
+from src.utils.api_metrics import track_api_calls
+from src.utils.activity_tracker import get_activity_tracker
+from src.utils.async_yadisk import get_disk, get_async_yadisk
+from src.utils.upload_scheduler import get_upload_scheduler
+from src.utils.admin_utils import get_allowed_folders_for_user, get_user_data
 import os
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 # Определение стадий диалога
 CHOOSE_FOLDER, NAVIGATE_SUBFOLDERS, CREATE_FOLDER = range(3)
@@ -80,8 +82,10 @@ async def new_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     
     return CHOOSE_FOLDER
 
+@track_api_calls
 async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обрабатывает выбор папки"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     text = update.message.text
     
@@ -107,27 +111,14 @@ async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
             # Получаем список подпапок или создаем сессию сразу
             try:
-                # Проверяем существование директории
-                if not yadisk_helper.disk.exists(selected_folder):
-                    # Создаем папку, если она не существует
-                    yadisk_helper.disk.mkdir(selected_folder)
+                # Создаем папку, если она не существует
+                if await async_yadisk.ensure_folder_exists(selected_folder):
                     logger.info(f"Создана папка '{selected_folder}'")
                 
                 # Получаем список подпапок
                 try:
-                    items = list(yadisk_helper.disk.listdir(selected_folder))
-                    logger.info(f"Найдено {len(items)} элементов в директории {selected_folder}")
-                    
-                    # Явно проверяем элементы на тип
-                    folders = []
-                    for item in items:
-                        if hasattr(item, 'type') and item.type == "dir":
-                            folders.append(item)
-                            logger.debug(f"Добавлена папка: {item.name}, Путь: {item.path}")
-                        else:
-                            logger.debug(f"Пропущен элемент: {item.name}, Тип: {getattr(item, 'type', 'неизвестен')}")
-                    
-                    logger.info(f"Из них {len(folders)} папок")
+                    folders = await async_yadisk.list_folders(selected_folder)
+                    logger.info(f"Найдено {len(folders)} папок в директории {selected_folder}")
                     
                     # Сохраняем список подпапок
                     state_manager.set_data(user_id, "folders", folders)
@@ -196,8 +187,10 @@ async def handle_category(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return CHOOSE_FOLDER
 
+@track_api_calls
 async def navigate_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обрабатывает выбор подпапки"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     text = update.message.text
     selected_folder = state_manager.get_data(user_id, "selected_folder")
@@ -237,15 +230,7 @@ async def navigate_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                 
                 # Проверяем, есть ли подпапки в выбранной папке
                 try:
-                    items = list(yadisk_helper.disk.listdir(folder_path))
-                    logger.debug(f"Найдено {len(items)} элементов в {folder_path}")
-                    
-                    # Ищем папки среди элементов
-                    subfolders = []
-                    for item in items:
-                        if hasattr(item, 'type') and item.type == "dir":
-                            subfolders.append(item)
-                    
+                    subfolders = await async_yadisk.list_folders(folder_path)
                     logger.debug(f"Найдено {len(subfolders)} подпапок в {folder_path}")
                     
                     if subfolders:
@@ -321,8 +306,10 @@ async def navigate_folders(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         )
         return ConversationHandler.END
 
+@track_api_calls
 async def create_folder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Создает новую подпапку"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     text = update.message.text
     selected_folder = state_manager.get_data(user_id, "selected_folder")
@@ -339,16 +326,13 @@ async def create_folder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     new_folder_path = f"{selected_folder}/{text}"
     
     try:
-        # Проверяем, существует ли уже такая папка
-        if yadisk_helper.disk.exists(new_folder_path):
+        # Создаем папку сразу: существующая папка дает ошибку 409 вместо отдельной проверки
+        if not await async_yadisk.ensure_folder_exists(new_folder_path):
             await update.message.reply_text(
                 f"❌ Папка '{text}' уже существует",
                 reply_markup=ReplyKeyboardRemove()
             )
             return ConversationHandler.END
-        
-        # Создаем папку
-        yadisk_helper.disk.mkdir(new_folder_path)
         logger.info(f"Создана папка '{new_folder_path}'")
         
         # Создаем сессию в новой папке
@@ -364,6 +348,7 @@ async def create_folder(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
 async def start_session(update: Update, context: ContextTypes.DEFAULT_TYPE, root_folder: str, folder_path: str) -> int:
     """Начинает сессию встречи"""
+    async_yadisk = get_disk(context)
     from src.utils.state_manager import SessionState
     
     user_id = update.effective_user.id
@@ -392,7 +377,7 @@ async def start_session(update: Update, context: ContextTypes.DEFAULT_TYPE, root
         session.add_message(start_msg, author=user_full_name)
         
         # Создаем текстовый файл для встречи
-        yadisk_helper.create_text_file(session.txt_file_path, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {start_msg}")
+        await async_yadisk.create_text_file(session.txt_file_path, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {start_msg}")
         
         # Уведомляем о создании встречи
         await update.message.reply_text(
@@ -405,19 +390,7 @@ async def start_session(update: Update, context: ContextTypes.DEFAULT_TYPE, root
             reply_markup=ReplyKeyboardRemove()
         )
         
-        # Планируем запрос о закрытии сессии через 10 минут
-        # Используем job_queue для планирования задачи, если он доступен
-        if hasattr(context, 'job_queue') and context.job_queue is not None:
-            context.job_queue.run_once(
-                lambda context: check_session_activity(context, user_id),
-                600,  # 10 минут в секундах
-                data=user_id,
-                name=f"session_timeout_{user_id}"
-            )
-            logger.info(f"Запланирована проверка активности сессии для пользователя {user_id}")
-        else:
-            logger.warning(f"job_queue недоступен для планирования проверки активности сессии пользователя {user_id}")
-        
+        # Запрос о закрытии встречи отправит общая проверка неактивных встреч (sweep_idle_sessions)
         return ConversationHandler.END
         
     except Exception as e:
@@ -428,7 +401,67 @@ async def start_session(update: Update, context: ContextTypes.DEFAULT_TYPE, root
         )
         return ConversationHandler.END
 
-async def check_session_activity(context: CallbackContext, user_id: int) -> None:
+async def record_activity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отмечает активность пользователя; вызывается для каждого обновления до остальных обработчиков"""
+    if update.effective_user is not None:
+        get_activity_tracker().touch(update.effective_user.id)
+
+async def sweep_idle_sessions(bot: Bot, async_yadisk=None) -> None:
+    """
+    Предлагает завершить встречи, в которых не было активности дольше SESSION_IDLE_TIMEOUT,
+    и освобождает память от давно не используемых сессий и данных
+    """
+    for user_id in get_activity_tracker().pop_idle():
+        if user_id in state_manager.sessions:
+            await check_session_activity(bot, user_id)
+    async_yadisk = async_yadisk or get_async_yadisk()
+    for user_id in state_manager.idle_sessions():
+        await evict_idle_session(bot, async_yadisk, user_id)
+    state_manager.evict_idle()
+
+async def evict_idle_session(bot: Bot, async_yadisk, user_id: int) -> bool:
+    """
+    Завершает давно простаивающую встречу и удаляет ее из памяти.
+    
+    Встреча с незавершенными загрузками или файлом, который не удалось
+    синхронизировать, остается до следующей проверки.
+    
+    Returns:
+        bool: True, если встреча завершена
+    """
+    session = state_manager.sessions.get(user_id)
+    if session is None:
+        return False
+    if get_upload_scheduler().has_jobs(user_id):
+        logger.info(f"Встреча пользователя {user_id} не завершена после простоя: загрузки еще не закончены")
+        return False
+    
+    try:
+        closed = await async_yadisk.close_text_file(session.txt_file_path)
+    except Exception as e:
+        logger.error(f"Ошибка при синхронизации файла встречи {session.txt_file_path}: {e}")
+        closed = False
+    if not closed:
+        logger.warning(f"Встреча пользователя {user_id} не завершена после простоя: файл {session.txt_file_path} еще не синхронизирован")
+        return False
+    if state_manager.sessions.get(user_id) is not session:
+        # Пользователь начал другую встречу, пока файл синхронизировался
+        return False
+    
+    logger.info(f"Встреча пользователя {user_id} завершена после простоя")
+    state_manager.clear_session(user_id)
+    get_activity_tracker().forget(user_id)
+    try:
+        await bot.send_message(
+            chat_id=user_id,
+            text=f"⏹ Встреча в папке {session.folder_path} завершена после долгого простоя.\n"
+                 f"Файл встречи сохранён на Яндекс.Диске. Чтобы продолжить, начните новую встречу."
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при отправке уведомления о завершении встречи: {e}")
+    return True
+
+async def check_session_activity(bot: Bot, user_id: int) -> None:
     """
     Проверяет активность сессии и предлагает закрыть её при необходимости
     """
@@ -446,7 +479,7 @@ async def check_session_activity(context: CallbackContext, user_id: int) -> None
     
     try:
         # Отправляем сообщение с предложением закрыть сессию
-        await context.bot.send_message(
+        await bot.send_message(
             chat_id=user_id,
             text="⏱ Прошло 10 минут с момента последней активности.\nХотите завершить текущую встречу?",
             reply_markup=keyboard
@@ -454,6 +487,7 @@ async def check_session_activity(context: CallbackContext, user_id: int) -> None
     except Exception as e:
         logger.error(f"Ошибка при отправке уведомления о неактивности: {e}")
 
+@track_api_calls
 async def handle_session_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Обрабатывает ответ на запрос о закрытии сессии
@@ -468,30 +502,18 @@ async def handle_session_callback(update: Update, context: ContextTypes.DEFAULT_
         # Завершаем сессию и показываем сводку
         await end_session_and_show_summary(update, context)
     elif data == "extend_session":
-        # Продлеваем сессию еще на 10 минут
+        # Продлеваем сессию еще на 10 минут: само нажатие кнопки уже отмечено как активность
         await query.edit_message_text(
             text="✅ Встреча продлена еще на 10 минут."
         )
-        
-        # Планируем новый запрос через 10 минут
-        if hasattr(context, 'job_queue') and context.job_queue is not None:
-            context.job_queue.run_once(
-                lambda context: check_session_activity(context, user_id),
-                600,  # 10 минут в секундах
-                data=user_id,
-                name=f"session_timeout_{user_id}"
-            )
-            logger.info(f"Запланирована проверка активности сессии для пользователя {user_id}")
-        else:
-            logger.warning(f"job_queue недоступен для планирования проверки активности сессии пользователя {user_id}")
-            await query.edit_message_text(
-                text="✅ Встреча продлена еще на 10 минут.\n⚠️ Автоматическое напоминание об окончании недоступно."
-            )
+        logger.info(f"Встреча пользователя {user_id} продлена")
 
+@track_api_calls
 async def end_session_and_show_summary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Завершает сессию и показывает итоговую сводку
     """
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     session = state_manager.get_session(user_id)
     
@@ -515,12 +537,14 @@ async def end_session_and_show_summary(update: Update, context: ContextTypes.DEF
     
     # Обновляем файл на Яндекс.Диске
     try:
-        # Загружаем текущее содержимое
-        content = yadisk_helper.get_file_content(session.txt_file_path)
         # Добавляем завершающую запись
-        content += f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {end_msg}"
-        # Обновляем файл
-        yadisk_helper.update_text_file(session.txt_file_path, content)
+        await async_yadisk.append_to_text_file(
+            session.txt_file_path,
+            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {end_msg}"
+        )
+        # Отправляем итоговую версию файла
+        if not await async_yadisk.close_text_file(session.txt_file_path):
+            logger.warning(f"Файл встречи {session.txt_file_path} будет синхронизирован позже")
     except Exception as e:
         logger.error(f"Ошибка при обновлении файла встречи: {e}")
     
@@ -543,15 +567,7 @@ async def end_session_and_show_summary(update: Update, context: ContextTypes.DEF
     
     # Очищаем сессию
     state_manager.clear_session(user_id)
-    
-    # Отменяем запланированные задачи для этого пользователя
-    if hasattr(context, 'job_queue') and context.job_queue is not None:
-        current_jobs = context.job_queue.get_jobs_by_name(f"session_timeout_{user_id}")
-        for job in current_jobs:
-            job.schedule_removal()
-        logger.info(f"Отменены запланированные проверки активности для пользователя {user_id}")
-    else:
-        logger.warning(f"job_queue недоступен для отмены проверок активности для пользователя {user_id}")
+    get_activity_tracker().forget(user_id)
 
 async def switch_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик команды /switch - переключение на другую встречу"""
@@ -620,17 +636,13 @@ async def current_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             if first_name or last_name:
                 user_info = f"👤 Участник: {first_name} {last_name}\n"
         
-        # Считаем количество файлов и сообщений
-        files_count = len(session.file_history)
-        messages_count = len(session.message_history)
-        
         await update.message.reply_text(
             f"📝 Текущая встреча:\n"
             f"📂 Папка: {session.folder_path}\n"
             f"📄 Файл: {session.get_txt_filename()}\n"
             f"⏱ Начало: {session.created_at}\n"
             f"{user_info}"
-            f"📊 Сообщений: {messages_count}, Файлов: {files_count}\n\n"
+            f"📊 Сообщений: {session.message_count}, Файлов: {session.file_count}\n\n"
             f"✍️ Можете отправлять текст, голос, фото или видео."
         )
     else:
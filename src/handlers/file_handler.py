@@ -3,7 +3,8 @@ import logging
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
 from config.config import UPLOAD_DIR
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.api_metrics import track_api_calls
+from src.utils.async_yadisk import get_disk
 from src.utils.state_manager import state_manager
 from src.handlers.media_handlers import (
     get_file_from_message, 
@@ -13,14 +14,48 @@ from src.handlers.media_handlers import (
     handle_document,
     process_transcription,
     process_transcription_edit,
-    process_caption
+    is_transcription_reply,
+    stop_awaiting_transcription_edit,
+    process_caption,
+    is_album_item,
+    collect_album_item,
+    AWAITING_TEXT,
+    AWAITING_CAPTION,
+    AWAITING_TRANSCRIPTION,
+    AWAITING_TRANSCRIPTION_EDIT
 )
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
+async def append_text(update: Update, context: ContextTypes.DEFAULT_TYPE, session) -> None:
+    """Добавляет текст сообщения в файл встречи"""
+    async_yadisk = get_disk(context)
+    text = update.message.text
+    try:
+        logger.debug(f"Добавление текста в файл: {session.txt_file_path}")
+        await async_yadisk.append_to_text_file(session.txt_file_path, text)
+        session.add_message(text)
+        await update.message.reply_text("📝 Добавлено в отчёт.")
+    except Exception as e:
+        logger.error(f"Ошибка при добавлении текста: {str(e)}", exc_info=True)
+        await update.message.reply_text(f"❌ Произошла ошибка: {str(e)}")
+
+# Обработчик текста в активной встрече по тексту, которого ждет бот (AWAITING_TEXT);
+# без ожидания текст добавляется в отчёт
+TEXT_ROUTES = {
+    None: append_text,
+    AWAITING_CAPTION: process_caption,
+    AWAITING_TRANSCRIPTION: process_transcription,
+    AWAITING_TRANSCRIPTION_EDIT: process_transcription_edit,
+}
+
+@track_api_calls
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обрабатывает текстовые сообщения"""
+    """Обрабатывает текстовые сообщения
+    
+    Единственный обработчик текста: сообщение передается ровно одному
+    обработчику из TEXT_ROUTES по ожидаемому от пользователя тексту.
+    """
     user_id = update.effective_user.id
     text = update.message.text
     
@@ -34,8 +69,8 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         await new_meeting(update, context)
         return
     
-    # Получаем текущую сессию пользователя
-    session = state_manager.get_session(user_id)
+    # Получаем текущую сессию пользователя и текст, которого от него ждет бот
+    session, awaiting = state_manager.get_session_with_data(user_id, AWAITING_TEXT)
     if not session:
         # Создаем клавиатуру с кнопкой новой встречи
         keyboard = [["🆕 Начать новую встречу"]]
@@ -46,15 +81,16 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         )
         return
     
-    # Добавляем текст в файл встречи
-    try:
-        logger.debug(f"Добавление текста в файл: {session.txt_file_path}")
-        yadisk_helper.append_to_text_file(session.txt_file_path, text)
-        await update.message.reply_text("📝 Добавлено в отчёт.")
-    except Exception as e:
-        logger.error(f"Ошибка при добавлении текста: {str(e)}", exc_info=True)
-        await update.message.reply_text(f"❌ Произошла ошибка: {str(e)}")
+    if awaiting == AWAITING_TRANSCRIPTION_EDIT and not is_transcription_reply(update):
+        # Исправление расшифровки - только ответ на ее сообщение; обычная заметка
+        # снимает ожидание исправления и добавляется в отчёт
+        stop_awaiting_transcription_edit(user_id)
+        awaiting = None
+    
+    route = TEXT_ROUTES.get(awaiting, append_text)
+    await route(update, context, session)
 
+@track_api_calls
 async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE, handler_func=None) -> None:
     """Обработчик получения файлов любого типа"""
     user_id = update.effective_user.id
@@ -78,6 +114,11 @@ async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE, handle
         await update.message.reply_text("❌ Не могу обработать этот тип файла.")
         return
     
+    # Файлы альбома собираются и загружаются одним пакетом
+    if is_album_item(update, file_type):
+        await collect_album_item(update, context, file_id, file_name, file_type, session)
+        return
+    
     logger.info(f"Получен файл от пользователя {user_id}: {file_name} (тип: {file_type})")
     
     # Если передан конкретный обработчик, используем его
@@ -102,25 +143,7 @@ async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE, handle
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик всех сообщений"""
-    user_id = update.effective_user.id
-    
-    # Проверяем, ожидаем ли мы расшифровку голосового сообщения
-    if state_manager.get_data(user_id, "awaiting_transcription"):
-        await process_transcription(update, context)
-        return
-    
-    # Проверяем, ожидаем ли мы исправленную расшифровку голосового сообщения
-    if state_manager.get_data(user_id, "awaiting_transcription_edit"):
-        await process_transcription_edit(update, context)
-        return
-    
-    # Проверяем, ожидаем ли мы подпись к файлу
-    if state_manager.get_data(user_id, "awaiting_caption"):
-        await process_caption(update, context)
-        return
-    
-    # Если это текстовое сообщение - обрабатываем его первым, 
-    # чтобы кнопка "Начать новую встречу" работала корректно
+    # Текст, в том числе ожидаемые подписи и расшифровки, маршрутизирует handle_text
     if update.message.text:
         await handle_text(update, context)
         return
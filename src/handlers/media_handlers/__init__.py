@@ -1,16 +1,31 @@
-from src.handlers.media_handlers.voice_handler import handle_voice, process_transcription, process_transcription_edit
+from src.handlers.media_handlers.voice_handler import (
+    handle_voice, process_transcription, process_transcription_edit,
+    is_transcription_reply, stop_awaiting_transcription_edit
+)
 from src.handlers.media_handlers.photo_handler import handle_photo
 from src.handlers.media_handlers.video_handler import handle_video
 from src.handlers.media_handlers.document_handler import handle_document
-from src.handlers.media_handlers.common import get_file_from_message, process_caption
+from src.handlers.media_handlers.common import (
+    get_file_from_message, process_caption,
+    AWAITING_TEXT, AWAITING_CAPTION, AWAITING_TRANSCRIPTION, AWAITING_TRANSCRIPTION_EDIT
+)
+from src.handlers.media_handlers.album_handler import is_album_item, collect_album_item
 
 __all__ = [
     'handle_voice', 
     'process_transcription',
     'process_transcription_edit',
+    'is_transcription_reply',
+    'stop_awaiting_transcription_edit',
     'handle_photo',
     'handle_video',
     'handle_document',
     'get_file_from_message',
-    'process_caption'
+    'process_caption',
+    'is_album_item',
+    'collect_album_item',
+    'AWAITING_TEXT',
+    'AWAITING_CAPTION',
+    'AWAITING_TRANSCRIPTION',
+    'AWAITING_TRANSCRIPTION_EDIT'
 ] 
\ No newline at end of file
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.ext import ContextTypes
+from config.config import MEDIA_GROUP_WINDOW
+from src.utils.upload_scheduler import get_upload_scheduler, UploadJob, PRIORITY_PHOTO, PRIORITY_VIDEO
+from src.utils.state_manager import state_manager
+from src.utils.async_yadisk import get_disk
+from src.handlers.media_handlers.common import (
+    prepare_upload_source, get_file_unique_id, AWAITING_TEXT, AWAITING_CAPTION
+)
+
+logger = logging.getLogger(__name__)
+
+# Типы файлов, которые Telegram присылает альбомами
+ALBUM_FILE_TYPES = ("photo", "video")
+
+# Интервал между обновлениями сообщения о ходе загрузки альбома (сек)
+_PROGRESS_INTERVAL = 3.0
+
+class _AlbumItem:
+    """Один файл альбома"""
+    __slots__ = ("file_id", "file_name", "file_type", "file_unique_id")
+
+    def __init__(self, file_id, file_name, file_type, file_unique_id=None):
+        self.file_id = file_id
+        self.file_name = file_name
+        self.file_type = file_type
+        self.file_unique_id = file_unique_id
+
+class _Album:
+    """Файлы одного альбома, собранные за окно ожидания"""
+    def __init__(self, user_id, session, deadline):
+        self.user_id = user_id
+        self.session = session
+        self.deadline = deadline
+        self.items: List[_AlbumItem] = []
+        self.caption: Optional[str] = None
+        self.status_message = None
+
+# Ключ: (user_id, media_group_id), Значение: собираемый альбом
+_pending_albums: Dict[Tuple[int, str], _Album] = {}
+
+def is_album_item(update: Update, file_type) -> bool:
+    """Проверяет, является ли сообщение частью альбома фото или видео"""
+    return bool(update.message.media_group_id) and file_type in ALBUM_FILE_TYPES
+
+async def collect_album_item(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id, file_name, file_type, session) -> None:
+    """
+    Добавляет файл в альбом по media_group_id.
+
+    Telegram присылает каждый файл альбома отдельным сообщением. Они собираются,
+    пока в течение MEDIA_GROUP_WINDOW не перестанут приходить новые, после чего
+    альбом загружается целиком с одним сообщением о статусе.
+    """
+    user_id = update.effective_user.id
+    key = (user_id, update.message.media_group_id)
+    loop = asyncio.get_running_loop()
+
+    album = _pending_albums.get(key)
+    is_new = album is None
+    if is_new:
+        album = _Album(user_id, session, loop.time() + MEDIA_GROUP_WINDOW)
+        _pending_albums[key] = album
+    else:
+        album.deadline = loop.time() + MEDIA_GROUP_WINDOW
+
+    album.items.append(_AlbumItem(file_id, file_name, file_type, get_file_unique_id(update)))
+    # Подпись альбома приходит вместе с одним из файлов
+    if update.message.caption and not album.caption:
+        album.caption = update.message.caption
+
+    if is_new:
+        context.application.create_task(_flush_album(context, key, album, update))
+
+async def _flush_album(context: ContextTypes.DEFAULT_TYPE, key, album: _Album, update: Update) -> None:
+    """Дожидается конца альбома и загружает его"""
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            album.status_message = await update.message.reply_text("🖼 Получаю альбом...")
+        except Exception as e:
+            # Альбом загружаем и без сообщения о статусе
+            logger.error(f"Не удалось отправить статус альбома пользователю {album.user_id}: {str(e)}")
+
+        # Окно продлевается с каждым новым файлом альбома
+        while (delay := album.deadline - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        _pending_albums.pop(key, None)
+
+        await _close_album(context, album)
+        await _process_album(context, album)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке альбома: {str(e)}", exc_info=True)
+        try:
+            await _edit_status(album, f"❌ Произошла ошибка при обработке альбома: {str(e)}")
+        except Exception as edit_error:
+            logger.warning(f"Не удалось обновить статус альбома: {str(edit_error)}")
+    finally:
+        _pending_albums.pop(key, None)
+
+async def _edit_status(album: _Album, text) -> None:
+    """Обновляет сообщение о статусе альбома, если его удалось отправить"""
+    if album.status_message is not None:
+        await album.status_message.edit_text(text)
+
+def _caption_prompt(album: _Album) -> str:
+    """Возвращает предложение добавить подпись, пока бот ее ждет"""
+    if state_manager.get_data(album.user_id, AWAITING_TEXT) == AWAITING_CAPTION:
+        return "\n\nХотите добавить подпись к альбому?"
+    return ""
+
+async def _close_album(context: ContextTypes.DEFAULT_TYPE, album: _Album) -> None:
+    """
+    Завершает прием альбома: записывает подпись или предлагает ее добавить.
+
+    Выполняется сразу по окончании окна, до загрузки файлов, чтобы подпись
+    встала в файл встречи рядом с альбомом, а ожидание подписи не включилось
+    спустя минуты и не перехватило следующую заметку пользователя.
+    """
+    summary = _album_summary(album)
+    if album.caption:
+        try:
+            # Подпись альбома одной записью в файле встречи
+            await get_disk(context).append_to_text_file(
+                album.session.txt_file_path,
+                f"Подпись к альбому ({summary}): {album.caption}"
+            )
+        except Exception as e:
+            logger.error(f"Не удалось добавить подпись альбома в файл встречи: {str(e)}", exc_info=True)
+            album.caption = None
+
+    if not album.caption:
+        # Устанавливаем состояние ожидания подписи один раз на весь альбом
+        state_manager.set_data(album.user_id, AWAITING_TEXT, AWAITING_CAPTION)
+
+    text = f"🖼 Альбом получен ({summary}), загружаю..."
+    if album.caption:
+        text += "\n📌 Подпись добавлена в файл встречи."
+    await _edit_status(album, text + _caption_prompt(album))
+
+def _album_summary(album: _Album) -> str:
+    """Возвращает описание состава альбома, например «3 фото и 1 видео»"""
+    photos = sum(1 for item in album.items if item.file_type == "photo")
+    videos = len(album.items) - photos
+    parts = []
+    if photos:
+        parts.append(f"{photos} фото")
+    if videos:
+        parts.append(f"{videos} видео")
+    return " и ".join(parts)
+
+def _item_extension(item: _AlbumItem) -> str:
+    """Возвращает расширение файла альбома"""
+    if item.file_type == "photo":
+        return "jpg"
+    return item.file_name.split(".")[-1] if item.file_name and "." in item.file_name else "mp4"
+
+async def _submit_item(context: ContextTypes.DEFAULT_TYPE, album: _Album, item: _AlbumItem, remote_path) -> UploadJob:
+    """Ставит файл альбома в очередь загрузки; файл передается из Telegram потоково"""
+    extension = _item_extension(item)
+    priority = PRIORITY_PHOTO if item.file_type == "photo" else PRIORITY_VIDEO
+
+    telegram_file, local_path, delete_after = await prepare_upload_source(context, item.file_id, f".{extension}")
+    return await get_upload_scheduler().submit(UploadJob(
+        album.user_id, local_path, remote_path,
+        priority=priority,
+        delete_after=delete_after,
+        telegram_file=telegram_file,
+        content_id=item.file_unique_id
+    ))
+
+async def _process_album(context: ContextTypes.DEFAULT_TYPE, album: _Album) -> None:
+    """Загружает все файлы альбома параллельно и показывает общий прогресс"""
+    user_id = album.user_id
+    total = len(album.items)
+    summary = _album_summary(album)
+
+    # Номера файлов выдаются в порядке альбома, до параллельной постановки в очередь
+    remote_paths = [await album.session.get_media_path(_item_extension(item)) for item in album.items]
+
+    # Получение ссылок на файлы и постановка в очередь идут параллельно,
+    # скачивание и загрузку планировщик выполняет на нескольких воркерах
+    results = await asyncio.gather(
+        *(_submit_item(context, album, item, remote_path) for item, remote_path in zip(album.items, remote_paths)),
+        return_exceptions=True
+    )
+    jobs = [result for result in results if isinstance(result, UploadJob)]
+    failed = total - len(jobs)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Не удалось поставить файл альбома в очередь: {str(result)}")
+
+    logger.info(f"Альбом пользователя {user_id}: {summary}, загрузка в {album.session.folder_path}")
+
+    # Обновляем сообщение не чаще раза в несколько секунд, а не на каждый файл
+    pending = {job.done for job in jobs}
+    last_reported = -1
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=_PROGRESS_INTERVAL)
+        done = len(jobs) - len(pending)
+        if pending and done != last_reported:
+            last_reported = done
+            await _edit_status(album, f"🖼 Альбом ({summary}): загружено {done} из {total}..." + _caption_prompt(album))
+
+    failed += sum(1 for job in jobs if not job.done.result())
+    queued = sum(1 for job in jobs if job.done.result() and job.queued)
+    saved = total - failed
+
+    text = f"🖼 Альбом сохранен: {saved - queued} из {total} файлов."
+    if queued:
+        text += f"\n🕓 Яндекс.Диск недоступен, в очереди на загрузку: {queued}."
+    if failed:
+        text += f"\n❌ Не удалось загрузить файлов: {failed}."
+    if album.caption:
+        text += "\n📌 Подпись добавлена в файл встречи."
+    elif saved:
+        # Если подпись еще не прислали, продолжаем ее предлагать
+        text += _caption_prompt(album)
+    await _edit_status(album, text)
@@ -3,11 +3,18 @@ import logging
 import tempfile
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.async_yadisk import get_disk
 from src.utils.state_manager import state_manager
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
+
+# Ключ временных данных с текстом, которого бот ждет от пользователя, и его значения
+AWAITING_TEXT = "awaiting_text"
+AWAITING_CAPTION = "caption"
+AWAITING_TRANSCRIPTION = "transcription"
+AWAITING_TRANSCRIPTION_EDIT = "transcription_edit"
+# Ключ временных данных с идентификатором сообщения с автоматической расшифровкой
+TRANSCRIPTION_MESSAGE_ID = "transcription_message_id"
 
 async def get_file_from_message(update: Update) -> tuple:
     """Получает файл из различных типов сообщений"""
@@ -28,24 +35,46 @@ async def get_file_from_message(update: Update) -> tuple:
         return update.message.sticker.file_id, f"sticker_{update.message.sticker.file_unique_id}.webp", "sticker"
     return None, None, None
 
+def get_file_unique_id(update: Update):
+    """Возвращает file_unique_id вложения: он одинаков у всех пересылок одного файла"""
+    attachment = update.message.effective_attachment
+    if isinstance(attachment, (list, tuple)):
+        # Для фото берется самый большой размер, как в get_file_from_message
+        attachment = attachment[-1] if attachment else None
+    return getattr(attachment, "file_unique_id", None)
+
 async def download_telegram_file(context, file_id, tmp_path):
     """Скачивает файл из Telegram во временную директорию"""
     file = await context.bot.get_file(file_id)
     await file.download_to_drive(tmp_path)
     return file
 
-async def process_caption(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def prepare_upload_source(context, file_id, suffix: str = "") -> tuple:
+    """
+    Готовит источник для фоновой загрузки файла без предварительного скачивания.
+
+    Returns:
+        tuple: (telegram_file, local_path, delete_after). Если бот работает с локальным
+        Bot API сервером, файл уже лежит на диске и загружается прямо оттуда
+        (telegram_file = None); иначе local_path - временная копия для потоковой передачи.
+    """
+    file = await context.bot.get_file(file_id)
+    if context.bot.local_mode and file.file_path and os.path.isfile(file.file_path):
+        return None, file.file_path, False
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        tmp_path = tmp_file.name
+    return file, tmp_path, True
+
+async def process_caption(update: Update, context: ContextTypes.DEFAULT_TYPE, session) -> None:
     """Обрабатывает подпись к файлу"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     caption = update.message.text
-    session = state_manager.get_session(user_id)
     
-    if not session:
-        return
-        
     try:
         # Добавляем подпись в файл встречи
-        yadisk_helper.append_to_text_file(
+        await async_yadisk.append_to_text_file(
             session.txt_file_path, 
             f"Подпись к файлу: {caption}"
         )
@@ -55,4 +84,4 @@ async def process_caption(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(f"❌ Произошла ошибка: {str(e)}")
     
     # Сбрасываем состояние ожидания
-    state_manager.set_data(user_id, "awaiting_caption", False) 
\ No newline at end of file
+    state_manager.remove_data(user_id, AWAITING_TEXT) 
\ No newline at end of file
@@ -1,14 +1,12 @@
 import os
 import logging
-import tempfile
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.upload_scheduler import get_upload_scheduler, UploadJob, PRIORITY_TEXT, PRIORITY_DOCUMENT, TEXT_EXTENSIONS
 from src.utils.state_manager import state_manager
-from src.handlers.media_handlers.common import download_telegram_file
+from src.handlers.media_handlers.common import prepare_upload_source, get_file_unique_id, AWAITING_TEXT, AWAITING_CAPTION
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id, file_name, session) -> None:
     """Обработчик документов и прочих файлов"""
@@ -17,13 +15,11 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE, fi
     # Сообщаем о начале обработки
     status_message = await update.message.reply_text(f"📄 Обрабатываю документ '{file_name}'...")
     
+    upload_job = None
+    
     try:
-        # Создаем временный файл
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_path = tmp_file.name
-        
-        # Скачиваем файл
-        await download_telegram_file(context, file_id, tmp_path)
+        # Файл не скачиваем заранее: планировщик передаст его из Telegram на диск потоково
+        telegram_file, tmp_path, delete_after = await prepare_upload_source(context, file_id)
         
         # Получаем расширение файла
         extension = "bin"
@@ -31,15 +27,12 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE, fi
             extension = file_name.split(".")[-1]
         
         # Путь для сохранения на Яндекс.Диске
-        yandex_path = session.get_media_path(extension)
+        yandex_path = await session.get_media_path(extension)
         
         # Определяем размер файла
-        file_size = os.path.getsize(tmp_path)
+        file_size = telegram_file.file_size if telegram_file and telegram_file.file_size else os.path.getsize(tmp_path)
         file_size_mb = round(file_size / (1024 * 1024), 2)
         
-        # Информируем о загрузке
-        await status_message.edit_text(f"📄 Загружаю документ ({file_size_mb} МБ)...")
-        
         # Добавляем информацию о прогрессе для больших файлов
         progress_callback = None
         if file_size > 5 * 1024 * 1024:  # Если файл больше 5МБ
@@ -56,26 +49,50 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE, fi
                         status_message.edit_text(f"📄 Загрузка документа: {progress}% завершено...")
                     )
         
-        # Загружаем на Яндекс.Диск
-        logger.debug(f"Начинаем загрузку документа на Яндекс.Диск: {yandex_path}")
-        yadisk_helper.upload_file(tmp_path, yandex_path, progress_callback)
+        async def on_complete(job):
+            if job.queued:
+                text = (f"🕓 Яндекс.Диск недоступен, документ {file_name} поставлен в очередь и загрузится позже как\n"
+                        f"{os.path.basename(job.remote_path)}")
+            else:
+                text = f"📄 Документ {file_name} сохранён как\n{os.path.basename(job.remote_path)}"
+            # Если подпись еще не прислали, продолжаем ее предлагать
+            if state_manager.get_data(user_id, AWAITING_TEXT) == AWAITING_CAPTION:
+                text += "\n\nХотите добавить подпись к документу?"
+            await status_message.edit_text(text)
+        
+        async def on_error(job, error):
+            await status_message.edit_text(f"❌ Не удалось загрузить документ: {str(error)}")
+        
+        # Текстовые документы загружаются раньше медиафайлов
+        priority = PRIORITY_TEXT if extension.lower() in TEXT_EXTENSIONS else PRIORITY_DOCUMENT
         
-        # Удаляем временный файл
-        os.unlink(tmp_path)
+        # Ставим загрузку в очередь, временный файл удалит планировщик
+        logger.debug(f"Документ поставлен в очередь загрузки: {yandex_path}")
+        upload_job = await get_upload_scheduler().submit(UploadJob(
+            user_id, tmp_path, yandex_path,
+            priority=priority,
+            progress_callback=progress_callback,
+            on_complete=on_complete,
+            on_error=on_error,
+            delete_after=delete_after,
+            telegram_file=telegram_file,
+            content_id=get_file_unique_id(update)
+        ))
         
-        # Спрашиваем о подписи
+        # Сразу сообщаем о приеме и спрашиваем о подписи
         await status_message.edit_text(
-            f"📄 Документ {file_name} сохранён как\n{session.file_prefix}.{extension}\n\n"
+            f"📄 Документ {file_name} ({file_size_mb} МБ) получен и загружается в фоне.\n\n"
             "Хотите добавить подпись к документу?"
         )
         
         # Устанавливаем состояние ожидания подписи
-        state_manager.set_data(user_id, "awaiting_caption", True)
+        state_manager.set_data(user_id, AWAITING_TEXT, AWAITING_CAPTION)
         
     except Exception as e:
         logger.error(f"Ошибка при обработке документа: {str(e)}", exc_info=True)
         await status_message.edit_text(f"❌ Произошла ошибка при обработке документа: {str(e)}")
-        if 'tmp_path' in locals():
+        # После постановки в очередь временный файл принадлежит планировщику
+        if 'tmp_path' in locals() and delete_after and upload_job is None:
             try:
                 os.unlink(tmp_path)
             except:
@@ -3,12 +3,11 @@ import logging
 import tempfile
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.upload_scheduler import get_upload_scheduler, UploadJob, PRIORITY_PHOTO
 from src.utils.state_manager import state_manager
-from src.handlers.media_handlers.common import download_telegram_file
+from src.handlers.media_handlers.common import download_telegram_file, get_file_unique_id, AWAITING_TEXT, AWAITING_CAPTION
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id, file_name, session) -> None:
     """Обработчик фотографий"""
@@ -17,6 +16,8 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
     # Сообщаем о начале обработки
     status_message = await update.message.reply_text("🖼 Обрабатываю фото...")
     
+    upload_job = None
+    
     try:
         # Создаем временный файл
         with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
@@ -26,34 +27,50 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
         await download_telegram_file(context, file_id, tmp_path)
         
         # Путь для сохранения на Яндекс.Диске
-        yandex_path = session.get_media_path("jpg")
+        yandex_path = await session.get_media_path("jpg")
         
         # Определяем размер файла
         file_size = os.path.getsize(tmp_path)
         file_size_mb = round(file_size / (1024 * 1024), 2)
         
-        # Загружаем на Яндекс.Диск
-        logger.debug(f"Начинаем загрузку фото: {yandex_path}")
-        await status_message.edit_text(f"🖼 Загрузка фото ({file_size_mb} МБ)...")
+        async def on_complete(job):
+            if job.queued:
+                text = ("🕓 Яндекс.Диск недоступен, фото поставлено в очередь и загрузится позже как\n"
+                        f"{os.path.basename(job.remote_path)}")
+            else:
+                text = f"🖼 Фото сохранено как\n{os.path.basename(job.remote_path)}"
+            # Если подпись еще не прислали, продолжаем ее предлагать
+            if state_manager.get_data(user_id, AWAITING_TEXT) == AWAITING_CAPTION:
+                text += "\n\nХотите добавить подпись к фото?"
+            await status_message.edit_text(text)
         
-        yadisk_helper.upload_file(tmp_path, yandex_path)
+        async def on_error(job, error):
+            await status_message.edit_text(f"❌ Не удалось загрузить фото: {str(error)}")
         
-        # Удаляем временный файл
-        os.unlink(tmp_path)
+        # Ставим загрузку в очередь, временный файл удалит планировщик
+        logger.debug(f"Фото поставлено в очередь загрузки: {yandex_path}")
+        upload_job = await get_upload_scheduler().submit(UploadJob(
+            user_id, tmp_path, yandex_path,
+            priority=PRIORITY_PHOTO,
+            on_complete=on_complete,
+            on_error=on_error,
+            content_id=get_file_unique_id(update)
+        ))
         
-        # Спрашиваем о подписи
+        # Сразу сообщаем о приеме и спрашиваем о подписи
         await status_message.edit_text(
-            f"🖼 Фото сохранено как\n{session.file_prefix}.jpg\n\n"
+            f"🖼 Фото получено ({file_size_mb} МБ) и загружается в фоне.\n\n"
             "Хотите добавить подпись к фото?"
         )
         
         # Устанавливаем состояние ожидания подписи
-        state_manager.set_data(user_id, "awaiting_caption", True)
+        state_manager.set_data(user_id, AWAITING_TEXT, AWAITING_CAPTION)
         
     except Exception as e:
         logger.error(f"Ошибка при обработке фото: {str(e)}", exc_info=True)
         await status_message.edit_text(f"❌ Произошла ошибка при обработке фото: {str(e)}")
-        if 'tmp_path' in locals():
+        # После постановки в очередь временный файл принадлежит планировщику
+        if 'tmp_path' in locals() and upload_job is None:
             try:
                 os.unlink(tmp_path)
             except:
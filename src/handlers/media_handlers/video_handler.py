@@ -1,14 +1,12 @@
 import os
 import logging
-import tempfile
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.upload_scheduler import get_upload_scheduler, UploadJob, PRIORITY_VIDEO
 from src.utils.state_manager import state_manager
-from src.handlers.media_handlers.common import download_telegram_file
+from src.handlers.media_handlers.common import prepare_upload_source, get_file_unique_id, AWAITING_TEXT, AWAITING_CAPTION
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
 
 async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id, file_name, session) -> None:
     """Обработчик видео, с улучшенной обработкой для больших файлов"""
@@ -17,14 +15,11 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
     # Сообщаем о начале обработки
     status_message = await update.message.reply_text("🎬 Обрабатываю видео...")
     
+    upload_job = None
+    
     try:
-        # Создаем временный файл
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_path = tmp_file.name
-        
-        # Скачиваем файл
-        await status_message.edit_text("🎬 Скачиваю видео из Telegram...")
-        await download_telegram_file(context, file_id, tmp_path)
+        # Файл не скачиваем заранее: планировщик передаст его из Telegram на диск потоково
+        telegram_file, tmp_path, delete_after = await prepare_upload_source(context, file_id)
         
         # Узнаем расширение файла
         extension = "mp4"
@@ -32,21 +27,12 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
             extension = file_name.split(".")[-1]
         
         # Путь для сохранения на Яндекс.Диске
-        yandex_path = session.get_media_path(extension)
+        yandex_path = await session.get_media_path(extension)
         
         # Определяем размер файла
-        file_size = os.path.getsize(tmp_path)
+        file_size = telegram_file.file_size if telegram_file and telegram_file.file_size else os.path.getsize(tmp_path)
         file_size_mb = round(file_size / (1024 * 1024), 2)
         
-        # Специальное сообщение для больших видео
-        if file_size > 10 * 1024 * 1024:  # Больше 10МБ
-            await status_message.edit_text(
-                f"🎬 Загружаю видео на Яндекс.Диск ({file_size_mb} МБ)...\n"
-                f"Это может занять несколько минут. Пожалуйста, подождите."
-            )
-        else:
-            await status_message.edit_text(f"🎬 Загружаю видео ({file_size_mb} МБ)...")
-        
         # Добавляем информацию о прогрессе
         last_progress = 0
         
@@ -61,23 +47,44 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
                     status_message.edit_text(f"🎬 Загрузка видео: {progress}% завершено...")
                 )
         
-        # Загружаем на Яндекс.Диск с увеличенным таймаутом для видео
-        logger.debug(f"Начинаем загрузку видео на Яндекс.Диск: {yandex_path}")
+        async def on_complete(job):
+            if job.queued:
+                text = ("🕓 Яндекс.Диск недоступен, видео поставлено в очередь и загрузится позже как\n"
+                        f"{os.path.basename(job.remote_path)}")
+            else:
+                text = f"🎬 Видео сохранено как\n{os.path.basename(job.remote_path)}"
+            # Если подпись еще не прислали, продолжаем ее предлагать
+            if state_manager.get_data(user_id, AWAITING_TEXT) == AWAITING_CAPTION:
+                text += "\n\nХотите добавить подпись к видео?"
+            await status_message.edit_text(text)
         
-        # Используем увеличенный таймаут для видео
-        yadisk_helper.upload_file(tmp_path, yandex_path, progress_callback)
+        async def on_error(job, error):
+            await status_message.edit_text(
+                f"❌ Не удалось загрузить видео: {str(error)}\n"
+                "Возможно, файл слишком большой для загрузки. Попробуйте сжать видео перед отправкой."
+            )
         
-        # Удаляем временный файл
-        os.unlink(tmp_path)
+        # Видео загружается последним по приоритету, временный файл удалит планировщик
+        logger.debug(f"Видео поставлено в очередь загрузки: {yandex_path}")
+        upload_job = await get_upload_scheduler().submit(UploadJob(
+            user_id, tmp_path, yandex_path,
+            priority=PRIORITY_VIDEO,
+            progress_callback=progress_callback,
+            on_complete=on_complete,
+            on_error=on_error,
+            delete_after=delete_after,
+            telegram_file=telegram_file,
+            content_id=get_file_unique_id(update)
+        ))
         
-        # Спрашиваем о подписи
-        await status_message.edit_text(
-            f"🎬 Видео сохранено как\n{session.file_prefix}.{extension}\n\n"
-            "Хотите добавить подпись к видео?"
-        )
+        # Сразу сообщаем о приеме и спрашиваем о подписи
+        message = f"🎬 Видео получено ({file_size_mb} МБ) и загружается в фоне."
+        if file_size > 10 * 1024 * 1024:  # Больше 10МБ
+            message += "\nЭто может занять несколько минут."
+        await status_message.edit_text(f"{message}\n\nХотите добавить подпись к видео?")
         
         # Устанавливаем состояние ожидания подписи
-        state_manager.set_data(user_id, "awaiting_caption", True)
+        state_manager.set_data(user_id, AWAITING_TEXT, AWAITING_CAPTION)
         
     except Exception as e:
         logger.error(f"Ошибка при обработке видео: {str(e)}", exc_info=True)
@@ -85,7 +92,8 @@ async def handle_video(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
             f"❌ Произошла ошибка при обработке видео: {str(e)}\n"
             "Возможно, файл слишком большой для загрузки. Попробуйте сжать видео перед отправкой."
         )
-        if 'tmp_path' in locals():
+        # После постановки в очередь временный файл принадлежит планировщику
+        if 'tmp_path' in locals() and delete_after and upload_job is None:
             try:
                 os.unlink(tmp_path)
             except:
@@ -1,24 +1,98 @@
+import asyncio
 import os
 import logging
 import tempfile
-import time
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.async_yadisk import get_disk
 from src.utils.state_manager import state_manager
-from src.handlers.media_handlers.common import download_telegram_file
-from src.utils.speech_recognition import transcribe_audio
+from src.utils.upload_scheduler import get_upload_scheduler, UploadJob, PRIORITY_PHOTO
+from src.handlers.media_handlers.common import (
+    download_telegram_file, AWAITING_TEXT, AWAITING_TRANSCRIPTION, AWAITING_TRANSCRIPTION_EDIT,
+    TRANSCRIPTION_MESSAGE_ID
+)
+from src.utils.transcription_service import get_transcription_service
 
 logger = logging.getLogger(__name__)
-yadisk_helper = YaDiskHelper()
+
+class _VoiceStatus:
+    """
+    Сообщение со статусом голосового сообщения.
+    
+    Загрузка на Яндекс.Диск и распознавание идут параллельно, поэтому
+    каждая из них обновляет свою строку, а сообщение перерисовывается целиком.
+    """
+    def __init__(self, message, file_name):
+        self.message = message
+        self.file_name = file_name
+        self.upload_line = "📤 Загрузка на Яндекс.Диск: в очереди"
+        self.transcription_line = "🎙 Распознаю речь..."
+        self.footer = ""
+        self.upload_finished = False
+        self._last_progress = 0
+        self._lock = asyncio.Lock()
+    
+    def render(self) -> str:
+        text = f"🔉 Голосовое сообщение {self.file_name}\n\n{self.upload_line}\n{self.transcription_line}"
+        if self.footer:
+            text += f"\n\n{self.footer}"
+        return text
+    
+    async def refresh(self) -> None:
+        """Показывает текущее состояние; правки сериализуются, чтобы не затереть более новую"""
+        async with self._lock:
+            try:
+                await self.message.edit_text(self.render())
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    logger.warning(f"Не удалось обновить статус голосового сообщения: {e}")
+    
+    def upload_progress(self, progress) -> None:
+        """Обновляет строку загрузки (вызывается планировщиком в цикле событий)"""
+        if self.upload_finished or progress >= 100 or progress - self._last_progress < 20:
+            return
+        self._last_progress = progress
+        self.upload_line = f"📤 Загрузка на Яндекс.Диск: {progress}%"
+        asyncio.get_running_loop().create_task(self.refresh())
+    
+    async def upload_complete(self, job) -> None:
+        self.upload_finished = True
+        # Имя берем из задачи: при повторе или загрузке по ссылке файл мог сохраниться под другим путем
+        self.file_name = os.path.basename(job.remote_path)
+        if job.queued:
+            self.upload_line = "🕓 Яндекс.Диск недоступен: поставлено в очередь, загрузится позже"
+        else:
+            self.upload_line = "✅ Сохранено на Яндекс.Диск"
+        await self.refresh()
+    
+    async def upload_failed(self, job, error) -> None:
+        self.upload_finished = True
+        self.upload_line = f"❌ Не удалось загрузить на Яндекс.Диск: {str(error)}"
+        await self.refresh()
+
+def _remove_file(path) -> None:
+    """Удаляет временный файл, если он еще существует"""
+    try:
+        if os.path.exists(path):
+            os.unlink(path)
+    except OSError as e:
+        logger.warning(f"Не удалось удалить временный файл {path}: {e}")
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id, file_name, session) -> None:
-    """Обработчик голосовых сообщений"""
+    """Обработчик голосовых сообщений
+    
+    Загрузка файла на Яндекс.Диск и распознавание речи выполняются параллельно
+    из одного локального файла; расшифровка добавляется в отчёт, как только готова.
+    """
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     
     # Сообщаем о начале обработки
     status_message = await update.message.reply_text("🔉 Обрабатываю голосовое сообщение...")
     
+    upload_job = None
+    
     try:
         # Создаем временный файл
         with tempfile.NamedTemporaryFile(delete=False, suffix='.ogg') as tmp_file:
@@ -27,82 +101,92 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE, file_
         # Скачиваем файл
         await download_telegram_file(context, file_id, tmp_path)
         
-        # Добавляем уникальный идентификатор к пути файла на Яндекс.Диске
-        # Используем микросекунды и случайное число для полной уникальности
-        current_time = time.time()
-        microseconds = int((current_time - int(current_time)) * 1000000)
-        unique_id = f"{int(current_time)}_{microseconds}_{os.getpid()}"
-        modified_prefix = f"{session.file_prefix}_{unique_id}"
-        yandex_path = f"{session.folder_path}/{modified_prefix}.ogg"
-        
-        # Определяем размер файла
-        file_size = os.path.getsize(tmp_path)
-        file_size_mb = round(file_size / (1024 * 1024), 2)
-        
-        # Загружаем на Яндекс.Диск
-        logger.debug(f"Начинаем загрузку голосового сообщения: {yandex_path}")
-        await status_message.edit_text(f"🔉 Загрузка голосового сообщения ({file_size_mb} МБ)...")
+        # Путь для сохранения на Яндекс.Диске с очередным номером файла встречи
+        yandex_path = await session.get_media_path("ogg")
         
-        # Удаляем код для перезаписи - каждый файл должен быть уникальным
-        yadisk_helper.upload_file(tmp_path, yandex_path, overwrite=False)
+        status = _VoiceStatus(status_message, os.path.basename(yandex_path))
+        await status.refresh()
         
-        # Автоматическая расшифровка голосового сообщения
-        await status_message.edit_text("🎙 Распознаю речь...")
+        # Ставим загрузку в очередь. Файл нужен и для распознавания, поэтому
+        # планировщик его не удаляет - это делается после завершения обеих операций.
+        # Имя файла уникально, поэтому перезапись не используется
+        logger.debug(f"Голосовое сообщение поставлено в очередь загрузки: {yandex_path}")
+        upload_job = await get_upload_scheduler().submit(UploadJob(
+            user_id, tmp_path, yandex_path,
+            priority=PRIORITY_PHOTO,
+            overwrite=False,
+            progress_callback=status.upload_progress,
+            on_complete=status.upload_complete,
+            on_error=status.upload_failed,
+            delete_after=False
+        ))
         
-        # Производим транскрипцию аудио
-        transcription = transcribe_audio(tmp_path)
-        
-        # Удаляем временный файл
-        os.unlink(tmp_path)
+        # Производим транскрипцию аудио в пуле процессов распознавания параллельно с загрузкой;
+        # пересланное или повторно отправленное сообщение берется из кэша по file_unique_id
+        media = update.message.voice or update.message.audio
+        transcription = await get_transcription_service().transcribe(
+            tmp_path,
+            cache_key=media.file_unique_id if media else None
+        )
         
         if transcription:
-            # Добавляем расшифровку в файл встречи
-            yadisk_helper.append_to_text_file(
+            # Добавляем расшифровку в файл встречи, не дожидаясь окончания загрузки
+            await async_yadisk.append_to_text_file(
                 session.txt_file_path, 
                 f"Расшифровка голосового сообщения: {transcription}"
             )
             
             # Показываем результат пользователю и предлагаем отредактировать при необходимости
-            await status_message.edit_text(
-                f"✅ Голосовое сообщение сохранено как\n{modified_prefix}.ogg\n\n"
-                f"📝 Автоматическая расшифровка:\n{transcription}\n\n"
-                "Если расшифровка неточная, пришлите исправленный текст, и я обновлю отчёт:"
+            status.transcription_line = "📝 Расшифровка добавлена в отчёт"
+            status.footer = (
+                f"Автоматическая расшифровка:\n{transcription}\n\n"
+                "Если расшифровка неточная, ответьте на это сообщение исправленным текстом, и я обновлю отчёт"
             )
+            await status.refresh()
             
-            # Устанавливаем состояние ожидания возможного редактирования расшифровки
-            state_manager.set_data(user_id, "awaiting_transcription_edit", True)
+            # Исправлением будет считаться только ответ на это сообщение
+            state_manager.set_data(user_id, AWAITING_TEXT, AWAITING_TRANSCRIPTION_EDIT)
+            state_manager.set_data(user_id, TRANSCRIPTION_MESSAGE_ID, status_message.message_id)
         else:
             # Если автоматическая расшифровка не удалась, просим пользователя ввести текст вручную
-            await status_message.edit_text(
-                f"🔉 Голосовое сообщение сохранено как\n{modified_prefix}.ogg\n\n"
-                "⚠️ Не удалось автоматически распознать текст.\n"
-                "Напишите расшифровку текста голосового сообщения, и я добавлю её в отчёт:"
-            )
+            status.transcription_line = "⚠️ Не удалось автоматически распознать текст."
+            status.footer = "Напишите расшифровку текста голосового сообщения, и я добавлю её в отчёт:"
+            await status.refresh()
             
             # Устанавливаем состояние ожидания расшифровки
-            state_manager.set_data(user_id, "awaiting_transcription", True)
+            state_manager.set_data(user_id, AWAITING_TEXT, AWAITING_TRANSCRIPTION)
         
     except Exception as e:
         logger.error(f"Ошибка при обработке голосового сообщения: {str(e)}", exc_info=True)
         await status_message.edit_text(f"❌ Произошла ошибка при обработке голосового сообщения: {str(e)}")
+    finally:
         if 'tmp_path' in locals():
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+            if upload_job is None:
+                _remove_file(tmp_path)
+            else:
+                # Распознавание закончено, файл удаляется после загрузки
+                upload_job.done.add_done_callback(lambda _: _remove_file(tmp_path))
+
+def is_transcription_reply(update: Update) -> bool:
+    """Проверяет, что текст отправлен ответом на сообщение с автоматической расшифровкой"""
+    reply_to = update.message.reply_to_message
+    return (reply_to is not None
+            and reply_to.message_id == state_manager.get_data(update.effective_user.id, TRANSCRIPTION_MESSAGE_ID))
+
+def stop_awaiting_transcription_edit(user_id: int) -> None:
+    """Снимает ожидание исправленной расшифровки"""
+    state_manager.remove_data(user_id, AWAITING_TEXT)
+    state_manager.remove_data(user_id, TRANSCRIPTION_MESSAGE_ID)
 
-async def process_transcription(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def process_transcription(update: Update, context: ContextTypes.DEFAULT_TYPE, session) -> None:
     """Обрабатывает расшифровку голосового сообщения, введенную пользователем"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     transcription = update.message.text
-    session = state_manager.get_session(user_id)
     
-    if not session:
-        return
-        
     try:
         # Добавляем расшифровку в файл встречи
-        yadisk_helper.append_to_text_file(
+        await async_yadisk.append_to_text_file(
             session.txt_file_path, 
             f"Расшифровка голосового сообщения: {transcription}"
         )
@@ -112,21 +196,18 @@ async def process_transcription(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text(f"❌ Произошла ошибка: {str(e)}")
     
     # Сбрасываем состояние ожидания
-    state_manager.set_data(user_id, "awaiting_transcription", False)
+    state_manager.remove_data(user_id, AWAITING_TEXT)
 
-async def process_transcription_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def process_transcription_edit(update: Update, context: ContextTypes.DEFAULT_TYPE, session) -> None:
     """Обрабатывает исправленную расшифровку голосового сообщения"""
+    async_yadisk = get_disk(context)
     user_id = update.effective_user.id
     improved_transcription = update.message.text
-    session = state_manager.get_session(user_id)
     
-    if not session:
-        return
-        
     try:
         # Обновляем расшифровку в файле встречи
         # Сначала добавляем примечание, что расшифровка была отредактирована
-        yadisk_helper.append_to_text_file(
+        await async_yadisk.append_to_text_file(
             session.txt_file_path, 
             f"Исправленная расшифровка голосового сообщения: {improved_transcription}"
         )
@@ -136,4 +217,4 @@ async def process_transcription_edit(update: Update, context: ContextTypes.DEFAU
         await update.message.reply_text(f"❌ Произошла ошибка: {str(e)}")
     
     # Сбрасываем состояние ожидания редактирования
-    state_manager.set_data(user_id, "awaiting_transcription_edit", False) 
\ No newline at end of file
+    stop_awaiting_transcription_edit(user_id) 
\ No newline at end of file
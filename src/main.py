@@ -15,6 +15,7 @@ from telegram.ext import (
     CallbackQueryHandler,
     ConversationHandler, 
     MessageHandler, 
+    TypeHandler,
     filters
 )
 from telegram.error import TelegramError, NetworkError
@@ -25,11 +26,10 @@ from config.logging_config import configure_logging
 from src.handlers.command_handler import (
     start, help_command, new_meeting, handle_category, navigate_folders,
     switch_meeting, current_meeting, cancel, create_folder,
-    handle_session_callback, end_session_and_show_summary,
+    handle_session_callback, end_session_and_show_summary, record_activity, sweep_idle_sessions,
     CHOOSE_FOLDER, NAVIGATE_SUBFOLDERS, CREATE_FOLDER
 )
 from src.handlers.file_handler import handle_message, handle_text, handle_file
-from src.handlers.media_handlers.voice_handler import process_transcription, process_transcription_edit
 from src.handlers.media_handlers.photo_handler import handle_photo
 from src.handlers.media_handlers.video_handler import handle_video
 from src.handlers.media_handlers.document_handler import handle_document
@@ -46,7 +46,12 @@ from src.handlers.admin_handler import (
 )
 from src.utils.session_utils import SESSION_TIMEOUT
 from src.utils.error_utils import handle_error
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.yadisk_helper import get_yadisk_helper
+from src.utils.async_yadisk import register_disk_clients, get_disk
+from src.utils.transcription_service import get_transcription_service
+from src.utils.update_processor import UserOrderedUpdateProcessor
+from src.utils.state_manager import state_manager
+from src.utils.activity_tracker import get_activity_tracker
 
 # Настройка логирования
 configure_logging()
@@ -55,11 +60,24 @@ logger = logging.getLogger(__name__)
 # Путь к файлу блокировки
 LOCK_FILE = os.path.join(DATA_DIR, 'bot.lock')
 
-# Глобальный объект YaDiskHelper
+# Общий для всех обработчиков объект YaDiskHelper
 yadisk_helper = None
 
 def cleanup():
     """Очистка ресурсов при выходе"""
+    # Отправляем на Яндекс.Диск несинхронизированные файлы встреч
+    if yadisk_helper is not None:
+        try:
+            yadisk_helper.meeting_logs.flush_all()
+        except Exception as e:
+            logger.error(f"Ошибка при синхронизации файлов встреч: {e}")
+        yadisk_helper.outbox.stop()
+    
+    get_transcription_service().stop()
+    
+    # Записываем последние изменения сессий пользователей
+    state_manager.close()
+    
     try:
         if os.path.exists(LOCK_FILE):
             os.remove(LOCK_FILE)
@@ -95,6 +113,18 @@ async def global_error_handler(update: Update, context) -> None:
     # Обработка всех остальных ошибок
     await handle_error(update, error, context.bot)
 
+async def post_init(application: Application) -> None:
+    """Запускает фоновые задачи в цикле событий приложения"""
+    tracker = get_activity_tracker()
+    # Восстановленные встречи отсчитывают простой с момента запуска
+    for user_id in state_manager.sessions:
+        tracker.touch(user_id)
+    tracker.start(lambda: sweep_idle_sessions(application.bot, get_disk(application)))
+
+async def post_shutdown(application: Application) -> None:
+    """Останавливает фоновые задачи"""
+    await get_activity_tracker().stop()
+
 def main() -> None:
     """Основная функция для запуска бота"""
     # Парсинг аргументов командной строки
@@ -131,9 +161,9 @@ def main() -> None:
     with open(LOCK_FILE, "w") as f:
         f.write(str(os.getpid()))
     
-    # Инициализируем глобальный объект YaDiskHelper
+    # Инициализируем общий объект YaDiskHelper - режим работы действует для всех обработчиков
     global yadisk_helper
-    yadisk_helper = YaDiskHelper(skip_connection_check=True)
+    yadisk_helper = get_yadisk_helper()
     
     # Если указан флаг офлайн-режима, принудительно переключаем
     if args.offline:
@@ -146,6 +176,12 @@ def main() -> None:
             logger.warning("Не удалось установить соединение с Яндекс.Диском. Бот будет работать в офлайн-режиме.")
         else:
             logger.info("Соединение с Яндекс.Диском установлено успешно.")
+        
+        # Фоновая отправка операций, отложенных из-за недоступности диска
+        yadisk_helper.outbox.start()
+    
+    # Файлы встреч, не отправленные до перезапуска, синхронизируются в фоне
+    yadisk_helper.meeting_logs.restore()
     
     # Получаем токен бота
     token = TELEGRAM_TOKEN
@@ -162,12 +198,32 @@ def main() -> None:
         # Проверка конфигурации
         validate_config()
         
-        # Настройка приложения Telegram
-        application = Application.builder().token(token).build()
+        # Настройка приложения Telegram: обновления разных пользователей обрабатываются параллельно,
+        # а обновления одного пользователя - по порядку
+        application = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(UserOrderedUpdateProcessor())
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
+        
+        # Восстанавливаем активные встречи, прерванные перезапуском
+        state_manager.restore()
+        
+        # Передаем общие клиенты Яндекс.Диска обработчикам через bot_data
+        register_disk_clients(application)
+        
+        # Запускаем процессы распознавания речи заранее, чтобы первое голосовое сообщение не ждало загрузки модели
+        get_transcription_service().start()
         
         # Регистрация глобального обработчика ошибок
         application.add_error_handler(global_error_handler)
         
+        # Отмечаем активность пользователя для каждого обновления до остальных обработчиков
+        application.add_handler(TypeHandler(Update, record_activity), group=-1)
+        
         # Команды для всех пользователей
         application.add_handler(CommandHandler("start", start))
         application.add_handler(CommandHandler("help", help_command))
@@ -199,24 +255,11 @@ def main() -> None:
         application.add_handler(CommandHandler("end", end_session_and_show_summary))
         
         # Обработчик callback-запросов (нажатий на кнопки)
-        application.add_handler(CallbackQueryHandler(handle_session_callback, pattern=r'^session_'))
+        application.add_handler(CallbackQueryHandler(handle_session_callback, pattern=r'^(end_session|extend_session)$'))
         
-        # Добавляем обработчики текстовых сообщений
+        # Обработчик текстовых сообщений: подписи и расшифровки он передает по состоянию пользователя
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
         
-        # Обработчики исправленной транскрипции голосовых сообщений
-        application.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, 
-            process_transcription_edit, 
-            block=False
-        ))
-        
-        application.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, 
-            process_transcription, 
-            block=False
-        ))
-        
         # Обработчики медиафайлов
         application.add_handler(MessageHandler(filters.PHOTO, lambda update, context: handle_file(update, context, handle_photo)))
         application.add_handler(MessageHandler(filters.VOICE, lambda update, context: handle_file(update, context, handle_voice)))
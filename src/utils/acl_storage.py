@@ -0,0 +1,499 @@
+"""
+Модуль с хранилищами списков доступа (пользователи, папки и права на папки).
+Поддерживаются JSON-файлы (исходный формат) и база SQLite, в которой
+каждое изменение выполняется отдельной транзакцией без перезаписи всех данных.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+
+from config.config import ACL_STORAGE, ACL_DB_FILE, FOLDERS_FILE, USERS_FILE
+
+logger = logging.getLogger(__name__)
+
+# Поля пользователя, которые хранятся в отдельных столбцах
+_USER_COLUMNS = ('username', 'first_name', 'last_name', 'added_at')
+
+
+class AclStorage(ABC):
+    """
+    Базовый класс хранилища списков доступа.
+
+    Папка представлена словарем {'path': ..., 'allowed_users': [...]}, где пустой
+    список allowed_users означает доступ для всех. Пользователь - словарь с ключом 'id'.
+    """
+
+    @abstractmethod
+    def folders_version(self) -> Hashable:
+        """Возвращает отметку, которая меняется при любом изменении списка папок"""
+
+    @abstractmethod
+    def users_version(self) -> Hashable:
+        """Возвращает отметку, которая меняется при любом изменении списка пользователей"""
+
+    @abstractmethod
+    def load_folders(self) -> List[Dict[str, Any]]:
+        """Возвращает список папок в порядке добавления"""
+
+    @abstractmethod
+    def load_users(self) -> List[Dict[str, Any]]:
+        """Возвращает список пользователей в порядке добавления"""
+
+    @abstractmethod
+    def replace_folders(self, folders: List[Dict[str, Any]]) -> None:
+        """Полностью заменяет список папок"""
+
+    @abstractmethod
+    def replace_users(self, users: List[Dict[str, Any]]) -> None:
+        """Полностью заменяет список пользователей"""
+
+    @abstractmethod
+    def add_folder(self, path: str, user_ids: List[int]) -> bool:
+        """Добавляет папку; возвращает False, если она уже есть"""
+
+    @abstractmethod
+    def remove_folder(self, path: str) -> bool:
+        """Удаляет папку; возвращает False, если ее нет"""
+
+    @abstractmethod
+    def set_folder_users(self, path: str, user_ids: List[int]) -> bool:
+        """Заменяет список пользователей папки; возвращает False, если папки нет"""
+
+    @abstractmethod
+    def add_folder_user(self, path: str, user_id: int) -> bool:
+        """Разрешает пользователю доступ к папке; возвращает False, если папки нет"""
+
+    @abstractmethod
+    def remove_folder_user(self, path: str, user_id: int) -> bool:
+        """Запрещает пользователю доступ к папке; возвращает False, если папки нет"""
+
+    @abstractmethod
+    def add_user(self, user: Dict[str, Any]) -> bool:
+        """Добавляет пользователя; возвращает False, если он уже есть"""
+
+    @abstractmethod
+    def remove_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Удаляет пользователя и его права на папки; возвращает удаленную запись"""
+
+    @abstractmethod
+    def update_user(self, user_id: int, fields: Dict[str, Any]) -> bool:
+        """Обновляет поля пользователя; возвращает False, если его нет"""
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """Записывает JSON во временный файл и атомарно заменяет им исходный"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_json_list(path: Path, name: str) -> List[Dict[str, Any]]:
+    """Читает список из JSON-файла, создавая пустой файл при его отсутствии"""
+    try:
+        if not os.path.exists(path):
+            _write_json_atomic(path, [])
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке {name}: {str(e)}")
+        return []
+
+
+def _file_stamp(path: Path) -> Optional[tuple]:
+    """Возвращает отметку изменения файла или None, если файла нет"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class JsonAclStorage(AclStorage):
+    """
+    Хранилище в JSON-файлах allowed_folders.json и allowed_users.json.
+
+    Каждое изменение перечитывает и перезаписывает файл целиком, но под блокировкой
+    и с атомарной заменой файла, поэтому параллельные изменения не теряются.
+    """
+    def __init__(self, folders_file: Path = FOLDERS_FILE, users_file: Path = USERS_FILE):
+        self.folders_file = Path(folders_file)
+        self.users_file = Path(users_file)
+        self._lock = threading.RLock()
+
+    def folders_version(self) -> Hashable:
+        return _file_stamp(self.folders_file)
+
+    def users_version(self) -> Hashable:
+        return _file_stamp(self.users_file)
+
+    def load_folders(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return _read_json_list(self.folders_file, "разрешенных папок")
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return _read_json_list(self.users_file, "разрешенных пользователей")
+
+    def replace_folders(self, folders: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            _write_json_atomic(self.folders_file, folders)
+
+    def replace_users(self, users: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            _write_json_atomic(self.users_file, users)
+
+    def _update_folder(self, path: str, update) -> bool:
+        """Изменяет одну папку функцией update под блокировкой"""
+        with self._lock:
+            folders = self.load_folders()
+            for folder in folders:
+                if folder['path'] == path:
+                    update(folder)
+                    self.replace_folders(folders)
+                    return True
+            return False
+
+    def add_folder(self, path: str, user_ids: List[int]) -> bool:
+        with self._lock:
+            folders = self.load_folders()
+            if any(folder['path'] == path for folder in folders):
+                return False
+            folders.append({'path': path, 'allowed_users': list(user_ids)})
+            self.replace_folders(folders)
+            return True
+
+    def remove_folder(self, path: str) -> bool:
+        with self._lock:
+            folders = self.load_folders()
+            new_folders = [folder for folder in folders if folder['path'] != path]
+            if len(new_folders) == len(folders):
+                return False
+            self.replace_folders(new_folders)
+            return True
+
+    def set_folder_users(self, path: str, user_ids: List[int]) -> bool:
+        return self._update_folder(path, lambda folder: folder.__setitem__('allowed_users', list(user_ids)))
+
+    def add_folder_user(self, path: str, user_id: int) -> bool:
+        def update(folder):
+            if user_id not in folder['allowed_users']:
+                folder['allowed_users'].append(user_id)
+        return self._update_folder(path, update)
+
+    def remove_folder_user(self, path: str, user_id: int) -> bool:
+        def update(folder):
+            if user_id in folder['allowed_users']:
+                folder['allowed_users'].remove(user_id)
+        return self._update_folder(path, update)
+
+    def add_user(self, user: Dict[str, Any]) -> bool:
+        with self._lock:
+            users = self.load_users()
+            if any(existing['id'] == user['id'] for existing in users):
+                return False
+            users.append(dict(user))
+            self.replace_users(users)
+            return True
+
+    def remove_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            users = self.load_users()
+            removed = next((user for user in users if user['id'] == user_id), None)
+            if removed is None:
+                return None
+
+            # Также удаляем пользователя из всех папок
+            folders = self.load_folders()
+            for folder in folders:
+                if user_id in folder['allowed_users']:
+                    folder['allowed_users'].remove(user_id)
+            self.replace_folders(folders)
+            self.replace_users([user for user in users if user['id'] != user_id])
+            return removed
+
+    def update_user(self, user_id: int, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            users = self.load_users()
+            for user in users:
+                if user['id'] == user_id:
+                    user.update(fields)
+                    self.replace_users(users)
+                    return True
+            return False
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL UNIQUE,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    added_at TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS folders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS folder_users (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder_path TEXT NOT NULL REFERENCES folders (path) ON DELETE CASCADE ON UPDATE CASCADE,
+    user_id INTEGER NOT NULL,
+    UNIQUE (folder_path, user_id)
+);
+CREATE INDEX IF NOT EXISTS folder_users_by_user ON folder_users (user_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteAclStorage(AclStorage):
+    """
+    Хранилище в базе SQLite (режим WAL).
+
+    Папки, пользователи и права хранятся в отдельных индексированных таблицах,
+    поэтому изменение одного права - это одна короткая транзакция.
+    """
+    def __init__(self, db_path: Path = ACL_DB_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        # Счетчики собственных изменений: data_version отражает только изменения других соединений
+        self._folders_changes = 0
+        self._users_changes = 0
+
+    def _transaction(self, sql_func, tables: str = "folders"):
+        """Выполняет функцию в транзакции и отмечает изменение таблиц"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = sql_func(self._conn)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if "folders" in tables:
+                self._folders_changes += 1
+            if "users" in tables:
+                self._users_changes += 1
+            return result
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def folders_version(self) -> Hashable:
+        with self._lock:
+            return (self._data_version(), self._folders_changes)
+
+    def users_version(self) -> Hashable:
+        with self._lock:
+            return (self._data_version(), self._users_changes)
+
+    def load_folders(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            folders = [
+                {'path': row['path'], 'allowed_users': []}
+                for row in self._conn.execute("SELECT path FROM folders ORDER BY seq")
+            ]
+            by_path = {folder['path']: folder for folder in folders}
+            for row in self._conn.execute("SELECT folder_path, user_id FROM folder_users ORDER BY seq"):
+                by_path[row['folder_path']]['allowed_users'].append(row['user_id'])
+            return folders
+
+    @staticmethod
+    def _user_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        user = {'id': row['id']}
+        for column in _USER_COLUMNS:
+            user[column] = row[column]
+        if row['extra']:
+            user.update(json.loads(row['extra']))
+        return user
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._user_from_row(row) for row in self._conn.execute("SELECT * FROM users ORDER BY seq")]
+
+    @staticmethod
+    def _insert_folder(conn: sqlite3.Connection, path: str, user_ids: List[int]) -> None:
+        conn.execute("INSERT INTO folders (path) VALUES (?)", (path,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO folder_users (folder_path, user_id) VALUES (?, ?)",
+            [(path, user_id) for user_id in user_ids]
+        )
+
+    @staticmethod
+    def _insert_user(conn: sqlite3.Connection, user: Dict[str, Any]) -> None:
+        extra = {key: value for key, value in user.items() if key != 'id' and key not in _USER_COLUMNS}
+        conn.execute(
+            "INSERT INTO users (id, username, first_name, last_name, added_at, extra) VALUES (?, ?, ?, ?, ?, ?)",
+            (user['id'], *(user.get(column) for column in _USER_COLUMNS), json.dumps(extra, ensure_ascii=False) if extra else None)
+        )
+
+    def replace_folders(self, folders: List[Dict[str, Any]]) -> None:
+        def replace(conn):
+            conn.execute("DELETE FROM folders")
+            for folder in folders:
+                self._insert_folder(conn, folder['path'], folder.get('allowed_users') or [])
+        self._transaction(replace)
+
+    def replace_users(self, users: List[Dict[str, Any]]) -> None:
+        def replace(conn):
+            conn.execute("DELETE FROM users")
+            for user in users:
+                self._insert_user(conn, user)
+        self._transaction(replace, tables="users")
+
+    def add_folder(self, path: str, user_ids: List[int]) -> bool:
+        def add(conn):
+            try:
+                self._insert_folder(conn, path, user_ids)
+                return True
+            except sqlite3.IntegrityError:
+                return False
+        return self._transaction(add)
+
+    def remove_folder(self, path: str) -> bool:
+        return self._transaction(lambda conn: conn.execute("DELETE FROM folders WHERE path = ?", (path,)).rowcount > 0)
+
+    @staticmethod
+    def _folder_exists(conn: sqlite3.Connection, path: str) -> bool:
+        return conn.execute("SELECT 1 FROM folders WHERE path = ?", (path,)).fetchone() is not None
+
+    def set_folder_users(self, path: str, user_ids: List[int]) -> bool:
+        def update(conn):
+            if not self._folder_exists(conn, path):
+                return False
+            conn.execute("DELETE FROM folder_users WHERE folder_path = ?", (path,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO folder_users (folder_path, user_id) VALUES (?, ?)",
+                [(path, user_id) for user_id in user_ids]
+            )
+            return True
+        return self._transaction(update)
+
+    def add_folder_user(self, path: str, user_id: int) -> bool:
+        def add(conn):
+            if not self._folder_exists(conn, path):
+                return False
+            conn.execute("INSERT OR IGNORE INTO folder_users (folder_path, user_id) VALUES (?, ?)", (path, user_id))
+            return True
+        return self._transaction(add)
+
+    def remove_folder_user(self, path: str, user_id: int) -> bool:
+        def remove(conn):
+            if not self._folder_exists(conn, path):
+                return False
+            conn.execute("DELETE FROM folder_users WHERE folder_path = ? AND user_id = ?", (path, user_id))
+            return True
+        return self._transaction(remove)
+
+    def add_user(self, user: Dict[str, Any]) -> bool:
+        def add(conn):
+            try:
+                self._insert_user(conn, user)
+                return True
+            except sqlite3.IntegrityError:
+                return False
+        return self._transaction(add, tables="users")
+
+    def remove_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        def remove(conn):
+            row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            # Также удаляем пользователя из всех папок
+            conn.execute("DELETE FROM folder_users WHERE user_id = ?", (user_id,))
+            return self._user_from_row(row)
+        return self._transaction(remove, tables="folders,users")
+
+    def update_user(self, user_id: int, fields: Dict[str, Any]) -> bool:
+        def update(conn):
+            row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None:
+                return False
+            user = self._user_from_row(row)
+            user.update(fields)
+            extra = {key: value for key, value in user.items() if key != 'id' and key not in _USER_COLUMNS}
+            conn.execute(
+                "UPDATE users SET username = ?, first_name = ?, last_name = ?, added_at = ?, extra = ? WHERE id = ?",
+                (*(user.get(column) for column in _USER_COLUMNS), json.dumps(extra, ensure_ascii=False) if extra else None, user_id)
+            )
+            return True
+        return self._transaction(update, tables="users")
+
+    def import_from_json(self, folders_file: Path = FOLDERS_FILE, users_file: Path = USERS_FILE) -> bool:
+        """
+        Однократно переносит данные из JSON-файлов в базу.
+
+        Импорт выполняется одной транзакцией и только если он еще не выполнялся;
+        JSON-файлы остаются на месте как резервная копия.
+
+        Returns:
+            bool: True, если данные были импортированы
+        """
+        def do_import(conn):
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone() is not None:
+                return False
+            folders = _read_json_list(folders_file, "разрешенных папок") if os.path.exists(folders_file) else []
+            users = _read_json_list(users_file, "разрешенных пользователей") if os.path.exists(users_file) else []
+            for folder in folders:
+                if not self._folder_exists(conn, folder['path']):
+                    self._insert_folder(conn, folder['path'], folder.get('allowed_users') or [])
+            for user in users:
+                if conn.execute("SELECT 1 FROM users WHERE id = ?", (user['id'],)).fetchone() is None:
+                    self._insert_user(conn, user)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (str(len(folders) + len(users)),))
+            logger.info(f"Списки доступа импортированы из JSON: {len(folders)} папок, {len(users)} пользователей")
+            return True
+        return self._transaction(do_import, tables="folders,users")
+
+
+# Единственное хранилище на процесс
+_acl_storage: Optional[AclStorage] = None
+_acl_storage_lock = threading.Lock()
+
+
+def get_acl_storage() -> AclStorage:
+    """Возвращает хранилище списков доступа, выбранное в настройке ACL_STORAGE"""
+    global _acl_storage
+    if _acl_storage is None:
+        with _acl_storage_lock:
+            if _acl_storage is None:
+                if ACL_STORAGE == "sqlite":
+                    storage = SqliteAclStorage()
+                    storage.import_from_json()
+                elif ACL_STORAGE == "json":
+                    storage = JsonAclStorage()
+                else:
+                    raise ValueError(f"Неизвестное хранилище списков доступа: {ACL_STORAGE}")
+                logger.info(f"Хранилище списков доступа: {ACL_STORAGE}")
+                _acl_storage = storage
+    return _acl_storage
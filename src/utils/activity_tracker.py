@@ -0,0 +1,95 @@
+"""
+Модуль с учетом активности пользователей.
+Время последней активности обновляется на каждом обновлении Telegram,
+а одна фоновая задача периодически находит простаивающих пользователей
+вместо отдельного таймера на каждую встречу.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from config.config import SESSION_IDLE_TIMEOUT, SESSION_SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """
+    Время последней активности пользователей.
+
+    Пользователи хранятся в порядке последней активности, поэтому touch()
+    стоит O(1), а pop_idle() просматривает только простаивающих дольше
+    idle_timeout. Найденный пользователь перестает отслеживаться до
+    следующей активности, так что напоминание отправляется один раз.
+    """
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT, sweep_interval: float = SESSION_SWEEP_INTERVAL):
+        """
+        Args:
+            idle_timeout: Время без активности, после которого пользователь считается простаивающим (сек)
+            sweep_interval: Интервал проверки простаивающих пользователей (сек)
+        """
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        # Ключ: user_id, Значение: время последней активности (time.monotonic)
+        self._last_activity: "OrderedDict[int, float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id: int) -> None:
+        """Отмечает активность пользователя"""
+        self._last_activity[user_id] = time.monotonic()
+        self._last_activity.move_to_end(user_id)
+
+    def forget(self, user_id: int) -> None:
+        """Перестает отслеживать пользователя"""
+        self._last_activity.pop(user_id, None)
+
+    def pop_idle(self) -> List[int]:
+        """Возвращает пользователей, простаивающих дольше idle_timeout, и перестает их отслеживать"""
+        deadline = time.monotonic() - self.idle_timeout
+        idle = []
+        while self._last_activity:
+            user_id, last_activity = next(iter(self._last_activity.items()))
+            if last_activity > deadline:
+                break
+            self._last_activity.popitem(last=False)
+            idle.append(user_id)
+        return idle
+
+    def start(self, sweep: Callable[[], Awaitable[None]]) -> None:
+        """Запускает периодическую проверку в текущем цикле событий"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(sweep), name="activity-sweeper")
+            logger.info(f"Проверка неактивных встреч запущена: каждые {self.sweep_interval} сек")
+
+    async def _run(self, sweep: Callable[[], Awaitable[None]]) -> None:
+        """Вызывает sweep раз в sweep_interval"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при проверке неактивных встреч: {str(e)}", exc_info=True)
+
+    async def stop(self) -> None:
+        """Останавливает периодическую проверку"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Единственный учет активности на процесс бота
+_activity_tracker: Optional[ActivityTracker] = None
+
+
+def get_activity_tracker() -> ActivityTracker:
+    """Возвращает учет активности пользователей"""
+    global _activity_tracker
+    if _activity_tracker is None:
+        _activity_tracker = ActivityTracker()
+    return _activity_tracker
@@ -1,47 +1,118 @@
-import json
+import heapq
 import logging
-from config.config import DATA_DIR, FOLDERS_FILE, USERS_FILE
+from config.config import DATA_DIR
+from src.utils.acl_storage import get_acl_storage
 import os
 from typing import Dict, List, Optional, Any, Tuple, Set, Union
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-# Кеш данных для минимизации обращений к файловой системе
+# Кеш данных для минимизации обращений к хранилищу.
+# Хранит кортеж (версия хранилища, индекс) и сбрасывается при изменении данных
 _allowed_folders_cache = None
 _allowed_users_cache = None
 
+class FolderPermissionIndex:
+    """Индекс прав доступа к папкам
+    
+    Папки с пустым списком allowed_users доступны всем и хранятся отдельно,
+    остальные индексируются в обе стороны: пользователь -> папки и папка -> пользователи.
+    """
+    def __init__(self, folders):
+        self.folders = folders
+        self.by_path = {}
+        # Позиции папок сохраняются, чтобы выдавать их в порядке файла
+        self.open_folders = []
+        self.folders_by_user: Dict[int, List[Tuple[int, str]]] = {}
+        self.users_by_folder: Dict[str, Set[int]] = {}
+        
+        for position, folder in enumerate(folders):
+            path = folder['path']
+            self.by_path[path] = folder
+            allowed_users = folder.get('allowed_users') or []
+            if not allowed_users:
+                self.open_folders.append((position, path))
+                continue
+            self.users_by_folder[path] = set(allowed_users)
+            for user_id in self.users_by_folder[path]:
+                self.folders_by_user.setdefault(user_id, []).append((position, path))
+    
+    def folders_for_user(self, user_id) -> List[str]:
+        """Возвращает папки, доступные пользователю, в порядке файла"""
+        restricted = self.folders_by_user.get(user_id, [])
+        return [path for _, path in heapq.merge(self.open_folders, restricted)]
+    
+    def is_allowed(self, folder_path, user_id) -> bool:
+        """Проверяет, доступна ли папка пользователю"""
+        if folder_path not in self.by_path:
+            return False
+        users = self.users_by_folder.get(folder_path)
+        return users is None or user_id in users
+
+class UserIndex:
+    """Индекс разрешенных пользователей по ID"""
+    def __init__(self, users):
+        self.users = users
+        self.by_id = {user['id']: user for user in users}
+
+def _get_folder_index() -> FolderPermissionIndex:
+    """Возвращает индекс папок, перечитывая хранилище только после его изменения"""
+    global _allowed_folders_cache
+    storage = get_acl_storage()
+    stamp = storage.folders_version()
+    if _allowed_folders_cache is None or _allowed_folders_cache[0] != stamp:
+        index = FolderPermissionIndex(storage.load_folders())
+        _allowed_folders_cache = (stamp, index)
+    return _allowed_folders_cache[1]
+
+def _get_user_index() -> UserIndex:
+    """Возвращает индекс пользователей, перечитывая хранилище только после его изменения"""
+    global _allowed_users_cache
+    storage = get_acl_storage()
+    stamp = storage.users_version()
+    if _allowed_users_cache is None or _allowed_users_cache[0] != stamp:
+        index = UserIndex(storage.load_users())
+        _allowed_users_cache = (stamp, index)
+    return _allowed_users_cache[1]
+
+def _reset_indexes():
+    """Сбрасывает индексы после изменения; они будут построены заново при следующем обращении"""
+    global _allowed_folders_cache, _allowed_users_cache
+    _allowed_folders_cache = None
+    _allowed_users_cache = None
+
 def ensure_data_dir_exists():
     """Проверяет существование директории для данных и создает ее при необходимости."""
     os.makedirs(DATA_DIR, exist_ok=True)
 
 def load_allowed_folders():
-    """Загружает список разрешенных папок из файла"""
-    try:
-        # Проверяем существование файла и директории
-        ensure_data_dir_exists()
-        if not os.path.exists(FOLDERS_FILE):
-            # Если файл не существует, создаем его с пустым списком
-            with open(FOLDERS_FILE, 'w') as f:
-                json.dump([], f)
-            return []
-        
-        # Если файл существует, загружаем данные
-        with open(FOLDERS_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Ошибка при загрузке разрешенных папок: {str(e)}")
-        return []
+    """Возвращает копию списка разрешенных папок, которую можно изменять и сохранять"""
+    return [
+        dict(folder, allowed_users=list(folder.get('allowed_users') or []))
+        for folder in _get_folder_index().folders
+    ]
 
 def save_allowed_folders(folders):
-    """Сохраняет список разрешенных папок в файл"""
+    """Сохраняет список разрешенных папок целиком"""
     try:
-        with open(FOLDERS_FILE, 'w') as f:
-            json.dump(folders, f, ensure_ascii=False, indent=2)
+        get_acl_storage().replace_folders(folders)
         return True
     except Exception as e:
         logger.error(f"Ошибка при сохранении разрешенных папок: {str(e)}")
         return False
+    finally:
+        _reset_indexes()
+
+def _change_folders(change):
+    """Выполняет изменение в хранилище; возвращает результат или None при ошибке"""
+    try:
+        return change(get_acl_storage())
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении разрешенных папок: {str(e)}")
+        return None
+    finally:
+        _reset_indexes()
 
 def add_allowed_folder(folder_path, user_ids=None):
     """Добавляет папку в список разрешенных
@@ -50,148 +121,78 @@ def add_allowed_folder(folder_path, user_ids=None):
         folder_path: Путь к папке
         user_ids: Список ID пользователей, которым разрешен доступ (если None - всем)
     """
-    folders = load_allowed_folders()
-    
-    # Проверяем, есть ли уже такая папка
-    for folder in folders:
-        if folder['path'] == folder_path:
-            # Если папка существует, обновляем список пользователей
-            if user_ids is not None:
-                folder['allowed_users'] = user_ids
-                if save_allowed_folders(folders):
-                    return True, f"Обновлены права доступа для папки {folder_path}"
-                else:
-                    return False, "Ошибка при сохранении папок"
-            return False, "Эта папка уже в списке разрешенных"
-    
-    # Добавляем новую папку
-    new_folder = {
-        'path': folder_path,
-        'allowed_users': user_ids if user_ids is not None else []
-    }
-    
-    folders.append(new_folder)
-    
-    if save_allowed_folders(folders):
-        return True, f"Папка {folder_path} добавлена в список разрешенных"
-    else:
+    added = _change_folders(lambda storage: storage.add_folder(folder_path, user_ids or []))
+    if added is None:
         return False, "Ошибка при сохранении папок"
+    if added:
+        return True, f"Папка {folder_path} добавлена в список разрешенных"
+    
+    # Если папка существует, обновляем список пользователей
+    if user_ids is not None:
+        if _change_folders(lambda storage: storage.set_folder_users(folder_path, user_ids)) is None:
+            return False, "Ошибка при сохранении папок"
+        return True, f"Обновлены права доступа для папки {folder_path}"
+    return False, "Эта папка уже в списке разрешенных"
 
 def remove_allowed_folder(folder_path):
     """Удаляет папку из списка разрешенных"""
-    folders = load_allowed_folders()
-    
-    # Ищем папку для удаления
-    found = False
-    new_folders = []
-    for folder in folders:
-        if folder['path'] == folder_path:
-            found = True
-        else:
-            new_folders.append(folder)
-    
-    if not found:
-        return False, "Папка не найдена в списке разрешенных"
-    
-    if save_allowed_folders(new_folders):
-        return True, f"Папка {folder_path} удалена из списка разрешенных"
-    else:
+    removed = _change_folders(lambda storage: storage.remove_folder(folder_path))
+    if removed is None:
         return False, "Ошибка при сохранении папок"
+    if not removed:
+        return False, "Папка не найдена в списке разрешенных"
+    return True, f"Папка {folder_path} удалена из списка разрешенных"
 
 def update_folder_permissions(folder_path, user_ids):
     """Обновляет права доступа к папке для указанных пользователей"""
-    folders = load_allowed_folders()
-    
-    # Ищем папку для обновления
-    found = False
-    for folder in folders:
-        if folder['path'] == folder_path:
-            folder['allowed_users'] = user_ids
-            found = True
-            break
-    
-    if not found:
-        return False, "Папка не найдена в списке разрешенных"
-    
-    if save_allowed_folders(folders):
-        return True, f"Права доступа к папке {folder_path} обновлены"
-    else:
+    updated = _change_folders(lambda storage: storage.set_folder_users(folder_path, user_ids))
+    if updated is None:
         return False, "Ошибка при сохранении папок"
+    if not updated:
+        return False, "Папка не найдена в списке разрешенных"
+    return True, f"Права доступа к папке {folder_path} обновлены"
 
 def add_user_to_folder(folder_path, user_id):
     """Добавляет пользователя к списку разрешенных для папки"""
-    folders = load_allowed_folders()
-    
-    # Ищем папку
-    found = False
-    for folder in folders:
-        if folder['path'] == folder_path:
-            if user_id not in folder['allowed_users']:
-                folder['allowed_users'].append(user_id)
-            found = True
-            break
-    
-    if not found:
-        return False, "Папка не найдена в списке разрешенных"
-    
-    if save_allowed_folders(folders):
-        return True, f"Пользователь добавлен к папке {folder_path}"
-    else:
+    updated = _change_folders(lambda storage: storage.add_folder_user(folder_path, user_id))
+    if updated is None:
         return False, "Ошибка при сохранении папок"
+    if not updated:
+        return False, "Папка не найдена в списке разрешенных"
+    return True, f"Пользователь добавлен к папке {folder_path}"
 
 def remove_user_from_folder(folder_path, user_id):
     """Удаляет пользователя из списка разрешенных для папки"""
-    folders = load_allowed_folders()
-    
-    # Ищем папку
-    found = False
-    for folder in folders:
-        if folder['path'] == folder_path:
-            if user_id in folder['allowed_users']:
-                folder['allowed_users'].remove(user_id)
-            found = True
-            break
-    
-    if not found:
-        return False, "Папка не найдена в списке разрешенных"
-    
-    if save_allowed_folders(folders):
-        return True, f"Пользователь удален из папки {folder_path}"
-    else:
+    updated = _change_folders(lambda storage: storage.remove_folder_user(folder_path, user_id))
+    if updated is None:
         return False, "Ошибка при сохранении папок"
+    if not updated:
+        return False, "Папка не найдена в списке разрешенных"
+    return True, f"Пользователь удален из папки {folder_path}"
 
 def get_allowed_folders_for_user(user_id):
     """Возвращает список папок, доступных пользователю"""
-    folders = load_allowed_folders()
-    result = []
-    
-    for folder in folders:
-        # Если список allowed_users пуст, то папка доступна всем
-        # Или если пользователь в списке allowed_users
-        if not folder['allowed_users'] or user_id in folder['allowed_users']:
-            result.append(folder['path'])
-    
-    return result
+    # Папки с пустым списком allowed_users доступны всем
+    return _get_folder_index().folders_for_user(user_id)
 
 def list_allowed_folders():
     """Возвращает список разрешенных папок в удобочитаемом формате"""
-    folders = load_allowed_folders()
+    folders = _get_folder_index().folders
     if not folders:
         return "Список разрешенных папок пуст"
     
     result = "📂 Разрешенные папки:\n\n"
+    users_by_id = _get_user_index().by_id
     
     for i, folder in enumerate(folders, 1):
         result += f"{i}. {folder['path']}\n"
         
         if folder['allowed_users']:
             # Получаем имена пользователей
-            users = load_allowed_users()
-            user_map = {user['id']: get_user_display_name(user) for user in users}
-            
             allowed_users = []
             for user_id in folder['allowed_users']:
-                allowed_users.append(user_map.get(user_id, f"ID: {user_id}"))
+                user = users_by_id.get(user_id)
+                allowed_users.append(get_user_display_name(user) if user else f"ID: {user_id}")
             
             result += f"   👥 Доступ: {', '.join(allowed_users)}\n"
         else:
@@ -200,41 +201,36 @@ def list_allowed_folders():
     return result
 
 def load_allowed_users():
-    """Загружает список разрешенных пользователей из файла"""
-    try:
-        # Проверяем существование файла и директории
-        ensure_data_dir_exists()
-        if not os.path.exists(USERS_FILE):
-            # Если файл не существует, создаем его с пустым списком
-            with open(USERS_FILE, 'w') as f:
-                json.dump([], f)
-            return []
-            
-        # Если файл существует, загружаем данные
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Ошибка при загрузке разрешенных пользователей: {str(e)}")
-        return []
+    """Возвращает копию списка разрешенных пользователей, которую можно изменять и сохранять"""
+    return [dict(user) for user in _get_user_index().users]
 
 def save_allowed_users(users):
-    """Сохраняет список разрешенных пользователей в файл"""
+    """Сохраняет список разрешенных пользователей целиком"""
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, ensure_ascii=False, indent=2)
+        get_acl_storage().replace_users(users)
         return True
     except Exception as e:
         logger.error(f"Ошибка при сохранении разрешенных пользователей: {str(e)}")
         return False
+    finally:
+        _reset_indexes()
+
+def _change_users(change):
+    """Выполняет изменение в хранилище; возвращает результат или None при ошибке"""
+    try:
+        return change(get_acl_storage())
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении разрешенных пользователей: {str(e)}")
+        return None
+    finally:
+        _reset_indexes()
 
 def add_allowed_user(user_id, username=None, first_name=None, last_name=None):
     """Добавляет пользователя в список разрешенных"""
-    users = load_allowed_users()
-    
     # Проверяем, есть ли уже такой пользователь
-    for user in users:
-        if user['id'] == user_id:
-            return False, "Этот пользователь уже в списке разрешенных", user
+    user = _get_user_index().by_id.get(user_id)
+    if user is not None:
+        return False, "Этот пользователь уже в списке разрешенных", dict(user)
     
     # Добавляем нового пользователя
     user_data = {
@@ -249,43 +245,26 @@ def add_allowed_user(user_id, username=None, first_name=None, last_name=None):
     if not first_name and not last_name and not username:
         return False, "Для добавления пользователя заполните данные", user_data
     
-    users.append(user_data)
-    
-    if save_allowed_users(users):
-        name = username or first_name or f"ID: {user_id}"
-        return True, f"Пользователь {name} добавлен в список разрешенных", user_data
-    else:
+    added = _change_users(lambda storage: storage.add_user(user_data))
+    if added is None:
         return False, "Ошибка при сохранении пользователей", user_data
+    if not added:
+        return False, "Этот пользователь уже в списке разрешенных", get_user_data(user_id)
+    
+    name = username or first_name or f"ID: {user_id}"
+    return True, f"Пользователь {name} добавлен в список разрешенных", user_data
 
 def remove_allowed_user(user_id):
     """Удаляет пользователя из списка разрешенных"""
-    users = load_allowed_users()
-    
-    # Ищем пользователя для удаления
-    found = False
-    user_name = None
-    new_users = []
-    for user in users:
-        if user['id'] == user_id:
-            found = True
-            user_name = user.get('username') or user.get('first_name') or f"ID: {user_id}"
-        else:
-            new_users.append(user)
-    
-    if not found:
+    # Хранилище также удаляет пользователя из всех папок
+    removed = _change_users(lambda storage: storage.remove_user(user_id) or False)
+    if removed is None:
+        return False, "Ошибка при сохранении пользователей"
+    if not removed:
         return False, "Пользователь не найден в списке разрешенных"
     
-    # Также удаляем пользователя из всех папок
-    folders = load_allowed_folders()
-    for folder in folders:
-        if user_id in folder['allowed_users']:
-            folder['allowed_users'].remove(user_id)
-    save_allowed_folders(folders)
-    
-    if save_allowed_users(new_users):
-        return True, f"Пользователь {user_name} удален из списка разрешенных"
-    else:
-        return False, "Ошибка при сохранении пользователей"
+    user_name = removed.get('username') or removed.get('first_name') or f"ID: {user_id}"
+    return True, f"Пользователь {user_name} удален из списка разрешенных"
 
 def list_allowed_users():
     """Возвращает список разрешенных пользователей в удобочитаемом формате"""
@@ -323,21 +302,12 @@ def get_user_display_name(user):
 
 def is_user_allowed(user_id):
     """Проверяет, разрешен ли доступ пользователю"""
-    users = load_allowed_users()
-    return any(user['id'] == user_id for user in users)
+    return user_id in _get_user_index().by_id
 
 def is_folder_allowed_for_user(folder_path, user_id):
     """Проверяет, разрешена ли папка для пользователя"""
-    folders = load_allowed_folders()
-    
-    for folder in folders:
-        if folder['path'] == folder_path:
-            # Если список allowed_users пуст, папка доступна всем
-            # Или если пользователь в списке allowed_users
-            return not folder['allowed_users'] or user_id in folder['allowed_users']
-    
-    # Если папка не найдена в списке разрешенных, она недоступна
-    return False
+    # Папка вне списка разрешенных недоступна, с пустым allowed_users - доступна всем
+    return _get_folder_index().is_allowed(folder_path, user_id)
 
 def get_timestamp():
     """Возвращает текущий timestamp"""
@@ -354,12 +324,9 @@ def get_user_data(user_id: int) -> Dict[str, Any]:
     Returns:
         Словарь с данными пользователя или пустой словарь, если пользователь не найден
     """
-    users = load_allowed_users()
-    
-    # Ищем пользователя в списке
-    for user in users:
-        if user['id'] == user_id:
-            return user
+    user = _get_user_index().by_id.get(user_id)
+    if user is not None:
+        return dict(user)
     
     # Если пользователь не найден, возвращаем базовую структуру
     return {'id': user_id, 'username': None, 'first_name': None, 'last_name': None, 'is_admin': False}
@@ -378,35 +345,22 @@ def update_user_data(user_id: int, first_name: Optional[str] = None,
     Returns:
         Кортеж (успех, сообщение)
     """
-    users = load_allowed_users()
-    
-    # Проверяем, существует ли файл и загрузились ли данные
-    if users is None:
-        users = []
-    
-    # Ищем пользователя для обновления
-    found = False
-    for user in users:
-        if user['id'] == user_id:
-            # Обновляем данные пользователя
-            if first_name is not None:
-                user['first_name'] = first_name
-            if last_name is not None:
-                user['last_name'] = last_name
-            if username is not None:
-                user['username'] = username
-                
-            found = True
-            break
-    
-    if not found:
+    fields = {}
+    if first_name is not None:
+        fields['first_name'] = first_name
+    if last_name is not None:
+        fields['last_name'] = last_name
+    if username is not None:
+        fields['username'] = username
+    
+    updated = _change_users(lambda storage: storage.update_user(user_id, fields))
+    if updated is None:
+        return False, "Ошибка при сохранении пользователей"
+    if not updated:
         # Если пользователь не найден, добавляем его
         return add_allowed_user(user_id, username, first_name, last_name)
     
-    if save_allowed_users(users):
-        display_name = get_user_display_name(
-            {'id': user_id, 'username': username, 'first_name': first_name, 'last_name': last_name}
-        )
-        return True, f"Данные пользователя {display_name} обновлены"
-    else:
-        return False, "Ошибка при сохранении пользователей" 
\ No newline at end of file
+    display_name = get_user_display_name(
+        {'id': user_id, 'username': username, 'first_name': first_name, 'last_name': last_name}
+    )
+    return True, f"Данные пользователя {display_name} обновлены"
@@ -0,0 +1,93 @@
+"""
+Модуль для подсчета обращений к API Яндекс.Диска.
+Счетчик хранится в contextvars, поэтому каждое обращение относится
+к тому обработчику, из которого оно было сделано, даже если сам
+запрос выполняется в пуле потоков.
+"""
+
+import functools
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class ApiCallStats:
+    """Количество обращений к API в рамках одного вызова обработчика"""
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.by_endpoint: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str) -> None:
+        """Учитывает одно обращение"""
+        with self._lock:
+            self.calls += 1
+            self.by_endpoint[endpoint] += 1
+
+    def summary(self) -> str:
+        """Возвращает краткое описание обращений для лога"""
+        details = ", ".join(f"{endpoint} x{count}" for endpoint, count in self.by_endpoint.most_common())
+        return f"{self.name}: {self.calls} обращений к Яндекс.Диску ({details})"
+
+
+_current_stats: ContextVar[Optional[ApiCallStats]] = ContextVar("yadisk_api_calls", default=None)
+
+
+def _endpoint_name(method: str, url: str) -> str:
+    """Сокращает URL запроса до имени метода API"""
+    parts = urlsplit(url)
+    if parts.path.startswith("/v1/disk"):
+        return f"{method} {parts.path[len('/v1/disk'):] or '/'}"
+    # Запросы к серверам загрузки и скачивания имеют случайные адреса
+    return f"{method} {parts.hostname}"
+
+
+def record_api_call(method: str, url: str) -> None:
+    """Учитывает обращение к API в текущем контексте, если подсчет включен"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(_endpoint_name(method, url))
+
+
+def get_current_stats() -> Optional[ApiCallStats]:
+    """Возвращает счетчик текущего контекста"""
+    return _current_stats.get()
+
+
+@contextmanager
+def api_call_scope(name: str) -> Iterator[ApiCallStats]:
+    """
+    Включает подсчет обращений к API для блока кода.
+
+    Вложенные области не создают отдельный счетчик: обращения
+    засчитываются самой внешней области.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        yield stats
+        return
+
+    stats = ApiCallStats(name)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if stats.calls:
+            logger.info(stats.summary())
+
+
+def track_api_calls(func):
+    """Декоратор для асинхронных обработчиков: пишет в лог число обращений к API за вызов"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with api_call_scope(func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
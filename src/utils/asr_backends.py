@@ -0,0 +1,180 @@
+"""
+Модуль с движками распознавания речи.
+Движок выбирается настройкой ASR_BACKEND: 'google' (Google Speech Recognition
+через интернет) или 'vosk' (локальная модель Vosk на CPU, без сети).
+Модель загружается один раз и остается в памяти процесса.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Type
+
+import speech_recognition as sr
+
+from config.config import ASR_BACKEND, ASR_LANGUAGE, VOSK_MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class AsrBackend(ABC):
+    """
+    Базовый класс движка распознавания речи.
+
+    recognize() возвращает распознанный текст или пустую строку, если речь
+    не распознана, и выбрасывает исключение при сбое самого движка.
+    """
+    # Имя движка в настройке ASR_BACKEND
+    name = ""
+
+    @property
+    def version(self) -> str:
+        """Версия движка и модели: результаты разных версий не взаимозаменяемы"""
+        return self.name
+
+    def load(self) -> None:
+        """Подготавливает движок к работе (загружает модель)"""
+
+    @abstractmethod
+    def recognize(self, audio_data: sr.AudioData) -> str:
+        """Распознает речь в аудиоданных"""
+
+
+class GoogleAsrBackend(AsrBackend):
+    """Google Speech Recognition: каждое распознавание - запрос к сервису Google"""
+    name = "google"
+
+    def __init__(self, language: str = ASR_LANGUAGE, fallback_from: Optional[str] = None):
+        """
+        Args:
+            language: Язык распознавания
+            fallback_from: Движок, вместо которого используется Google, если его не удалось загрузить
+        """
+        self.language = language
+        self.fallback_from = fallback_from
+        self.recognizer = sr.Recognizer()
+
+    @property
+    def version(self) -> str:
+        if self.fallback_from:
+            return f"{self.name}:{self.language}:fallback-{self.fallback_from}"
+        return f"{self.name}:{self.language}"
+
+    def recognize(self, audio_data: sr.AudioData) -> str:
+        try:
+            logger.debug("Отправка аудио в Google Speech Recognition")
+            return self.recognizer.recognize_google(audio_data, language=self.language)
+        except sr.UnknownValueError:
+            logger.warning("Google Speech Recognition не смог распознать аудио")
+            return ""
+
+
+class VoskAsrBackend(AsrBackend):
+    """
+    Локальное распознавание моделью Vosk (Kaldi) на CPU.
+
+    Модель загружается один раз и разделяется между вызовами; распознаватель
+    создается на каждый вызов, поэтому движок можно использовать из нескольких потоков.
+    """
+    name = "vosk"
+    sample_rate = 16000
+
+    # Каталоги модели, по файлам которых определяется ее версия
+    model_identity_dirs = ("am", "conf")
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        self.model_path = str(model_path)
+        self._model = None
+        self._model_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _identify_model(self) -> str:
+        """Возвращает отпечаток модели по именам, размерам и времени изменения файлов am/ и conf/"""
+        digest = hashlib.sha1()
+        root = Path(self.model_path)
+        for directory in self.model_identity_dirs:
+            for path in sorted((root / directory).rglob("*")):
+                if path.is_file():
+                    stat = path.stat()
+                    digest.update(f"{path.relative_to(root).as_posix()}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()[:12]
+
+    @property
+    def version(self) -> str:
+        # Новая модель в том же каталоге дает новую версию, и кэш не отдает старые расшифровки
+        if self._model_id is None:
+            self._model_id = self._identify_model()
+        return f"{self.name}:{self.model_path}:{self._model_id}"
+
+    def load(self) -> None:
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                import vosk
+            except ImportError:
+                raise RuntimeError("Для ASR_BACKEND=vosk установите пакет vosk (pip install vosk)")
+            vosk.SetLogLevel(-1)
+            logger.info(f"Загрузка модели Vosk из {self.model_path}")
+            self._model = vosk.Model(self.model_path)
+            self._model_id = self._identify_model()
+
+    def recognize(self, audio_data: sr.AudioData) -> str:
+        import vosk
+
+        self.load()
+        recognizer = vosk.KaldiRecognizer(self._model, self.sample_rate)
+        recognizer.AcceptWaveform(audio_data.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            logger.warning("Vosk не смог распознать аудио")
+        return text
+
+
+ASR_BACKENDS: Dict[str, Type[AsrBackend]] = {
+    GoogleAsrBackend.name: GoogleAsrBackend,
+    VoskAsrBackend.name: VoskAsrBackend,
+}
+
+# Единственный движок на процесс
+_asr_backend: Optional[AsrBackend] = None
+_asr_backend_lock = threading.Lock()
+
+
+def create_asr_backend(name: str = ASR_BACKEND) -> AsrBackend:
+    """
+    Создает и загружает движок распознавания.
+
+    Если локальный движок не удалось загрузить (нет пакета или модели),
+    используется Google Speech Recognition, чтобы голосовые сообщения
+    продолжали расшифровываться.
+    """
+    backend_class = ASR_BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Неизвестный движок распознавания речи: {name}")
+
+    backend = backend_class()
+    try:
+        backend.load()
+    except Exception as e:
+        if backend_class is GoogleAsrBackend:
+            raise
+        logger.warning(f"Не удалось загрузить движок распознавания {name}: {e}. Используется Google Speech Recognition")
+        backend = GoogleAsrBackend(fallback_from=name)
+    logger.info(f"Движок распознавания речи: {backend.version}")
+    return backend
+
+
+def get_asr_backend() -> AsrBackend:
+    """Возвращает движок распознавания, выбранный в настройке ASR_BACKEND"""
+    global _asr_backend
+    if _asr_backend is None:
+        with _asr_backend_lock:
+            if _asr_backend is None:
+                _asr_backend = create_asr_backend()
+    return _asr_backend
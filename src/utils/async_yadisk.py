@@ -0,0 +1,326 @@
+"""
+Модуль с асинхронной оберткой над YaDiskHelper.
+Все синхронные вызовы API Яндекс.Диска выполняются в ограниченном пуле потоков,
+поэтому обработчики Telegram не блокируют цикл событий на время загрузки файлов.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from config.config import (
+    YADISK_MAX_WORKERS, YADISK_UPLOAD_WORKERS, YADISK_CALL_TIMEOUT, YADISK_UPLOAD_TIMEOUT,
+    YADISK_URL_UPLOAD_TIMEOUT, YADISK_URL_UPLOAD_POLL
+)
+from src.utils.bandwidth import BandwidthLimiter
+from src.utils.folder_cache import FolderCache, FolderEntry, normalize_path
+from src.utils.yadisk_helper import YaDiskHelper, get_yadisk_helper
+
+logger = logging.getLogger(__name__)
+
+# Ключи, под которыми клиенты Яндекс.Диска хранятся в application.bot_data
+YADISK_HELPER_KEY = "yadisk_helper"
+ASYNC_YADISK_KEY = "async_yadisk"
+
+# Общие пулы потоков для обращений к Яндекс.Диску.
+# Загрузки файлов вынесены в отдельный пул, чтобы долгие передачи
+# не занимали потоки, нужные для быстрых вызовов API.
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executor_sizes = {
+    "calls": YADISK_MAX_WORKERS,
+    "uploads": YADISK_UPLOAD_WORKERS,
+}
+
+
+def get_executor(kind: str = "calls") -> ThreadPoolExecutor:
+    """Возвращает общий пул потоков указанного типа (calls или uploads)"""
+    if kind not in _executors:
+        _executors[kind] = ThreadPoolExecutor(
+            max_workers=_executor_sizes[kind],
+            thread_name_prefix=f"yadisk-{kind}"
+        )
+    return _executors[kind]
+
+
+class AsyncYaDiskHelper:
+    """
+    Асинхронный фасад над YaDiskHelper.
+
+    Каждый метод возвращает корутину, которую можно отменить, и ограничен
+    таймаутом. При отмене или превышении таймаута ожидание прерывается сразу,
+    а сам вызов в потоке завершается в фоне.
+    """
+    def __init__(
+        self,
+        yadisk_helper: YaDiskHelper,
+        call_timeout: float = YADISK_CALL_TIMEOUT,
+        upload_timeout: float = YADISK_UPLOAD_TIMEOUT
+    ):
+        """
+        Args:
+            yadisk_helper: Синхронный помощник для работы с Яндекс.Диском
+            call_timeout: Таймаут для обычных вызовов API в секундах
+            upload_timeout: Таймаут для загрузки файлов в секундах
+        """
+        self.yadisk_helper = yadisk_helper
+        self.call_timeout = call_timeout
+        self.upload_timeout = upload_timeout
+        self.folder_cache = FolderCache()
+
+    @property
+    def offline_mode(self) -> bool:
+        """Работает ли помощник в офлайн-режиме"""
+        return self.yadisk_helper.offline_mode
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        executor: str = "calls",
+        **kwargs
+    ) -> Any:
+        """
+        Выполняет синхронную функцию в пуле потоков.
+
+        Args:
+            func: Синхронная функция
+            timeout: Таймаут в секундах (по умолчанию call_timeout)
+            executor: Пул потоков для вызова (calls или uploads)
+
+        Returns:
+            Результат выполнения функции
+
+        Raises:
+            asyncio.TimeoutError: Если вызов не уложился в таймаут
+        """
+        loop = asyncio.get_running_loop()
+        # Контекст передается в поток, чтобы обращения к API засчитывались вызывающему обработчику
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(get_executor(executor), context.run, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout or self.call_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Превышено время ожидания вызова {getattr(func, '__name__', func)} ({timeout or self.call_timeout}с)")
+            raise
+
+    async def exists(self, path: str) -> bool:
+        """Проверяет существование ресурса"""
+        return await self.run(self.yadisk_helper.disk.exists, path)
+
+    async def mkdir(self, path: str) -> Any:
+        """Создает папку"""
+        result = await self.run(self.yadisk_helper.disk.mkdir, path)
+        self.folder_cache.invalidate_parent(path)
+        return result
+
+    async def listdir(self, path: str) -> List[Any]:
+        """Возвращает содержимое директории"""
+        return await self.run(lambda: list(self.yadisk_helper.disk.listdir(path)))
+
+    async def _load_folders(self, path: str) -> List[FolderEntry]:
+        """Загружает список папок с диска в обход кэша"""
+        items = await self.listdir(path)
+        return [FolderEntry(item.name, item.path) for item in items if getattr(item, 'type', None) == "dir"]
+
+    async def list_folders(self, path: str) -> List[FolderEntry]:
+        """
+        Возвращает только папки, находящиеся в директории, в виде пар (имя, путь).
+
+        Список берется из кэша; в офлайн-режиме отдается последний известный список.
+        """
+        if self.offline_mode:
+            cached = self.folder_cache.get_cached(path)
+            if cached is not None:
+                return cached
+        return await self.folder_cache.get(path, self._load_folders)
+
+    async def ensure_folder_exists(self, path: str) -> bool:
+        """Проверяет существование папки и создает ее при необходимости"""
+        result = await self.run(self.yadisk_helper.ensure_folder_exists, path)
+        # Могли быть созданы и промежуточные папки, поэтому сбрасываем списки всех предков
+        parts = normalize_path(path).strip("/").split("/")
+        for depth in range(len(parts)):
+            self.folder_cache.invalidate("/" + "/".join(parts[:depth]))
+        return result
+
+    async def search_folder(self, parent_path: str, query: str) -> List[FolderEntry]:
+        """Ищет папки в указанном пути по запросу (по кэшированному списку папок)"""
+        try:
+            folders = await self.list_folders(parent_path)
+        except Exception as e:
+            logger.error(f"Ошибка при поиске папки: {str(e)}", exc_info=True)
+            return []
+        return [item for item in folders if query.lower() in item.name.lower()]
+
+    async def create_folder(self, parent_path: str, folder_name: str) -> str:
+        """Создает новую папку в указанном пути"""
+        result = await self.run(self.yadisk_helper.create_folder, parent_path, folder_name)
+        self.folder_cache.invalidate(parent_path)
+        return result
+
+    async def rename_folder(self, old_path: str, new_name: str) -> str:
+        """Переименовывает папку"""
+        result = await self.run(self.yadisk_helper.rename_folder, old_path, new_name)
+        self.folder_cache.invalidate_parent(old_path)
+        self.folder_cache.invalidate(old_path, recursive=True)
+        return result
+
+    async def get_download_link(self, path: str) -> str:
+        """Получает ссылку на скачивание файла"""
+        return await self.run(self.yadisk_helper.get_download_link, path)
+
+    async def test_connection(self, timeout: float = 10.0) -> bool:
+        """Тестирует соединение с Яндекс.Диском"""
+        return await self.run(self.yadisk_helper.test_connection, timeout, timeout=timeout + 5)
+
+    async def upload_file(
+        self,
+        local_path: str,
+        remote_path: str,
+        progress_callback: Optional[Callable[[int], Any]] = None,
+        overwrite: bool = False,
+        timeout: Optional[float] = None,
+        max_retries: int = 3,
+        rate_limiter: Optional[BandwidthLimiter] = None,
+        queue_on_failure: bool = True
+    ) -> str:
+        """
+        Загружает файл на Яндекс.Диск.
+
+        Возвращает путь, по которому файл загружен, или UPLOAD_QUEUED, если
+        диск недоступен и файл поставлен в очередь офлайн-операций.
+        progress_callback вызывается в потоке цикла событий, поэтому
+        из него можно безопасно создавать задачи и редактировать сообщения.
+        """
+        loop = asyncio.get_running_loop()
+        thread_safe_callback = None
+        if progress_callback is not None:
+            def thread_safe_callback(progress):
+                loop.call_soon_threadsafe(progress_callback, progress)
+
+        file_size = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+        logger.debug(f"Асинхронная загрузка файла {remote_path} ({file_size} байт)")
+        return await self.run(
+            self.yadisk_helper.upload_file,
+            local_path,
+            remote_path,
+            thread_safe_callback,
+            overwrite,
+            max_retries,
+            rate_limiter,
+            queue_on_failure,
+            timeout=timeout or self.upload_timeout,
+            executor="uploads"
+        )
+
+    async def upload_from_url(
+        self,
+        url: str,
+        remote_path: str,
+        timeout: float = YADISK_URL_UPLOAD_TIMEOUT,
+        poll_interval: float = YADISK_URL_UPLOAD_POLL
+    ) -> Optional[str]:
+        """
+        Загружает файл по ссылке силами Яндекс.Диска, без передачи данных через бота.
+
+        Статус операции опрашивается из цикла событий, поток занимается только
+        на время отдельных запросов.
+
+        Returns:
+            Optional[str]: Путь сохраненного файла или None, если операция
+            завершилась ошибкой или не уложилась в таймаут
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        operation_link, remote_path = await self.run(self.yadisk_helper.start_upload_from_url, url, remote_path)
+
+        delay = min(0.5, poll_interval)
+        while True:
+            await asyncio.sleep(delay)
+            status = await self.run(self.yadisk_helper.get_operation_status, operation_link)
+            if status == "success":
+                self.folder_cache.invalidate_parent(remote_path)
+                return remote_path
+            if status == "failed":
+                logger.warning(f"Яндекс.Диск не смог скачать файл по ссылке для {remote_path}")
+                return None
+            if loop.time() >= deadline:
+                logger.warning(f"Загрузка {remote_path} по ссылке не завершилась за {timeout} сек")
+                return None
+            delay = min(delay * 2, poll_interval)
+
+    async def copy_file(self, src_path: str, remote_path: str) -> str:
+        """Копирует файл на стороне Яндекс.Диска; возвращает путь копии"""
+        result = await self.run(
+            self.yadisk_helper.copy_file, src_path, remote_path, self.upload_timeout,
+            timeout=self.upload_timeout, executor="uploads"
+        )
+        self.folder_cache.invalidate_parent(result)
+        return result
+
+    async def get_file_hashes(self, path: str) -> tuple:
+        """Возвращает (md5, sha256, size) файла из метаданных Яндекс.Диска"""
+        return await self.run(self.yadisk_helper.get_file_hashes, path)
+
+    async def create_text_file(self, path: str, content: str = "") -> bool:
+        """Создает текстовый файл встречи"""
+        return await self.run(self.yadisk_helper.create_text_file, path, content)
+
+    async def append_to_text_file(self, path: str, content: str) -> bool:
+        """Добавляет текст в конец файла встречи"""
+        return await self.run(self.yadisk_helper.append_to_text_file, path, content)
+
+    async def flush_text_file(self, path: str) -> bool:
+        """Немедленно синхронизирует файл встречи с Яндекс.Диском"""
+        return await self.run(self.yadisk_helper.flush_text_file, path, timeout=self.upload_timeout, executor="uploads")
+
+    async def close_text_file(self, path: str) -> bool:
+        """Выполняет финальную синхронизацию файла встречи"""
+        return await self.run(self.yadisk_helper.close_text_file, path, timeout=self.upload_timeout, executor="uploads")
+
+
+# Единственный асинхронный фасад на процесс
+_async_yadisk: Optional[AsyncYaDiskHelper] = None
+
+
+def get_async_yadisk() -> AsyncYaDiskHelper:
+    """Возвращает общий для всего процесса асинхронный фасад над YaDiskHelper"""
+    global _async_yadisk
+    if _async_yadisk is None:
+        _async_yadisk = AsyncYaDiskHelper(get_yadisk_helper())
+    return _async_yadisk
+
+
+def register_disk_clients(application) -> AsyncYaDiskHelper:
+    """
+    Сохраняет общие клиенты Яндекс.Диска в application.bot_data.
+
+    Args:
+        application: Экземпляр telegram.ext.Application
+
+    Returns:
+        Асинхронный фасад, доступный обработчикам через get_disk()
+    """
+    async_yadisk = get_async_yadisk()
+    application.bot_data[YADISK_HELPER_KEY] = async_yadisk.yadisk_helper
+    application.bot_data[ASYNC_YADISK_KEY] = async_yadisk
+    return async_yadisk
+
+
+def get_disk(context) -> AsyncYaDiskHelper:
+    """
+    Возвращает асинхронный клиент Яндекс.Диска для обработчика.
+
+    Args:
+        context: Контекст обработчика
+
+    Returns:
+        Клиент из bot_data или общий экземпляр процесса
+    """
+    bot_data = getattr(context, 'bot_data', None) or {}
+    return bot_data.get(ASYNC_YADISK_KEY) or get_async_yadisk()
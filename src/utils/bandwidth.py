@@ -0,0 +1,95 @@
+"""
+Модуль для ограничения скорости загрузки файлов.
+Содержит общий для процесса ограничитель полосы и обертку над файлом,
+которая учитывает прочитанные байты и сообщает о прогрессе загрузки.
+"""
+
+import os
+import threading
+import time
+from typing import BinaryIO, Callable, Optional
+
+
+class BandwidthLimiter:
+    """
+    Потокобезопасный ограничитель скорости по алгоритму token bucket.
+
+    Используется одновременно всеми потоками загрузки, поэтому ограничение
+    действует на суммарную скорость отправки данных.
+    """
+    def __init__(self, bytes_per_second: float, burst: Optional[float] = None):
+        """
+        Args:
+            bytes_per_second: Допустимая скорость в байтах в секунду (0 - без ограничения)
+            burst: Максимальный объем, который можно отправить без ожидания
+        """
+        self.rate = bytes_per_second
+        self.capacity = burst or max(bytes_per_second, 64 * 1024)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        """Блокирует вызывающий поток, пока не будет доступно amount байт полосы"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= amount or self._tokens >= self.capacity:
+                    self._tokens -= amount
+                    return
+                wait_time = (amount - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class ThrottledReader:
+    """
+    Обертка над файлом, открытым на чтение.
+
+    При каждом чтении учитывает ограничение полосы и вызывает
+    progress_callback с процентом переданных данных.
+    """
+    def __init__(
+        self,
+        file: BinaryIO,
+        limiter: Optional[BandwidthLimiter] = None,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ):
+        self._file = file
+        self._limiter = limiter
+        self._progress_callback = progress_callback
+        self._total = os.fstat(file.fileno()).st_size
+        self._sent = 0
+        self._last_progress = -1
+
+    def __len__(self) -> int:
+        return self._total
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        if data:
+            if self._limiter is not None:
+                self._limiter.consume(len(data))
+            self._sent += len(data)
+            if self._progress_callback is not None and self._total:
+                progress = int(self._sent * 100 / self._total)
+                if progress != self._last_progress:
+                    self._last_progress = progress
+                    self._progress_callback(progress)
+        return data
+
+    def seekable(self) -> bool:
+        return self._file.seekable()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        position = self._file.seek(offset, whence)
+        if position == 0:
+            self._sent = 0
+        return position
+
+    def tell(self) -> int:
+        return self._file.tell()
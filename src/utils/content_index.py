@@ -0,0 +1,185 @@
+"""
+Модуль с индексом загруженных файлов по содержимому.
+Одну и ту же брошюру или фотографию часто пересылают в несколько встреч;
+по file_unique_id Telegram или SHA-256 содержимого находится первая
+загруженная копия, и файл копируется на стороне Яндекс.Диска без повторной загрузки.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Optional, Tuple
+
+from config.config import CONTENT_INDEX_FILE, CONTENT_INDEX_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    sha256 TEXT PRIMARY KEY,
+    md5 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contents_last_used ON contents (last_used_at);
+CREATE TABLE IF NOT EXISTS content_ids (
+    file_unique_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES contents (sha256) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS content_ids_sha256 ON content_ids (sha256);
+"""
+
+# Размер блока при вычислении хешей файла
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Запись индекса: хеши содержимого и путь первой загруженной копии
+ContentEntry = namedtuple("ContentEntry", ["sha256", "md5", "size", "path"])
+
+
+def file_hashes(path: str) -> Tuple[str, str]:
+    """Вычисляет MD5 и SHA-256 файла за один проход; возвращает (md5, sha256)"""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            md5.update(chunk)
+            sha256.update(chunk)
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+class ContentIndex:
+    """
+    Персистентный LRU-индекс содержимого в SQLite.
+
+    Запись хранит SHA-256, MD5 и размер файла вместе с путем, по которому
+    он был загружен впервые; file_unique_id Telegram ссылаются на запись.
+    Когда записей больше max_entries, удаляются давно не использованные.
+    Файл на диске могли удалить или заменить, поэтому перед копированием
+    запись сверяется с MD5 из метаданных Яндекс.Диска.
+    """
+    def __init__(self, db_path: Path = CONTENT_INDEX_FILE, max_entries: int = CONTENT_INDEX_MAX_ENTRIES):
+        """
+        Args:
+            db_path: Путь к файлу базы данных индекса
+            max_entries: Максимальное количество файлов в индексе
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, max_entries)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Открывает базу данных индекса при первом обращении"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            self._count = self._conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0]
+        return self._conn
+
+    def find(self, file_unique_id: Optional[str] = None, sha256: Optional[str] = None) -> Optional[ContentEntry]:
+        """Ищет файл по file_unique_id или SHA-256; возвращает запись или None"""
+        try:
+            with self._lock:
+                conn = self._get_connection()
+                row = None
+                if file_unique_id:
+                    row = conn.execute(
+                        "SELECT c.sha256, c.md5, c.size, c.path FROM content_ids i "
+                        "JOIN contents c ON c.sha256 = i.sha256 WHERE i.file_unique_id = ?",
+                        (file_unique_id,)
+                    ).fetchone()
+                if row is None and sha256:
+                    row = conn.execute(
+                        "SELECT sha256, md5, size, path FROM contents WHERE sha256 = ?",
+                        (sha256,)
+                    ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE contents SET last_used_at = ? WHERE sha256 = ?", (time.time(), row[0]))
+                return ContentEntry(*row)
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка чтения индекса содержимого: {e}")
+            return None
+
+    def put(self, entry: ContentEntry, file_unique_id: Optional[str] = None) -> None:
+        """
+        Добавляет файл в индекс и связывает с ним file_unique_id.
+
+        Если файл с таким SHA-256 уже есть, сохраняется путь первой копии.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._get_connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    inserted = conn.execute(
+                        "UPDATE contents SET last_used_at = ? WHERE sha256 = ?", (now, entry.sha256)
+                    ).rowcount == 0
+                    if inserted:
+                        conn.execute(
+                            "INSERT INTO contents (sha256, md5, size, path, created_at, last_used_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (entry.sha256, entry.md5, entry.size, entry.path, now, now)
+                        )
+                    if file_unique_id:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO content_ids (file_unique_id, sha256) VALUES (?, ?)",
+                            (file_unique_id, entry.sha256)
+                        )
+                    count = self._count + (1 if inserted else 0)
+                    count -= self._evict(conn, count)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._count = count
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка записи в индекс содержимого: {e}")
+
+    def remove(self, sha256: str) -> None:
+        """Удаляет файл из индекса вместе со ссылающимися на него file_unique_id"""
+        try:
+            with self._lock:
+                deleted = self._get_connection().execute(
+                    "DELETE FROM contents WHERE sha256 = ?", (sha256,)
+                ).rowcount
+                self._count -= deleted
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка удаления из индекса содержимого: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, count: int) -> int:
+        """Удаляет давно не использованные записи; возвращает их количество"""
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM contents WHERE sha256 IN "
+            "(SELECT sha256 FROM contents ORDER BY last_used_at LIMIT ?)",
+            (excess,)
+        )
+        logger.debug(f"Из индекса содержимого удалено {excess} записей")
+        return excess
+
+
+# Единственный индекс на процесс бота
+_content_index: Optional[ContentIndex] = None
+
+
+def get_content_index() -> ContentIndex:
+    """Возвращает индекс содержимого"""
+    global _content_index
+    if _content_index is None:
+        _content_index = ContentIndex()
+    return _content_index
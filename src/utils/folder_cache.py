@@ -0,0 +1,144 @@
+"""
+Модуль с кэшем списков папок Яндекс.Диска.
+Меню навигации по папкам строится из кэша, а устаревшие записи
+обновляются в фоне, не задерживая ответ пользователю.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.config import FOLDER_CACHE_TTL, FOLDER_CACHE_STALE_TTL, FOLDER_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(path: str) -> str:
+    """Приводит путь на Яндекс.Диске к виду, используемому в качестве ключа кэша"""
+    path = path.replace("disk:", "")
+    path = "/" + path.strip("/")
+    return path
+
+
+# Папка в списке: только имя и путь вместо полного объекта ресурса yadisk
+FolderEntry = namedtuple("FolderEntry", ["name", "path"])
+
+
+class _CacheEntry:
+    """Список папок и время его получения"""
+    __slots__ = ("items", "fetched_at")
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.fetched_at = time.monotonic()
+
+
+class FolderCache:
+    """
+    LRU-кэш списков папок с ограниченным временем жизни.
+
+    Записи моложе ttl отдаются как есть. Записи моложе stale_ttl отдаются
+    сразу, но одновременно запускается фоновое обновление. Более старые
+    записи загружаются заново. Параллельные запросы одной папки
+    разделяют один запрос к API.
+    """
+    def __init__(
+        self,
+        ttl: float = FOLDER_CACHE_TTL,
+        stale_ttl: float = FOLDER_CACHE_STALE_TTL,
+        max_entries: int = FOLDER_CACHE_MAX_ENTRIES
+    ):
+        """
+        Args:
+            ttl: Время, в течение которого запись считается свежей (сек)
+            stale_ttl: Время, в течение которого устаревшую запись можно отдавать (сек)
+            max_entries: Максимальное количество папок в кэше
+        """
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Поколение увеличивается при инвалидации, чтобы не сохранить результат устаревшего запроса
+        self._generation = 0
+
+    async def get(self, path: str, loader: Callable[[str], Awaitable[List[Any]]]) -> List[Any]:
+        """
+        Возвращает список папок из кэша или загружает его.
+
+        Args:
+            path: Путь к директории
+            loader: Корутина, загружающая список папок с диска
+        """
+        key = normalize_path(path)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.stale_ttl:
+                self._entries.move_to_end(key)
+                if age >= self.ttl:
+                    logger.debug(f"Устаревший список папок {key} ({int(age)}с), обновляем в фоне")
+                    self._load(key, loader)
+                return entry.items
+
+        return await asyncio.shield(self._load(key, loader))
+
+    def get_cached(self, path: str) -> Optional[List[Any]]:
+        """Возвращает список папок из кэша независимо от возраста записи"""
+        entry = self._entries.get(normalize_path(path))
+        return entry.items if entry is not None else None
+
+    def _load(self, key: str, loader: Callable[[str], Awaitable[List[Any]]]) -> asyncio.Task:
+        """Запускает загрузку списка папок, если она еще не идет"""
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, loader, self._generation))
+            # Ошибка фонового обновления уже записана в лог, забираем ее из задачи
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[key] = task
+        return task
+
+    async def _fetch(self, key: str, loader: Callable[[str], Awaitable[List[Any]]], generation: int) -> List[Any]:
+        """Загружает список папок и сохраняет его в кэш"""
+        try:
+            items = await loader(key)
+            if generation == self._generation:
+                self._entries[key] = _CacheEntry(items)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return items
+        except Exception as e:
+            logger.warning(f"Не удалось обновить список папок {key}: {str(e)}")
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+    def invalidate(self, path: str, recursive: bool = False) -> None:
+        """
+        Удаляет список папок из кэша.
+
+        Args:
+            path: Путь к директории
+            recursive: Удалить также списки всех вложенных папок
+        """
+        key = normalize_path(path)
+        self._generation += 1
+        self._entries.pop(key, None)
+        if recursive:
+            prefix = key.rstrip("/") + "/"
+            for cached_key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[cached_key]
+        logger.debug(f"Список папок {key} удален из кэша")
+
+    def invalidate_parent(self, path: str) -> None:
+        """Удаляет из кэша список родительской папки (после создания или удаления папки)"""
+        key = normalize_path(path)
+        self.invalidate(key.rsplit("/", 1)[0] or "/")
+
+    def clear(self) -> None:
+        """Полностью очищает кэш"""
+        self._generation += 1
+        self._entries.clear()
@@ -2,7 +2,7 @@ import logging
 from typing import List, Dict, Any, Tuple, Optional, Callable
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
-from src.utils.yadisk_helper import YaDiskHelper
+from src.utils.async_yadisk import AsyncYaDiskHelper
 from src.utils.config_constants import (
     MAX_FOLDERS_PER_MESSAGE,
     BUTTON_BACK, BUTTON_CANCEL, BUTTON_ADD_FOLDER, BUTTON_CREATE_FOLDER, BUTTON_RETURN_TO_ROOT,
@@ -19,7 +19,7 @@ class FolderNavigator:
     """
     def __init__(
         self, 
-        yadisk_helper: YaDiskHelper,
+        yadisk_helper: AsyncYaDiskHelper,
         folder_selected_callback: Optional[Callable] = None,
         title: str = FOLDER_LIST_TITLE,
         add_current_folder_button: bool = True,
@@ -31,7 +31,7 @@ class FolderNavigator:
         Инициализация навигатора по папкам.
         
         Args:
-            yadisk_helper: Экземпляр YaDiskHelper для работы с Яндекс.Диском
+            yadisk_helper: Экземпляр AsyncYaDiskHelper для работы с Яндекс.Диском
             folder_selected_callback: Функция обратного вызова при выборе папки
             title: Заголовок сообщения при отображении списка папок
             add_current_folder_button: Добавлять ли кнопку "Добавить эту папку"
@@ -76,8 +76,7 @@ class FolderNavigator:
             Список папок
         """
         try:
-            items = list(self.yadisk_helper.disk.listdir(path))
-            return [item for item in items if item.type == "dir"]
+            return await self.yadisk_helper.list_folders(path)
         except Exception as e:
             logger.error(f"Ошибка при получении списка папок: {str(e)}", exc_info=True)
             return []
@@ -267,7 +266,7 @@ class FolderNavigator:
         try:
             # Проверяем, существует ли уже такая папка
             new_folder_path = f"{current_path}/{folder_name}"
-            if self.yadisk_helper.disk.exists(new_folder_path):
+            if await self.yadisk_helper.exists(new_folder_path):
                 await update.message.reply_text(
                     FOLDER_EXISTS_ERROR.format(name=folder_name),
                     reply_markup=ReplyKeyboardMarkup(
@@ -279,7 +278,7 @@ class FolderNavigator:
                 return False, None
             
             # Создаем новую папку
-            new_folder_path = self.yadisk_helper.create_folder(current_path, folder_name)
+            new_folder_path = await self.yadisk_helper.create_folder(current_path, folder_name)
             logger.info(f"Создана папка '{new_folder_path}'")
             
             await update.message.reply_text(
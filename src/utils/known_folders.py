@@ -0,0 +1,59 @@
+"""
+Модуль с деревом папок Яндекс.Диска, существование которых уже подтверждено.
+Позволяет не проверять родительские папки перед каждой записью.
+"""
+
+import threading
+from typing import Dict
+
+
+def _split(path: str) -> list:
+    """Разбивает путь на Яндекс.Диске на компоненты"""
+    path = path.replace("disk:", "")
+    return [part for part in path.split("/") if part]
+
+
+class KnownFolders:
+    """
+    Потокобезопасное префиксное дерево подтвержденных папок.
+
+    Если папка известна, известны и все ее родители, поэтому
+    добавление пути отмечает всю цепочку.
+    """
+    def __init__(self):
+        self._root: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, path: str) -> None:
+        """Отмечает папку и всех ее родителей как существующие"""
+        with self._lock:
+            node = self._root
+            for part in _split(path):
+                node = node.setdefault(part, {})
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            node = self._root
+            for part in _split(path):
+                node = node.get(part)
+                if node is None:
+                    return False
+            return True
+
+    def discard(self, path: str) -> None:
+        """Забывает папку вместе со всеми вложенными (после удаления или переименования)"""
+        parts = _split(path)
+        if not parts:
+            return
+        with self._lock:
+            node = self._root
+            for part in parts[:-1]:
+                node = node.get(part)
+                if node is None:
+                    return
+            node.pop(parts[-1], None)
+
+    def clear(self) -> None:
+        """Забывает все папки"""
+        with self._lock:
+            self._root.clear()
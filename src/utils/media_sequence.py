@@ -0,0 +1,101 @@
+"""
+Модуль с порядковыми номерами медиафайлов встреч.
+Номер выдается локально, поэтому имена файлов встречи уникальны и
+упорядочены без проверки существования файла на Яндекс.Диске.
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.config import MEDIA_SEQUENCE_FILE, MEDIA_SEQUENCE_BLOCK
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media_sequences (
+    session_key TEXT PRIMARY KEY,
+    reserved INTEGER NOT NULL
+);
+"""
+
+
+class MediaSequence:
+    """
+    Персистентные монотонные счетчики медиафайлов по встречам.
+
+    Номера резервируются в базе блоками по block_size, поэтому запись
+    на диск происходит не на каждый файл. После перезапуска выдача
+    продолжается со следующего блока: номера могут пропускаться,
+    но никогда не повторяются.
+    """
+    def __init__(self, db_path: Path = MEDIA_SEQUENCE_FILE, block_size: int = MEDIA_SEQUENCE_BLOCK):
+        """
+        Args:
+            db_path: Путь к файлу базы данных счетчиков
+            block_size: Сколько номеров резервировать за одну запись в базу
+        """
+        self.db_path = Path(db_path)
+        self.block_size = max(1, block_size)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # Ключ: встреча, Значение: [последний выданный номер, последний зарезервированный номер]
+        self._blocks: Dict[str, List[int]] = {}
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Открывает базу данных счетчиков при первом обращении"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _reserve(self, session_key: str) -> int:
+        """Резервирует следующий блок номеров; возвращает его последний номер"""
+        return self._get_connection().execute(
+            "INSERT INTO media_sequences (session_key, reserved) VALUES (?, ?) "
+            "ON CONFLICT (session_key) DO UPDATE SET reserved = reserved + excluded.reserved "
+            "RETURNING reserved",
+            (session_key, self.block_size)
+        ).fetchone()[0]
+
+    def next(self, session_key: str) -> int:
+        """Возвращает следующий номер медиафайла встречи (начиная с 1)"""
+        with self._lock:
+            block = self._blocks.get(session_key)
+            if block is None or block[0] >= block[1]:
+                reserved = self._reserve(session_key)
+                block = [reserved - self.block_size, reserved]
+                self._blocks[session_key] = block
+            block[0] += 1
+            return block[0]
+
+    def next_reserved(self, session_key: str) -> Optional[int]:
+        """Возвращает следующий номер из зарезервированного блока без обращения к базе; None, если блок исчерпан"""
+        with self._lock:
+            block = self._blocks.get(session_key)
+            if block is None or block[0] >= block[1]:
+                return None
+            block[0] += 1
+            return block[0]
+
+    def forget(self, session_key: str) -> None:
+        """Удаляет счетчик завершенной встречи из памяти"""
+        with self._lock:
+            self._blocks.pop(session_key, None)
+
+
+# Единственный набор счетчиков на процесс бота
+_media_sequence: Optional[MediaSequence] = None
+
+
+def get_media_sequence() -> MediaSequence:
+    """Возвращает счетчики медиафайлов"""
+    global _media_sequence
+    if _media_sequence is None:
+        _media_sequence = MediaSequence()
+    return _media_sequence
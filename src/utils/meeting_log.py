@@ -0,0 +1,275 @@
+"""
+Модуль для ведения текстовых файлов встреч.
+Авторитетная копия файла хранится локально и дописывается в конец,
+а на Яндекс.Диск отправляется целиком с отложенной синхронизацией.
+Пока содержимое файла на диске неизвестно (нет соединения), записи
+копятся отдельно и не могут затереть файл на Яндекс.Диске.
+"""
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.config import MEETING_LOGS_DIR, MEETING_LOG_SYNC_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+class _LogState:
+    """Состояние одного файла встречи"""
+    def __init__(self, local_path: Path):
+        self.local_path = local_path
+        # Записи, сделанные до получения содержимого файла с Яндекс.Диска
+        self.pending_path = local_path.with_name(local_path.name + ".pending")
+        # Локальная копия содержит файл с диска и может его перезаписывать
+        self.loaded = local_path.exists()
+        # Номер последней записи и номер записи, отправленной на диск
+        self.version = 0
+        self.synced_version = 0
+        self.timer: Optional[threading.Timer] = None
+        # Не допускаем параллельную отправку одного и того же файла
+        self.sync_lock = threading.Lock()
+        # Содержимое файла с диска получает только один поток
+        self.load_lock = threading.Lock()
+
+
+class MeetingLogManager:
+    """
+    Управляет локальными файлами встреч и их синхронизацией с Яндекс.Диском.
+
+    Каждая запись дописывается в локальный файл за O(1), после чего
+    запускается таймер синхронизации. По срабатыванию таймера (или при
+    явном вызове flush) на диск загружается снимок всего файла.
+    """
+    def __init__(self, yadisk_helper, base_dir: Path = MEETING_LOGS_DIR, sync_delay: float = MEETING_LOG_SYNC_DELAY):
+        """
+        Args:
+            yadisk_helper: Экземпляр YaDiskHelper, через который выполняется загрузка
+            base_dir: Директория для локальных копий файлов встреч
+            sync_delay: Задержка перед синхронизацией после первой несинхронизированной записи
+        """
+        self.yadisk_helper = yadisk_helper
+        self.base_dir = Path(base_dir)
+        self.sync_delay = sync_delay
+        self._lock = threading.RLock()
+        self._logs: Dict[str, _LogState] = {}
+
+    @staticmethod
+    def _normalize(remote_path: str) -> str:
+        """Приводит путь файла на Яндекс.Диске к единому виду"""
+        return "/" + remote_path.replace("disk:", "").lstrip("/")
+
+    def _get_local_path(self, remote_path: str) -> Path:
+        """Возвращает путь к локальной копии файла встречи"""
+        relative = remote_path.replace("disk:", "").lstrip("/")
+        return self.base_dir / relative
+
+    def _get_state(self, remote_path: str) -> _LogState:
+        """Возвращает состояние файла (вызывается под блокировкой, без обращений к диску)"""
+        state = self._logs.get(remote_path)
+        if state is not None:
+            return state
+
+        state = _LogState(self._get_local_path(remote_path))
+        state.local_path.parent.mkdir(parents=True, exist_ok=True)
+        if state.loaded and state.pending_path.exists():
+            # Отложенные записи уже перенесены в локальную копию перед аварийным завершением
+            state.pending_path.unlink()
+
+        self._logs[remote_path] = state
+        return state
+
+    def _load(self, remote_path: str, state: _LogState, wait: bool) -> bool:
+        """
+        Подтягивает содержимое файла с Яндекс.Диска и переносит в него отложенные записи.
+
+        Скачивание выполняется вне общей блокировки, поэтому записи других
+        встреч не ждут сети. Без соединения локальная копия не создается.
+
+        Args:
+            wait: Ждать, если файл уже загружает другой поток
+
+        Returns:
+            bool: True, если локальная копия содержит файл с диска
+        """
+        if state.loaded:
+            return True
+        if not state.load_lock.acquire(blocking=wait):
+            return False
+        try:
+            if state.loaded:
+                return True
+            if self.yadisk_helper.offline_mode:
+                return False
+            try:
+                # Файл мог остаться на диске с прошлого запуска - скачиваем его один раз
+                existing_content = self.yadisk_helper.read_text_file(remote_path)
+            except Exception as e:
+                logger.warning(f"Не удалось получить файл встречи {remote_path}, записи отложены: {str(e)}")
+                return False
+            if existing_content is None:
+                return False
+
+            with self._lock:
+                tmp_path = state.local_path.with_name(state.local_path.name + ".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    if existing_content:
+                        f.write(existing_content)
+                        if not existing_content.endswith("\n"):
+                            f.write("\n")
+                    if state.pending_path.exists():
+                        with open(state.pending_path, 'r', encoding='utf-8') as pending:
+                            shutil.copyfileobj(pending, f)
+                os.replace(tmp_path, state.local_path)
+                if state.pending_path.exists():
+                    state.pending_path.unlink()
+                state.loaded = True
+            logger.debug(f"Файл встречи получен с диска: {remote_path}")
+            return True
+        finally:
+            state.load_lock.release()
+
+    def append(self, remote_path: str, content: str) -> None:
+        """Дописывает строку в конец файла встречи и планирует синхронизацию"""
+        remote_path = self._normalize(remote_path)
+        with self._lock:
+            state = self._get_state(remote_path)
+            # Пока файл с диска не получен, записи копятся отдельно
+            target = state.local_path if state.loaded else state.pending_path
+            with open(target, 'a', encoding='utf-8') as f:
+                f.write(content)
+                if not content.endswith("\n"):
+                    f.write("\n")
+            state.version += 1
+            self._schedule_sync(remote_path, state)
+            loaded = state.loaded
+        logger.debug(f"Добавлена запись в файл встречи: {target}")
+        if not loaded:
+            self._load(remote_path, state, wait=False)
+
+    def _schedule_sync(self, remote_path: str, state: _LogState) -> None:
+        """Запускает таймер синхронизации, если он еще не запущен"""
+        if state.timer is not None:
+            return
+        state.timer = threading.Timer(self.sync_delay, self._sync_from_timer, args=(remote_path,))
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _sync_from_timer(self, remote_path: str) -> None:
+        """Обработчик срабатывания таймера синхронизации"""
+        with self._lock:
+            state = self._logs.get(remote_path)
+            if state is None:
+                return
+            state.timer = None
+        self.flush(remote_path)
+
+    def flush(self, remote_path: str) -> bool:
+        """
+        Синхронно загружает текущий снимок файла встречи на Яндекс.Диск.
+
+        Returns:
+            bool: True, если файл на диске соответствует локальной копии
+        """
+        remote_path = self._normalize(remote_path)
+        with self._lock:
+            state = self._logs.get(remote_path)
+            if state is None:
+                return True
+
+        if not self._load(remote_path, state, wait=True):
+            # Содержимое файла на диске неизвестно - повторим позже, не затирая его
+            with self._lock:
+                self._schedule_sync(remote_path, state)
+            return False
+
+        with state.sync_lock:
+            with self._lock:
+                if state.timer is not None:
+                    state.timer.cancel()
+                    state.timer = None
+                version = state.version
+                if version == state.synced_version:
+                    return True
+                # Снимок снимаем под блокировкой, чтобы не захватить недописанную строку
+                snapshot_path = f"{state.local_path}.sync"
+                shutil.copyfile(state.local_path, snapshot_path)
+
+            try:
+                # В офлайн-режиме снимок сохраняется в очередь отложенных операций
+                self.yadisk_helper.upload_file(snapshot_path, remote_path, overwrite=True)
+            except Exception as e:
+                logger.error(f"Ошибка при синхронизации файла встречи {remote_path}: {str(e)}")
+                with self._lock:
+                    self._schedule_sync(remote_path, state)
+                return False
+            finally:
+                if os.path.exists(snapshot_path):
+                    os.unlink(snapshot_path)
+
+            with self._lock:
+                state.synced_version = max(state.synced_version, version)
+            logger.debug(f"Файл встречи синхронизирован: {remote_path} (запись {version})")
+            return True
+
+    def close(self, remote_path: str) -> bool:
+        """
+        Выполняет финальную синхронизацию и освобождает локальную копию файла.
+
+        Если синхронизация не удалась, локальная копия сохраняется
+        и будет отправлена при следующей попытке.
+        """
+        remote_path = self._normalize(remote_path)
+        if not self.flush(remote_path):
+            return False
+
+        with self._lock:
+            state = self._logs.get(remote_path)
+            if state is None or state.version != state.synced_version:
+                return state is None
+            del self._logs[remote_path]
+            try:
+                state.local_path.unlink()
+            except OSError as e:
+                logger.warning(f"Не удалось удалить локальную копию {state.local_path}: {e}")
+        return True
+
+    def flush_all(self) -> None:
+        """Синхронизирует все файлы встреч с несохраненными изменениями"""
+        with self._lock:
+            remote_paths = list(self._logs.keys())
+        for remote_path in remote_paths:
+            self.flush(remote_path)
+
+    def restore(self) -> int:
+        """
+        Подхватывает локальные копии и отложенные записи, оставшиеся с прошлого запуска.
+
+        Returns:
+            int: Количество файлов встреч, поставленных на синхронизацию
+        """
+        if not self.base_dir.exists():
+            return 0
+        restored = 0
+        for path in sorted(self.base_dir.rglob("*")):
+            if not path.is_file():
+                continue
+            if path.suffix in (".sync", ".tmp"):
+                # Недоотправленный снимок или недописанная копия
+                path.unlink()
+                continue
+            local_path = path.with_suffix("") if path.suffix == ".pending" else path
+            remote_path = self._normalize(local_path.relative_to(self.base_dir).as_posix())
+            with self._lock:
+                if remote_path in self._logs:
+                    continue
+                state = self._get_state(remote_path)
+                state.version = 1
+                self._schedule_sync(remote_path, state)
+            restored += 1
+        if restored:
+            logger.info(f"Файлов встреч с прошлого запуска поставлено на синхронизацию: {restored}")
+        return restored
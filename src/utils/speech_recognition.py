@@ -1,64 +1,181 @@
-import os
 import logging
+import subprocess
 import speech_recognition as sr
 from pydub import AudioSegment
-import tempfile
-from config.config import LOG_LEVEL
+from pydub.silence import detect_nonsilent
+from config.config import LOG_LEVEL, ASR_SEGMENT_SECONDS, ASR_SILENCE_MIN_MS, ASR_SILENCE_THRESH_DB
+from src.utils.asr_backends import get_asr_backend
 
 logger = logging.getLogger(__name__)
 logger.setLevel(LOG_LEVEL)
 
-def transcribe_audio(audio_path):
+# Формат, в котором аудио передается движкам распознавания: 16 кГц, моно, 16 бит
+ASR_SAMPLE_RATE = 16000
+ASR_SAMPLE_WIDTH = 2
+
+# Шаг поиска пауз и запас тишины по краям фрагмента (мс)
+_SILENCE_SEEK_MS = 50
+_SEGMENT_PADDING_MS = 200
+
+def decode_audio(audio_path):
     """
-    Преобразует аудиофайл в текст, используя Google Speech Recognition
+    Декодирует аудиофайл в PCM 16 кГц моно в памяти, без промежуточных файлов
+    
+    ffmpeg сам определяет формат (ogg/opus, mp3, m4a и т.д.) и сразу
+    понижает частоту, поэтому данные в 3-6 раз меньше полноценного WAV.
     
     Args:
-        audio_path (str): Путь к аудиофайлу (ogg формат)
+        audio_path (str): Путь к аудиофайлу
         
     Returns:
-        str: Распознанный текст или пустая строка в случае ошибки
+        sr.AudioData: Аудиоданные для распознавания
     """
-    try:
-        # Конвертирование ogg в wav формат, который понимает speech_recognition
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_wav:
-            wav_path = temp_wav.name
-        
-        # Конвертируем из ogg в wav
-        logger.debug(f"Конвертирование {audio_path} в WAV формат")
-        sound = AudioSegment.from_ogg(audio_path)
-        sound.export(wav_path, format="wav")
-        
-        # Создаем распознаватель
-        recognizer = sr.Recognizer()
+    command = [
+        AudioSegment.converter, "-nostdin", "-v", "error",
+        "-i", str(audio_path),
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", "1", "-ar", str(ASR_SAMPLE_RATE),
+        "pipe:1"
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось декодировать {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+    
+    return sr.AudioData(result.stdout, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH)
+
+def split_on_silence(audio_data, max_seconds=ASR_SEGMENT_SECONDS):
+    """
+    Делит длинную запись на фрагменты не длиннее max_seconds по паузам в речи
+    
+    Короткая запись возвращается одним фрагментом. Участки тишины между
+    фрагментами отбрасываются; речь без пауз длиннее max_seconds режется жестко.
+    
+    Args:
+        audio_data (sr.AudioData): Аудиоданные 16 кГц моно
+        max_seconds (float): Максимальная длина фрагмента
         
-        # Открываем аудиофайл
-        with sr.AudioFile(wav_path) as source:
-            # Читаем аудиоданные
-            audio_data = recognizer.record(source)
-            
-            # Распознаем речь
-            logger.debug("Отправка аудио в Google Speech Recognition")
-            text = recognizer.recognize_google(audio_data, language="ru-RU")
-            logger.info(f"Текст успешно распознан: {text[:30]}...")
-            
-            # Удаляем временный файл
-            os.unlink(wav_path)
-            
-            return text
+    Returns:
+        list: Список пар (начало фрагмента в мс, PCM фрагмента)
+    """
+    pcm = audio_data.frame_data
+    bytes_per_ms = audio_data.sample_rate * audio_data.sample_width // 1000
+    duration_ms = len(pcm) // bytes_per_ms
+    max_ms = int(max_seconds * 1000)
+    if duration_ms <= max_ms:
+        return [(0, pcm)]
     
-    except sr.UnknownValueError:
-        logger.warning("Google Speech Recognition не смог распознать аудио")
-        return ""
+    sound = AudioSegment(
+        data=pcm,
+        sample_width=audio_data.sample_width,
+        frame_rate=audio_data.sample_rate,
+        channels=1
+    )
+    # Порог тишины отсчитывается от средней громкости записи
+    speech = detect_nonsilent(
+        sound,
+        min_silence_len=ASR_SILENCE_MIN_MS,
+        silence_thresh=sound.dBFS - ASR_SILENCE_THRESH_DB,
+        seek_step=_SILENCE_SEEK_MS
+    )
+    
+    # Объединяем соседние участки речи, пока фрагмент укладывается в max_ms
+    ranges = []
+    current = None
+    for speech_start, speech_end in speech:
+        while speech_end - speech_start > max_ms:
+            if current:
+                ranges.append(current)
+                current = None
+            ranges.append((speech_start, speech_start + max_ms))
+            speech_start += max_ms
+        if current and speech_end - current[0] <= max_ms:
+            current = (current[0], speech_end)
+        else:
+            if current:
+                ranges.append(current)
+            current = (speech_start, speech_end)
+    if current:
+        ranges.append(current)
+    
+    # Оставляем немного тишины по краям, чтобы не обрезать начало и конец слов
+    segments = []
+    for range_start, range_end in ranges:
+        range_start = max(0, range_start - _SEGMENT_PADDING_MS)
+        range_end = min(duration_ms, range_end + _SEGMENT_PADDING_MS)
+        segments.append((range_start, pcm[range_start * bytes_per_ms:range_end * bytes_per_ms]))
+    
+    logger.debug(f"Запись {duration_ms // 1000} сек разделена на {len(segments)} фрагментов")
+    return segments
+
+def prepare_audio(audio_path):
+    """
+    Декодирует аудиофайл и делит его на фрагменты для распознавания
+    
+    Returns:
+        list: Список пар (начало фрагмента в мс, PCM фрагмента)
+    """
+    logger.debug(f"Декодирование {audio_path} в PCM {ASR_SAMPLE_RATE} Гц")
+    return split_on_silence(decode_audio(audio_path))
+
+def recognize_segment(pcm):
+    """
+    Распознает речь в одном фрагменте PCM 16 кГц моно
+    
+    Returns:
+        str: Распознанный текст или пустая строка в случае ошибки
+    """
+    try:
+        return get_asr_backend().recognize(sr.AudioData(pcm, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH))
     except sr.RequestError as e:
-        logger.error(f"Ошибка при обращении к сервису Google Speech Recognition: {e}")
+        logger.error(f"Ошибка при обращении к сервису распознавания речи: {e}")
         return ""
     except Exception as e:
         logger.error(f"Ошибка при распознавании речи: {e}", exc_info=True)
         return ""
-    finally:
-        # Удаляем временный файл, если он существует
-        if 'wav_path' in locals() and os.path.exists(wav_path):
-            try:
-                os.unlink(wav_path)
-            except Exception as e:
-                logger.error(f"Не удалось удалить временный файл {wav_path}: {e}") 
\ No newline at end of file
+
+def format_timestamp(ms):
+    """Возвращает время от начала записи в формате мм:сс или ч:мм:сс"""
+    minutes, seconds = divmod(ms // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+def stitch_segments(results):
+    """
+    Собирает текст записи из распознанных фрагментов
+    
+    Args:
+        results (list): Пары (начало фрагмента в мс, текст) в порядке записи
+        
+    Returns:
+        str: Текст; если фрагментов несколько, каждый начинается с отметки времени
+    """
+    results = [(start_ms, text) for start_ms, text in results if text]
+    if len(results) == 1 and results[0][0] == 0:
+        return results[0][1]
+    return "\n".join(f"[{format_timestamp(start_ms)}] {text}" for start_ms, text in results)
+
+def transcribe_audio(audio_path):
+    """
+    Преобразует аудиофайл в текст движком, выбранным в настройке ASR_BACKEND
+    
+    Фрагменты длинной записи распознаются последовательно; параллельное
+    распознавание выполняет TranscriptionService.
+    
+    Args:
+        audio_path (str): Путь к аудиофайлу (ogg или другой формат, понятный ffmpeg)
+        
+    Returns:
+        str: Распознанный текст или пустая строка в случае ошибки
+    """
+    try:
+        segments = prepare_audio(audio_path)
+    except Exception as e:
+        logger.error(f"Ошибка при распознавании речи: {e}", exc_info=True)
+        return ""
+    
+    text = stitch_segments([(start_ms, recognize_segment(pcm)) for start_ms, pcm in segments])
+    if text:
+        logger.info(f"Текст успешно распознан: {text[:30]}...")
+    return text
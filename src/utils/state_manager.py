@@ -1,18 +1,70 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from config.config import get_current_timestamp
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, Deque, List, Optional, Tuple
+from config.config import (
+    get_current_timestamp, STATE_PERSIST, STATE_DATA_TTL, STATE_SESSION_TTL, STATE_MAX_USERS,
+    SESSION_HISTORY_LIMIT
+)
+from src.utils.media_sequence import get_media_sequence
+from src.utils.state_store import (
+    StateStore, OP_SET_SESSION, OP_CLEAR_SESSION, OP_SET_STATE, OP_RESET_STATE,
+    OP_SET_DATA, OP_REMOVE_DATA, OP_CLEAR_DATA
+)
 
 logger = logging.getLogger(__name__)
 
+# Максимальная длина сообщения в истории встречи (полный текст хранится в файле встречи)
+_HISTORY_TEXT_LIMIT = 200
+
+# Списки папок - кэш для навигации в диалоге, который не переживает перезапуск, поэтому они не сохраняются
+_MEMORY_ONLY_KEYS = frozenset({"folders"})
+
 class SessionState:
-    """Класс для хранения данных о текущей сессии встречи"""
-    def __init__(self, root_folder: str, folder_path: str, folder_name: str):
+    """Класс для хранения данных о текущей сессии встречи
+    
+    Набор атрибутов фиксирован через __slots__, а в истории хранятся только
+    последние SESSION_HISTORY_LIMIT сообщений, поэтому долгая встреча
+    не разрастается в памяти.
+    """
+    __slots__ = (
+        "root_folder", "folder_path", "folder_name", "user_id", "timestamp", "created_at",
+        "txt_file_path", "file_prefix", "message_count", "file_count", "message_history"
+    )
+    
+    def __init__(self, root_folder: str, folder_path: str, folder_name: str, user_id: Optional[int] = None, *,
+                 timestamp: Optional[str] = None, created_at: Optional[str] = None):
         self.root_folder = root_folder
         self.folder_path = folder_path
         self.folder_name = folder_name
-        self.timestamp = get_current_timestamp()
+        self.user_id = user_id
+        self.timestamp = timestamp or get_current_timestamp()
+        self.created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.txt_file_path = f"{folder_path}/{self.timestamp}_visit_{folder_name}.txt"
         self.file_prefix = f"{self.timestamp}_Files_{folder_name}"
+        self.message_count = 0
+        self.file_count = 0
+        self.message_history: Deque[str] = deque(maxlen=SESSION_HISTORY_LIMIT)
+    
+    def add_message(self, text: str, author: Optional[str] = None) -> None:
+        """Добавляет сообщение в историю встречи"""
+        self.message_count += 1
+        prefix = f"{author}: " if author else ""
+        self.message_history.append(f"[{datetime.now().strftime('%H:%M:%S')}] {prefix}{text[:_HISTORY_TEXT_LIMIT]}")
+    
+    def get_session_summary(self) -> str:
+        """Возвращает сводку по встрече: папку, время начала, счетчики и последние сообщения"""
+        lines = [
+            f"📂 Папка: {self.folder_path}",
+            f"⏱ Начало: {self.created_at}",
+            f"📊 Сообщений: {self.message_count}, Файлов: {self.file_count}"
+        ]
+        if self.message_history:
+            lines.append("")
+            lines.extend(self.message_history)
+        return "\n".join(lines)
     
     def get_txt_filename(self) -> str:
         """Возвращает имя текстового файла"""
@@ -22,23 +74,135 @@ class SessionState:
         """Возвращает префикс для медиафайлов"""
         return f"{self.timestamp}_Files_{self.folder_name}"
     
-    def get_media_path(self, extension: str) -> str:
-        """Возвращает путь для медиафайла с указанным расширением"""
-        return f"{self.folder_path}/{self.file_prefix}.{extension}"
+    async def get_media_path(self, extension: str) -> str:
+        """Возвращает уникальный путь для очередного медиафайла с указанным расширением
+        
+        Номер файла выдается локальным счетчиком встречи, поэтому имена
+        упорядочены по времени получения и не требуют проверки на Яндекс.Диске.
+        Обычно номер берется из зарезервированного в памяти блока; в базу
+        счетчиков бот обращается вне цикла событий и только за новым блоком.
+        """
+        media_sequence = get_media_sequence()
+        sequence = media_sequence.next_reserved(self.txt_file_path)
+        if sequence is None:
+            sequence = await asyncio.to_thread(media_sequence.next, self.txt_file_path)
+        self.file_count += 1
+        return f"{self.folder_path}/{self.file_prefix}_{sequence:04d}.{extension}"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает данные сессии для сохранения
+        
+        Пути файлов встречи выводятся из них; счетчики и история сообщений
+        нужны только для сводки и не сохраняются.
+        """
+        return {
+            "root_folder": self.root_folder,
+            "folder_path": self.folder_path,
+            "folder_name": self.folder_name,
+            "user_id": self.user_id,
+            "timestamp": self.timestamp,
+            "created_at": self.created_at
+        }
+    
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "SessionState":
+        """Восстанавливает сессию из сохраненных данных"""
+        return cls(
+            values["root_folder"], values["folder_path"], values["folder_name"], values.get("user_id"),
+            timestamp=values["timestamp"], created_at=values.get("created_at")
+        )
 
 class StateManager:
-    """Класс для управления состояниями пользователей"""
-    def __init__(self):
+    """Класс для управления состояниями пользователей
+    
+    Если задано хранилище, каждое изменение записывается в его журнал
+    в фоне, а после перезапуска восстанавливается методом restore().
+    
+    Сессии и временные данные хранятся в порядке последнего обращения:
+    данные, к которым не обращались дольше data_ttl, удаляются evict_idle(),
+    как и самые старые записи сверх max_users. Сессии, простаивающие дольше
+    session_ttl или вытесняемые сверх max_users, возвращает idle_sessions():
+    перед удалением встречу нужно завершить, поэтому это делает фоновая
+    проверка неактивных встреч, а не сам менеджер.
+    """
+    def __init__(
+        self,
+        store: Optional[StateStore] = None,
+        data_ttl: float = STATE_DATA_TTL,
+        session_ttl: float = STATE_SESSION_TTL,
+        max_users: int = STATE_MAX_USERS
+    ):
         # Ключ: user_id, Значение: текущая сессия
-        self.sessions: Dict[int, SessionState] = {}
+        self.sessions: "OrderedDict[int, SessionState]" = OrderedDict()
         # Ключ: user_id, Значение: текущее состояние в диалоге
         self.states: Dict[int, str] = {}
         # Ключ: user_id, Значение: временные данные
-        self.data: Dict[int, Dict[str, Any]] = {}
+        self.data: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.store = store
+        self.data_ttl = data_ttl
+        self.session_ttl = session_ttl
+        self.max_users = max(1, max_users)
+        # Ключ: user_id, Значение: время последнего обращения (time.monotonic)
+        self._session_used: Dict[int, float] = {}
+        self._data_used: Dict[int, float] = {}
+    
+    def restore(self) -> None:
+        """Восстанавливает сессии и данные пользователей и запускает запись изменений"""
+        if self.store is None:
+            return
+        started = time.perf_counter()
+        sessions, states, data = self.store.load()
+        now = time.monotonic()
+        for user_id, values in sessions.items():
+            try:
+                self.sessions[user_id] = SessionState.from_dict(values)
+                self._session_used[user_id] = now
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Не удалось восстановить сессию пользователя {user_id}: {e}")
+        self.states.update(states)
+        self.data.update(data)
+        self._data_used.update(dict.fromkeys(data, now))
+        self.store.start()
+        logger.info(
+            f"Восстановлено сессий: {len(self.sessions)}, пользователей с данными: {len(self.data)} "
+            f"за {(time.perf_counter() - started) * 1000:.1f} мс"
+        )
+    
+    def close(self) -> None:
+        """Записывает все изменения на диск и останавливает хранилище"""
+        if self.store is not None:
+            self.store.stop()
+    
+    def _record(self, op: str, user_id: int, key: Optional[str] = None, value: Any = None) -> bool:
+        """Передает изменение в журнал хранилища"""
+        return self.store is None or self.store.record(op, user_id, key, value)
+    
+    def idle_sessions(self) -> List[int]:
+        """Возвращает пользователей, чьи сессии пора завершить; проверяются только самые старые записи"""
+        now = time.monotonic()
+        excess = len(self.sessions) - self.max_users
+        idle = []
+        for user_id in self.sessions:
+            if excess <= 0 and now - self._session_used[user_id] <= self.session_ttl:
+                break
+            idle.append(user_id)
+            excess -= 1
+        return idle
+    
+    def evict_idle(self) -> None:
+        """Удаляет простаивающие временные данные; проверяются только самые старые записи"""
+        now = time.monotonic()
+        while self.data:
+            user_id = next(iter(self.data))
+            if len(self.data) <= self.max_users and now - self._data_used[user_id] <= self.data_ttl:
+                break
+            logger.debug(f"Временные данные пользователя {user_id} удалены из памяти после простоя")
+            self.clear_data(user_id)
     
     def set_state(self, user_id: int, state: str) -> None:
         """Устанавливает состояние для пользователя"""
         self.states[user_id] = state
+        self._record(OP_SET_STATE, user_id, value=state)
         logger.debug(f"Установлено состояние {state} для пользователя {user_id}")
     
     def get_state(self, user_id: int) -> Optional[str]:
@@ -49,20 +213,31 @@ class StateManager:
         """Сбрасывает состояние пользователя"""
         if user_id in self.states:
             del self.states[user_id]
+            self._record(OP_RESET_STATE, user_id)
     
     def set_session(self, user_id: int, session: SessionState) -> None:
         """Устанавливает сессию для пользователя"""
         self.sessions[user_id] = session
+        self.sessions.move_to_end(user_id)
+        self._session_used[user_id] = time.monotonic()
+        self._record(OP_SET_SESSION, user_id, value=session.to_dict())
         logger.info(f"Установлена сессия для пользователя {user_id}: {session.folder_path}")
     
     def get_session(self, user_id: int) -> Optional[SessionState]:
         """Возвращает текущую сессию пользователя"""
-        return self.sessions.get(user_id)
+        session = self.sessions.get(user_id)
+        if session is not None:
+            self.sessions.move_to_end(user_id)
+            self._session_used[user_id] = time.monotonic()
+        return session
     
     def clear_session(self, user_id: int) -> None:
         """Удаляет сессию пользователя"""
         if user_id in self.sessions:
-            del self.sessions[user_id]
+            session = self.sessions.pop(user_id)
+            del self._session_used[user_id]
+            self._record(OP_CLEAR_SESSION, user_id)
+            get_media_sequence().forget(session.txt_file_path)
             logger.info(f"Сессия пользователя {user_id} завершена")
     
     def set_data(self, user_id: int, key: str, value: Any) -> None:
@@ -70,15 +245,53 @@ class StateManager:
         if user_id not in self.data:
             self.data[user_id] = {}
         self.data[user_id][key] = value
+        self.data.move_to_end(user_id)
+        self._data_used[user_id] = time.monotonic()
+        if key not in _MEMORY_ONLY_KEYS and not self._record(OP_SET_DATA, user_id, key, value):
+            # Значение не сохраняется в JSON: после перезапуска ключ будет отсутствовать
+            logger.debug(f"Данные {key} пользователя {user_id} хранятся только в памяти")
+            self._record(OP_REMOVE_DATA, user_id, key)
     
     def get_data(self, user_id: int, key: str) -> Any:
         """Возвращает временные данные пользователя"""
-        return self.data.get(user_id, {}).get(key)
+        user_data = self.data.get(user_id)
+        if user_data is None:
+            return None
+        self.data.move_to_end(user_id)
+        self._data_used[user_id] = time.monotonic()
+        return user_data.get(key)
+    
+    def get_session_with_data(self, user_id: int, key: str) -> Tuple[Optional[SessionState], Any]:
+        """Возвращает сессию пользователя и его временные данные по ключу за одно обращение"""
+        session = self.sessions.get(user_id)
+        if session is None:
+            return None, None
+        now = time.monotonic()
+        self.sessions.move_to_end(user_id)
+        self._session_used[user_id] = now
+        user_data = self.data.get(user_id)
+        if user_data is None:
+            return session, None
+        self.data.move_to_end(user_id)
+        self._data_used[user_id] = now
+        return session, user_data.get(key)
     
     def clear_data(self, user_id: int) -> None:
         """Удаляет все временные данные пользователя"""
         if user_id in self.data:
             del self.data[user_id]
+            del self._data_used[user_id]
+            self._record(OP_CLEAR_DATA, user_id)
+    
+    def remove_data(self, user_id: int, key: str) -> None:
+        """Удаляет один ключ временных данных пользователя"""
+        user_data = self.data.get(user_id)
+        if user_data is not None and key in user_data:
+            del user_data[key]
+            if not user_data:
+                del self.data[user_id]
+                del self._data_used[user_id]
+            self._record(OP_REMOVE_DATA, user_id, key)
 
 # Создаем глобальный экземпляр менеджера состояний
-state_manager = StateManager() 
\ No newline at end of file
+state_manager = StateManager(StateStore() if STATE_PERSIST else None) 
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Модуль с персистентным хранилищем состояния пользователей.
+Изменения сессий, состояний и временных данных записываются в журнал
+в фоновом потоке, поэтому обработчики не ждут диска, а после перезапуска
+активные встречи восстанавливаются из снимка и журнала.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import STATE_DIR, STATE_FLUSH_INTERVAL, STATE_COMPACT_RECORDS
+
+logger = logging.getLogger(__name__)
+
+# Операции журнала: установка и удаление сессии, состояния и временных данных
+OP_SET_SESSION = "s"
+OP_CLEAR_SESSION = "S"
+OP_SET_STATE = "t"
+OP_RESET_STATE = "T"
+OP_SET_DATA = "d"
+OP_REMOVE_DATA = "D"
+OP_CLEAR_DATA = "C"
+
+
+def _apply_record(target: tuple, op: str, user_id: int, key: Optional[str], item: Any) -> None:
+    """Применяет операцию журнала к словарям (сессии, состояния, временные данные)"""
+    sessions, states, data = target
+    if op == OP_SET_SESSION:
+        sessions[user_id] = item
+    elif op == OP_CLEAR_SESSION:
+        sessions.pop(user_id, None)
+    elif op == OP_SET_STATE:
+        states[user_id] = item
+    elif op == OP_RESET_STATE:
+        states.pop(user_id, None)
+    elif op == OP_SET_DATA:
+        data.setdefault(user_id, {})[key] = item
+    elif op == OP_REMOVE_DATA:
+        user_data = data.get(user_id)
+        if user_data is not None:
+            user_data.pop(key, None)
+            if not user_data:
+                del data[user_id]
+    elif op == OP_CLEAR_DATA:
+        data.pop(user_id, None)
+
+
+class StateStore:
+    """
+    Хранилище состояния в виде снимка и журнала изменений (JSON Lines).
+
+    Запись журнала - компактный JSON-массив [операция, user_id, ключ, значение].
+    record() только кладет закодированную запись в буфер; фоновый поток
+    раз в flush_interval дописывает буфер в журнал, поэтому теряются не более
+    последних flush_interval секунд изменений. Поток поддерживает копию
+    актуальных записей и, когда журнал вырастает до compact_records записей,
+    переписывает снимок и очищает журнал.
+    """
+    def __init__(
+        self,
+        directory: Path = STATE_DIR,
+        flush_interval: float = STATE_FLUSH_INTERVAL,
+        compact_records: int = STATE_COMPACT_RECORDS
+    ):
+        """
+        Args:
+            directory: Каталог для снимка и журнала
+            flush_interval: Максимальный интервал записи изменений на диск (сек)
+            compact_records: Размер журнала (записей), после которого переписывается снимок
+        """
+        self.directory = Path(directory)
+        self.snapshot_path = self.directory / 'snapshot.jsonl'
+        self.journal_path = self.directory / 'journal.jsonl'
+        self.flush_interval = flush_interval
+        self.compact_records = max(1, compact_records)
+        self._pending: List[Tuple[str, int, Optional[str], str]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._journal = None
+        self._journal_records = 0
+        # Актуальные записи для снимка: строки журнала, устанавливающие значения
+        self._sessions: Dict[int, str] = {}
+        self._states: Dict[int, str] = {}
+        self._data: Dict[int, Dict[str, str]] = {}
+
+    def record(self, op: str, user_id: int, key: Optional[str] = None, value: Any = None) -> bool:
+        """
+        Ставит изменение в очередь записи.
+
+        Returns:
+            bool: False, если значение нельзя сохранить в JSON (оно остается только в памяти)
+        """
+        try:
+            line = json.dumps([op, user_id, key, value], ensure_ascii=False, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return False
+        with self._lock:
+            self._pending.append((op, user_id, key, line))
+        return True
+
+    def _apply(self, op: str, user_id: int, key: Optional[str], line: str) -> None:
+        """Применяет запись журнала к копии актуального состояния"""
+        _apply_record((self._sessions, self._states, self._data), op, user_id, key, line)
+
+    def _read(self, path: Path, values: tuple) -> int:
+        """Применяет записи из файла к копии состояния и к values; возвращает их количество"""
+        if not path.exists():
+            return 0
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                try:
+                    op, user_id, key, value = json.loads(line)
+                except ValueError:
+                    # Недописанная при аварийном завершении строка
+                    logger.warning(f"Пропущена поврежденная запись в {path.name}")
+                    continue
+                self._apply(op, user_id, key, line)
+                _apply_record(values, op, user_id, key, value)
+                count += 1
+        return count
+
+    def load(self) -> Tuple[Dict[int, Any], Dict[int, Any], Dict[int, Dict[str, Any]]]:
+        """
+        Читает снимок и журнал и сразу сжимает их в новый снимок.
+
+        Returns:
+            tuple: (сессии, состояния, временные данные) по user_id
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        values = ({}, {}, {})
+        self._read(self.snapshot_path, values)
+        if self._read(self.journal_path, values):
+            self._compact()
+        return values
+
+    def start(self) -> None:
+        """Запускает фоновую запись изменений"""
+        if self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="state-store", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Периодически записывает накопленные изменения"""
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка при записи журнала состояния: {str(e)}", exc_info=True)
+
+    def flush(self) -> None:
+        """Дописывает накопленные изменения в журнал (вызывается из фонового потока)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self._journal is None:
+            return
+        self._journal.write(''.join(line + '\n' for _, _, _, line in pending))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        for op, user_id, key, line in pending:
+            self._apply(op, user_id, key, line)
+        self._journal_records += len(pending)
+        if self._journal_records >= self.compact_records:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Записывает актуальное состояние в новый снимок и очищает журнал"""
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for lines in (self._sessions.values(), self._states.values()):
+                f.writelines(line + '\n' for line in lines)
+            for user_data in self._data.values():
+                f.writelines(line + '\n' for line in user_data.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Журнал очищается только после того, как снимок надежно записан
+        if self._journal is not None:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+        else:
+            open(self.journal_path, 'w').close()
+        self._journal_records = 0
+        logger.debug(f"Снимок состояния обновлен: сессий {len(self._sessions)}, пользователей с данными {len(self._data)}")
+
+    def stop(self) -> None:
+        """Останавливает фоновую запись, сохранив все изменения в снимок"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        self._compact()
+        self._journal.close()
+        self._journal = None
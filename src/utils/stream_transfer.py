@@ -0,0 +1,157 @@
+"""
+Модуль для потоковой передачи файлов из Telegram на Яндекс.Диск.
+Файл скачивается блоками и сразу отправляется на диск, поэтому загрузка
+начинается, не дожидаясь окончания скачивания. Параллельно блоки пишутся
+во временный файл, из которого загрузку можно повторить при ошибке.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Iterator, Optional
+
+import httpx
+
+from config.config import STREAM_CHUNK_SIZE, STREAM_BUFFER_CHUNKS
+from src.utils.async_yadisk import AsyncYaDiskHelper
+from src.utils.bandwidth import BandwidthLimiter
+
+logger = logging.getLogger(__name__)
+
+# Признак успешного окончания скачивания
+_END = object()
+
+
+class TelegramDownloadError(Exception):
+    """Не удалось скачать файл из Telegram"""
+
+
+class _PipeClosed(Exception):
+    """Передача прервана до окончания скачивания"""
+
+
+class _ChunkPipe:
+    """
+    Ограниченный буфер блоков между скачиванием и загрузкой.
+
+    Пока буфер заполнен, скачивание ждет (обратное давление), поэтому
+    в памяти одновременно находится не больше maxsize блоков.
+    """
+    def __init__(self, maxsize: int):
+        # Одно место резервируется под сигнал о прерывании передачи
+        self._queue: asyncio.Queue = asyncio.Queue(max(2, maxsize))
+        self.closed = False
+
+    async def put(self, item: Any) -> None:
+        """Передает блок (или признак окончания) загрузке"""
+        if not self.closed:
+            await self._queue.put(item)
+
+    def close(self) -> None:
+        """Прекращает передачу блоков и будит ожидающую сторону"""
+        self.closed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        # Незавершенный файл не должен попасть на диск, поэтому загрузка обрывается ошибкой
+        self._queue.put_nowait(_PipeClosed("Передача файла прервана"))
+
+    def iter_sync(self, loop: asyncio.AbstractEventLoop) -> Iterator[bytes]:
+        """Читает блоки из потока загрузки (вне цикла событий)"""
+        while True:
+            item = asyncio.run_coroutine_threadsafe(self._queue.get(), loop).result()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+async def stream_telegram_file(
+    async_yadisk: AsyncYaDiskHelper,
+    telegram_file,
+    remote_path: str,
+    spool_path: str,
+    overwrite: bool = False,
+    progress_callback: Optional[Callable[[int], Any]] = None,
+    rate_limiter: Optional[BandwidthLimiter] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    buffer_chunks: int = STREAM_BUFFER_CHUNKS
+) -> Optional[str]:
+    """
+    Передает файл из Telegram на Яндекс.Диск, одновременно сохраняя его в spool_path.
+
+    Args:
+        async_yadisk: Асинхронный клиент Яндекс.Диска
+        telegram_file: Объект telegram.File с заполненным file_path
+        remote_path: Путь на Яндекс.Диске
+        spool_path: Путь к временному файлу для повторной загрузки
+        overwrite: Перезаписывать ли существующий файл
+        progress_callback: Функция для отображения прогресса (вызывается в цикле событий)
+        rate_limiter: Общий ограничитель полосы загрузки
+        chunk_size: Размер блока в байтах
+        buffer_chunks: Максимальное количество блоков в памяти
+
+    Returns:
+        Optional[str]: Путь, по которому файл загружен (при существующем файле
+        выбирается новое имя); None, если загрузка не удалась, но файл полностью
+        сохранен в spool_path
+
+    Raises:
+        TelegramDownloadError: Если файл не удалось скачать из Telegram
+    """
+    loop = asyncio.get_running_loop()
+    pipe = _ChunkPipe(buffer_chunks)
+    total_size = getattr(telegram_file, 'file_size', None) or 0
+
+    async def download() -> None:
+        try:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
+                async with client.stream("GET", telegram_file.file_path) as response:
+                    response.raise_for_status()
+                    with open(spool_path, 'wb') as spool:
+                        async for chunk in response.aiter_bytes(chunk_size):
+                            await asyncio.to_thread(spool.write, chunk)
+                            await pipe.put(chunk)
+        except Exception as e:
+            # Ссылка на файл содержит токен бота, поэтому в сообщение попадает только тип ошибки
+            error = TelegramDownloadError(f"Не удалось скачать файл из Telegram: {type(e).__name__}")
+            await pipe.put(error)
+            raise error from e
+        await pipe.put(_END)
+
+    def chunks() -> Iterator[bytes]:
+        sent = 0
+        last_progress = -1
+        for chunk in pipe.iter_sync(loop):
+            if rate_limiter is not None:
+                rate_limiter.consume(len(chunk))
+            sent += len(chunk)
+            if progress_callback is not None and total_size:
+                progress = min(100, int(sent * 100 / total_size))
+                if progress != last_progress:
+                    last_progress = progress
+                    loop.call_soon_threadsafe(progress_callback, progress)
+            yield chunk
+
+    download_task = asyncio.create_task(download())
+    try:
+        uploaded = await async_yadisk.run(
+            async_yadisk.yadisk_helper.upload_stream,
+            chunks(),
+            remote_path,
+            overwrite,
+            timeout=async_yadisk.upload_timeout,
+            executor="uploads"
+        )
+    except asyncio.CancelledError:
+        pipe.close()
+        download_task.cancel()
+        raise
+    except Exception as e:
+        uploaded = None
+        pipe.close()
+        if not isinstance(e, TelegramDownloadError):
+            logger.warning(f"Потоковая загрузка {remote_path} не удалась, файл будет загружен из временной копии: {str(e)}")
+
+    # Дожидаемся окончания скачивания: временная копия нужна для повторной загрузки
+    await download_task
+    return uploaded
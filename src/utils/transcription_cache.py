@@ -0,0 +1,140 @@
+"""
+Модуль с кэшем результатов распознавания речи.
+Одно и то же голосовое сообщение часто пересылают в несколько встреч или
+отправляют повторно после ошибки; по file_unique_id Telegram его текст
+берется из кэша без повторного распознавания.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config.config import TRANSCRIPTION_CACHE_FILE, TRANSCRIPTION_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcriptions (
+    file_unique_id TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (file_unique_id, backend)
+);
+CREATE INDEX IF NOT EXISTS transcriptions_last_used ON transcriptions (last_used_at);
+"""
+
+
+class TranscriptionCache:
+    """
+    Персистентный LRU-кэш расшифровок в SQLite.
+
+    Ключ - file_unique_id файла и версия движка распознавания, поэтому
+    смена движка или модели не возвращает старые результаты. Когда общий
+    размер текстов превышает max_bytes, удаляются давно не использованные записи.
+    """
+    def __init__(self, db_path: Path = TRANSCRIPTION_CACHE_FILE, max_bytes: int = TRANSCRIPTION_CACHE_MAX_BYTES):
+        """
+        Args:
+            db_path: Путь к файлу базы данных кэша
+            max_bytes: Максимальный общий размер расшифровок (байт)
+        """
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Открывает базу данных кэша при первом обращении"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        return self._conn
+
+    def get(self, file_unique_id: str, backend: str) -> Optional[str]:
+        """Возвращает сохраненную расшифровку или None"""
+        try:
+            with self._lock:
+                conn = self._get_connection()
+                row = conn.execute(
+                    "SELECT text FROM transcriptions WHERE file_unique_id = ? AND backend = ?",
+                    (file_unique_id, backend)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE transcriptions SET last_used_at = ? WHERE file_unique_id = ? AND backend = ?",
+                    (time.time(), file_unique_id, backend)
+                )
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка чтения кэша расшифровок: {e}")
+            return None
+
+    def put(self, file_unique_id: str, backend: str, text: str) -> None:
+        """Сохраняет расшифровку и удаляет старые записи, если кэш переполнен"""
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._get_connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(
+                        "SELECT size FROM transcriptions WHERE file_unique_id = ? AND backend = ?",
+                        (file_unique_id, backend)
+                    ).fetchone()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO transcriptions "
+                        "(file_unique_id, backend, text, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (file_unique_id, backend, text, size, now, now)
+                    )
+                    total_bytes = self._total_bytes + size - (row[0] if row else 0)
+                    total_bytes -= self._evict(conn, total_bytes)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._total_bytes = total_bytes
+        except sqlite3.Error as e:
+            logger.warning(f"Ошибка записи в кэш расшифровок: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, total_bytes: int) -> int:
+        """Удаляет давно не использованные записи; возвращает освобожденный размер"""
+        freed = 0
+        if total_bytes <= self.max_bytes:
+            return freed
+        rows = conn.execute(
+            "SELECT rowid, size FROM transcriptions ORDER BY last_used_at"
+        )
+        evicted = []
+        for rowid, size in rows:
+            if total_bytes - freed <= self.max_bytes:
+                break
+            evicted.append((rowid,))
+            freed += size
+        conn.executemany("DELETE FROM transcriptions WHERE rowid = ?", evicted)
+        logger.debug(f"Из кэша расшифровок удалено {len(evicted)} записей ({freed} байт)")
+        return freed
+
+
+# Единственный кэш на процесс бота
+_transcription_cache: Optional[TranscriptionCache] = None
+
+
+def get_transcription_cache() -> TranscriptionCache:
+    """Возвращает кэш расшифровок"""
+    global _transcription_cache
+    if _transcription_cache is None:
+        _transcription_cache = TranscriptionCache()
+    return _transcription_cache
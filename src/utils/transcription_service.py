@@ -0,0 +1,294 @@
+"""
+Модуль с пулом процессов для распознавания речи.
+Декодирование аудио и распознавание выполняются в отдельных процессах
+с заранее загруженной моделью, поэтому не блокируют цикл событий бота
+и масштабируются по числу ядер.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple
+
+from config.config import LOG_LEVEL, TRANSCRIPTION_WORKERS, TRANSCRIPTION_QUEUE_SIZE, TRANSCRIPTION_TIMEOUT
+from src.utils.speech_recognition import stitch_segments
+from src.utils.transcription_cache import get_transcription_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionQueueFull(Exception):
+    """Очередь распознавания переполнена"""
+
+
+def _init_worker() -> None:
+    """Инициализирует процесс пула: настраивает лог и загружает модель"""
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        from src.utils.asr_backends import get_asr_backend
+        get_asr_backend()
+    except Exception as e:
+        # Модель попробуем загрузить еще раз при первом распознавании
+        logging.getLogger(__name__).error(f"Не удалось загрузить движок распознавания в процессе пула: {e}")
+
+
+def _ping() -> bool:
+    """Пустая задача для запуска процессов пула"""
+    return True
+
+
+def _backend_version() -> str:
+    """Возвращает версию движка, загруженного в процессе пула"""
+    from src.utils.asr_backends import get_asr_backend
+    return get_asr_backend().version
+
+
+def _prepare(audio_path: str) -> List[Tuple[int, bytes]]:
+    """Декодирует запись и делит ее на фрагменты в процессе пула"""
+    from src.utils.speech_recognition import prepare_audio
+    return prepare_audio(audio_path)
+
+
+def _recognize(pcm: bytes) -> str:
+    """Распознает один фрагмент в процессе пула"""
+    from src.utils.speech_recognition import recognize_segment
+    return recognize_segment(pcm)
+
+
+class TranscriptionService:
+    """
+    Сервис распознавания речи на пуле процессов.
+
+    Запись декодируется и делится по паузам в одном процессе, после чего
+    фрагменты распознаются параллельно и склеиваются с отметками времени.
+
+    В пул одновременно передается не больше задач, чем в нем процессов, остальные
+    ждут в очереди ограниченного размера: при ее переполнении submit() сразу
+    выбрасывает TranscriptionQueueFull. Задача, не уложившаяся
+    в таймаут, отменяется; если она уже выполняется, пул перезапускается,
+    чтобы зависший процесс не занимал ядро. Задачи других пользователей,
+    прерванные перезапуском, один раз выполняются заново в новом пуле.
+    """
+    def __init__(
+        self,
+        workers: int = TRANSCRIPTION_WORKERS,
+        max_queue: int = TRANSCRIPTION_QUEUE_SIZE,
+        timeout: float = TRANSCRIPTION_TIMEOUT
+    ):
+        """
+        Args:
+            workers: Количество процессов распознавания
+            max_queue: Максимальное количество задач, ожидающих свободного процесса
+            timeout: Таймаут одной задачи: декодирования записи или распознавания фрагмента (сек)
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._backend_version: Optional[str] = None
+        self._version_future: Optional[Future] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: дочерние процессы не наследуют потоки и соединения бота
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                # Версию движка новый пул вычисляет первой задачей, не занимая места в очереди распознавания
+                self._version_future = self._executor.submit(_backend_version)
+            return self._executor
+
+    def start(self) -> None:
+        """
+        Запускает процессы пула заранее, чтобы модель была загружена к первому сообщению.
+
+        Первой задачей пул вычисляет версию движка для кэша расшифровок.
+        """
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_ping)
+        logger.info(f"Пул распознавания речи запущен: {self.workers} процессов")
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """Останавливает пул с зависшей задачей; новые задачи пойдут в новый пул"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                # Новый пул может загрузить другой движок (например, если модель появилась)
+                self._backend_version = None
+                self._version_future = None
+        logger.warning("Перезапуск пула распознавания речи")
+        # Процессы завершаем принудительно: выполняющуюся задачу отменить иначе нельзя.
+        # Остальные задачи пула не отменяются, а завершаются с BrokenProcessPool, и _execute их повторяет
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _cancel(self, executor: ProcessPoolExecutor, future) -> None:
+        """Отменяет задачу; если она уже выполняется, перезапускает пул"""
+        if not future.cancel() and not future.done():
+            self._recycle(executor)
+
+    def submit(self, audio_path: str) -> "asyncio.Future[str]":
+        """
+        Ставит аудиофайл в очередь распознавания.
+
+        Вся запись, включая ее фрагменты, занимает одно место в очереди.
+
+        Args:
+            audio_path: Путь к аудиофайлу
+
+        Returns:
+            asyncio.Future[str]: Распознанный текст; отмена future отменяет задачу
+
+        Raises:
+            TranscriptionQueueFull: Если очередь распознавания переполнена
+        """
+        if self._pending >= self.workers + self.max_queue:
+            raise TranscriptionQueueFull("Очередь распознавания речи переполнена")
+
+        self._pending += 1
+        return asyncio.ensure_future(self._run(audio_path))
+
+    async def _run(self, audio_path: str) -> str:
+        try:
+            segments = await self._execute(_prepare, audio_path)
+            # Фрагменты длинной записи распознаются параллельно на всех процессах пула
+            texts = await asyncio.gather(
+                *(self._execute(_recognize, pcm) for _, pcm in segments),
+                return_exceptions=True
+            )
+            results = []
+            for (start_ms, _), text in zip(segments, texts):
+                if isinstance(text, BaseException):
+                    # Неудачный фрагмент пропускаем, остальной текст сохраняем
+                    logger.error(f"Не удалось распознать фрагмент {audio_path} с {start_ms} мс: {text!r}")
+                    text = ""
+                results.append((start_ms, text))
+            return stitch_segments(results)
+        finally:
+            self._pending -= 1
+
+    async def _execute(self, func: Callable, *args: Any) -> Any:
+        """
+        Выполняет функцию в пуле, дождавшись свободного процесса.
+
+        Если пул перезапущен из-за чужой зависшей или отмененной задачи,
+        функция один раз выполняется заново в новом пуле.
+        """
+        # Задачи ждут свободного процесса здесь, поэтому таймаут отсчитывается от начала выполнения
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            retried = False
+            while True:
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(func, *args)
+                except (BrokenProcessPool, RuntimeError):
+                    # Пул сломан (например, процесс был убит) - создаем новый
+                    self._recycle(executor)
+                    executor = self._get_executor()
+                    future = executor.submit(func, *args)
+
+                try:
+                    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"Задача распознавания не уложилась в {self.timeout} сек")
+                    self._cancel(executor, future)
+                    raise
+                except asyncio.CancelledError:
+                    self._cancel(executor, future)
+                    raise
+                except BrokenProcessPool:
+                    self._recycle(executor)
+                    if retried:
+                        raise
+                    retried = True
+                    logger.warning("Задача распознавания прервана перезапуском пула, повторяем")
+
+    async def get_backend_version(self) -> str:
+        """Возвращает версию движка распознавания, фактически загруженного в пуле"""
+        retried = False
+        while self._backend_version is None:
+            executor = self._get_executor()
+            future = self._version_future
+            try:
+                # shield: таймаут или отмена одного вызова не отменяют общую задачу пула
+                version = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=self.timeout)
+            except BrokenProcessPool:
+                self._recycle(executor)
+                if retried:
+                    raise
+                retried = True
+                continue
+            if future is not self._version_future:
+                # Пул перезапущен, пока вычислялась версия; новый пул вычислит свою
+                return version
+            self._backend_version = version
+        return self._backend_version
+
+    async def transcribe(self, audio_path: str, cache_key: Optional[str] = None) -> str:
+        """
+        Распознает речь в аудиофайле.
+
+        Args:
+            audio_path: Путь к аудиофайлу
+            cache_key: file_unique_id файла в Telegram; если указан, результат
+                берется из кэша расшифровок и сохраняется в него
+
+        Returns:
+            str: Распознанный текст или пустая строка, если распознать не удалось
+        """
+        try:
+            backend_version = None
+            if cache_key:
+                backend_version = await self.get_backend_version()
+                cached = await asyncio.to_thread(get_transcription_cache().get, cache_key, backend_version)
+                if cached is not None:
+                    logger.info(f"Расшифровка {cache_key} взята из кэша")
+                    return cached
+
+            text = await self.submit(audio_path)
+            # Пустой результат не кэшируем: при повторной отправке стоит попробовать снова
+            if cache_key and text:
+                await asyncio.to_thread(get_transcription_cache().put, cache_key, backend_version, text)
+            return text
+        except TranscriptionQueueFull as e:
+            logger.warning(f"{e}, файл {audio_path} не распознан")
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            logger.error(f"Ошибка при распознавании речи: {e}", exc_info=True)
+        return ""
+
+    def stop(self) -> None:
+        """Останавливает пул процессов"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._version_future = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Единственный сервис на процесс бота
+_transcription_service: Optional[TranscriptionService] = None
+
+
+def get_transcription_service() -> TranscriptionService:
+    """Возвращает сервис распознавания речи"""
+    global _transcription_service
+    if _transcription_service is None:
+        _transcription_service = TranscriptionService()
+    return _transcription_service
@@ -0,0 +1,97 @@
+"""
+Модуль с обработчиком очереди обновлений Telegram.
+Обновления разных пользователей обрабатываются параллельно, а обновления
+одного пользователя - строго по очереди, в порядке поступления.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config.config import UPDATE_WORKERS, UPDATE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обработчик обновлений с отдельной очередью на каждого пользователя.
+
+    Два быстрых сообщения одного пользователя не обгоняют друг друга
+    (например, при дописывании в файл встречи), а долгая загрузка видео
+    одного пользователя не задерживает сообщения остальных.
+
+    Ожидающие своей очереди обновления не занимают обработчиков: общее
+    ограничение workers действует только на выполняющиеся обновления.
+    Семафор базового класса ограничивает все принятые обновления
+    (workers + queue_size), включая ожидающие.
+    """
+    def __init__(self, workers: int = UPDATE_WORKERS, queue_size: int = UPDATE_QUEUE_SIZE):
+        """
+        Args:
+            workers: Количество одновременно обрабатываемых обновлений
+            queue_size: Количество обновлений, ожидающих своей очереди
+        """
+        self.workers = max(1, workers)
+        # Базовый класс включает параллельную обработку только при значении больше 1
+        super().__init__(max(2, self.workers + queue_size))
+        self._worker_slots: Optional[asyncio.Semaphore] = None
+        # Ключ: пользователь, Значение: завершение последнего принятого обновления
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+
+    @staticmethod
+    def _queue_key(update: object) -> Optional[Hashable]:
+        """Возвращает ключ очереди: пользователь, а для обновлений без пользователя - чат"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def initialize(self) -> None:
+        """Создает общий лимит обработчиков в цикле событий приложения"""
+        self._worker_slots = asyncio.Semaphore(self.workers)
+        logger.info(f"Обработка обновлений: {self.workers} параллельно, по порядку для каждого пользователя")
+
+    async def shutdown(self) -> None:
+        """Ничего не освобождает: очереди пустеют вместе с обновлениями"""
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Дожидается окончания предыдущих обновлений пользователя и обрабатывает обновление"""
+        key = self._queue_key(update)
+        if key is None:
+            async with self._worker_slots:
+                await coroutine
+            return
+
+        # Место в очереди занимается до первого await, поэтому порядок совпадает с порядком поступления
+        loop = asyncio.get_running_loop()
+        previous = self._tails.get(key)
+        done = loop.create_future()
+        self._tails[key] = done
+        started = False
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            async with self._worker_slots:
+                started = True
+                await coroutine
+        finally:
+            if not started and hasattr(coroutine, "close"):
+                coroutine.close()
+            if previous is None or previous.done():
+                self._release(key, done)
+            else:
+                # Обновление отменено во время ожидания: следующее начнется только после предыдущего
+                previous.add_done_callback(lambda _: self._release(key, done))
+
+    def _release(self, key: Hashable, done: asyncio.Future) -> None:
+        """Передает очередь следующему обновлению пользователя"""
+        done.set_result(None)
+        if self._tails.get(key) is done:
+            del self._tails[key]
@@ -0,0 +1,343 @@
+"""
+Модуль с очередью отложенных операций Яндекс.Диска.
+Когда диск недоступен, загрузки сохраняются в SQLite-очередь вместе с копией файла
+и отправляются фоновым потоком, как только соединение восстановится.
+"""
+
+import hashlib
+import logging
+import os
+import posixpath
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from config.config import OUTBOX_DB_FILE, OUTBOX_DIR, OUTBOX_PROBE_INTERVAL, OUTBOX_MAX_BACKOFF, OUTBOX_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+# Типы операций в очереди
+OPERATION_UPLOAD = "upload"
+OPERATION_MKDIR = "mkdir"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    remote_path TEXT NOT NULL,
+    payload_path TEXT,
+    md5 TEXT,
+    overwrite INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS operations_group ON operations (group_key, id);
+CREATE INDEX IF NOT EXISTS operations_remote_path ON operations (remote_path);
+CREATE TABLE IF NOT EXISTS failed_operations (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    remote_path TEXT NOT NULL,
+    payload_path TEXT,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+def _file_md5(path: str) -> str:
+    """Вычисляет MD5 файла (Яндекс.Диск хранит его в метаданных ресурса)"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadOutbox:
+    """
+    Персистентная очередь операций с Яндекс.Диском.
+
+    Операции выполняются строго по порядку внутри группы (папки встречи),
+    разные группы не блокируют друг друга. Повторная постановка той же
+    операции не создает дубликат благодаря ключу идемпотентности.
+    Операция, не выполненная за max_attempts попыток по причине, не связанной
+    с соединением, переносится в failed_operations вместе с копией файла.
+    """
+    def __init__(
+        self,
+        yadisk_helper,
+        db_path: Path = OUTBOX_DB_FILE,
+        payload_dir: Path = OUTBOX_DIR,
+        probe_interval: float = OUTBOX_PROBE_INTERVAL,
+        max_backoff: float = OUTBOX_MAX_BACKOFF,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS
+    ):
+        """
+        Args:
+            yadisk_helper: Экземпляр YaDiskHelper, через который выполняются операции
+            db_path: Путь к файлу базы данных очереди
+            payload_dir: Директория для копий загружаемых файлов
+            probe_interval: Интервал проверки соединения в офлайн-режиме (сек)
+            max_backoff: Максимальная пауза перед повтором неудачной операции (сек)
+            max_attempts: Количество попыток, после которого операция считается неудачной
+        """
+        self.yadisk_helper = yadisk_helper
+        self.db_path = Path(db_path)
+        self.payload_dir = Path(payload_dir)
+        self.probe_interval = probe_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max(1, max_attempts)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Открывает базу данных очереди при первом обращении"""
+        if self._conn is None:
+            self.payload_dir.mkdir(parents=True, exist_ok=True)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _remove_payload(self, payload_path: Optional[str]) -> None:
+        """Удаляет копию файла, если она больше не нужна"""
+        if payload_path and os.path.exists(payload_path):
+            try:
+                os.unlink(payload_path)
+            except OSError as e:
+                logger.warning(f"Не удалось удалить файл из очереди {payload_path}: {e}")
+
+    def enqueue_upload(self, local_path: str, remote_path: str, overwrite: bool = False) -> int:
+        """
+        Ставит загрузку файла в очередь.
+
+        Файл копируется в директорию очереди, поэтому исходный временный файл
+        можно удалять сразу после вызова. Для перезаписываемых файлов (например,
+        файла встречи) в очереди остается только последняя версия.
+
+        Returns:
+            int: ID операции в очереди
+        """
+        md5 = _file_md5(local_path)
+        key = f"{OPERATION_UPLOAD}:{remote_path}" if overwrite else f"{OPERATION_UPLOAD}:{remote_path}:{md5}"
+        group_key = posixpath.dirname(remote_path)
+        extension = os.path.splitext(remote_path)[1]
+        payload_path = str(self.payload_dir / f"{uuid.uuid4().hex}{extension}")
+
+        self.payload_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, payload_path)
+
+        with self._lock:
+            conn = self._get_connection()
+            existing = conn.execute(
+                "SELECT id, payload_path, md5 FROM operations WHERE idempotency_key = ?", (key,)
+            ).fetchone()
+            if existing is not None and (not overwrite or existing['md5'] == md5):
+                # Такая же операция уже ждет в очереди
+                self._remove_payload(payload_path)
+                logger.debug(f"Загрузка {remote_path} уже находится в очереди (операция {existing['id']})")
+                return existing['id']
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if existing is not None:
+                    # Более новая версия перезаписываемого файла заменяет старую
+                    conn.execute("DELETE FROM operations WHERE id = ?", (existing['id'],))
+                cursor = conn.execute(
+                    "INSERT INTO operations (idempotency_key, kind, group_key, remote_path, payload_path, md5, overwrite, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, OPERATION_UPLOAD, group_key, remote_path, payload_path, md5, int(overwrite), time.time())
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._remove_payload(payload_path)
+                raise
+            if existing is not None:
+                self._remove_payload(existing['payload_path'])
+
+        logger.info(f"Загрузка {remote_path} поставлена в очередь (операция {cursor.lastrowid})")
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def enqueue_mkdir(self, remote_path: str) -> int:
+        """
+        Ставит создание папки в очередь.
+
+        Returns:
+            int: ID операции в очереди
+        """
+        key = f"{OPERATION_MKDIR}:{remote_path}"
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute(
+                "INSERT OR IGNORE INTO operations (idempotency_key, kind, group_key, remote_path, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, OPERATION_MKDIR, remote_path, remote_path, time.time())
+            )
+            row = conn.execute("SELECT id FROM operations WHERE idempotency_key = ?", (key,)).fetchone()
+
+        logger.info(f"Создание папки {remote_path} поставлено в очередь (операция {row['id']})")
+        self._wakeup.set()
+        return row['id']
+
+    def has_pending(self, remote_path: str) -> bool:
+        """Проверяет, ждет ли в очереди операция с этим путем"""
+        with self._lock:
+            return self._get_connection().execute(
+                "SELECT 1 FROM operations WHERE remote_path = ? LIMIT 1", (remote_path,)
+            ).fetchone() is not None
+
+    def pending_count(self) -> int:
+        """Возвращает количество операций, ожидающих выполнения"""
+        with self._lock:
+            return self._get_connection().execute("SELECT COUNT(*) FROM operations").fetchone()[0]
+
+    def _execute(self, operation: sqlite3.Row) -> None:
+        """Выполняет одну операцию из очереди"""
+        remote_path = operation['remote_path']
+
+        if operation['kind'] == OPERATION_MKDIR:
+            self.yadisk_helper._ensure_folder_now(remote_path)
+            return
+
+        if not operation['overwrite']:
+            # Файл мог быть загружен до сбоя, но операция не успела удалиться
+            try:
+                meta = self.yadisk_helper.disk.get_meta(remote_path)
+                if getattr(meta, 'md5', None) == operation['md5']:
+                    logger.info(f"Файл {remote_path} уже загружен, операция {operation['id']} пропущена")
+                    return
+            except Exception:
+                pass
+
+        self.yadisk_helper._upload_now(
+            operation['payload_path'],
+            remote_path,
+            overwrite=bool(operation['overwrite']),
+            max_retries=1
+        )
+
+    def drain(self) -> int:
+        """
+        Выполняет все операции, срок повтора которых наступил.
+
+        Returns:
+            int: Количество успешно выполненных операций
+        """
+        with self._lock:
+            operations = self._get_connection().execute("SELECT * FROM operations ORDER BY id").fetchall()
+
+        done = 0
+        blocked_groups = set()
+        now = time.time()
+        for operation in operations:
+            group_key = operation['group_key']
+            if group_key in blocked_groups:
+                continue
+            if operation['next_attempt_at'] > now:
+                # Не обгоняем операцию, которая ждет повтора
+                blocked_groups.add(group_key)
+                continue
+
+            try:
+                self._execute(operation)
+            except Exception as e:
+                if self.yadisk_helper.is_connection_error(e):
+                    logger.warning(f"Соединение с Яндекс.Диском потеряно при отправке очереди: {e}")
+                    self.yadisk_helper.set_offline_mode(True)
+                    return done
+
+                attempts = operation['attempts'] + 1
+                logger.error(f"Ошибка при выполнении операции {operation['id']} ({operation['remote_path']}), попытка {attempts}: {e}")
+                if attempts >= self.max_attempts:
+                    # Операция больше не блокирует группу; копия файла сохраняется для ручного разбора
+                    self._park(operation, attempts, str(e))
+                    continue
+                delay = min(self.max_backoff, 2 ** attempts)
+                with self._lock:
+                    self._get_connection().execute(
+                        "UPDATE operations SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (attempts, time.time() + delay, str(e), operation['id'])
+                    )
+                blocked_groups.add(group_key)
+                continue
+
+            with self._lock:
+                self._get_connection().execute("DELETE FROM operations WHERE id = ?", (operation['id'],))
+            self._remove_payload(operation['payload_path'])
+            done += 1
+            logger.info(f"Операция {operation['id']} из очереди выполнена: {operation['remote_path']}")
+
+        return done
+
+    def _park(self, operation: sqlite3.Row, attempts: int, error: str) -> None:
+        """Переносит операцию, исчерпавшую попытки, в failed_operations"""
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO failed_operations "
+                    "(id, kind, remote_path, payload_path, attempts, last_error, created_at, failed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (operation['id'], operation['kind'], operation['remote_path'], operation['payload_path'],
+                     attempts, error, operation['created_at'], time.time())
+                )
+                conn.execute("DELETE FROM operations WHERE id = ?", (operation['id'],))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        logger.error(
+            f"Операция {operation['id']} ({operation['remote_path']}) отложена как неудачная после {attempts} попыток, "
+            f"файл сохранен: {operation['payload_path']}"
+        )
+
+    def _run(self) -> None:
+        """Основной цикл фонового потока очереди"""
+        while not self._stopping.is_set():
+            try:
+                if self.yadisk_helper.offline_mode:
+                    if not self.yadisk_helper.test_connection(timeout=10.0):
+                        self._wakeup.wait(self.probe_interval)
+                        self._wakeup.clear()
+                        continue
+                    logger.info("Соединение с Яндекс.Диском восстановлено, отправляем очередь")
+
+                self.drain()
+            except Exception as e:
+                logger.error(f"Ошибка в фоновом потоке очереди: {e}", exc_info=True)
+
+            self._wakeup.wait(self.probe_interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Запускает фоновый поток отправки очереди"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yadisk-outbox", daemon=True)
+        self._thread.start()
+        logger.info(f"Очередь отложенных операций запущена, ожидает отправки: {self.pending_count()}")
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток отправки очереди"""
+        self._stopping.set()
+        self._wakeup.set()
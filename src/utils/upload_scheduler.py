@@ -0,0 +1,418 @@
+"""
+Модуль с фоновым планировщиком загрузок на Яндекс.Диск.
+Обработчики ставят файл в очередь и сразу отвечают пользователю,
+а загрузку выполняет ограниченный набор фоновых задач.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import yadisk
+
+from config.config import (
+    UPLOAD_SCHEDULER_WORKERS, UPLOAD_BANDWIDTH_LIMIT, UPLOAD_MAX_ATTEMPTS,
+    YADISK_URL_UPLOAD, YADISK_URL_UPLOAD_MIN_SIZE, CONTENT_DEDUP
+)
+from src.utils.api_metrics import api_call_scope
+from src.utils.async_yadisk import AsyncYaDiskHelper, get_async_yadisk
+from src.utils.bandwidth import BandwidthLimiter
+from src.utils.content_index import ContentEntry, file_hashes, get_content_index
+from src.utils.stream_transfer import stream_telegram_file
+from src.utils.yadisk_helper import UPLOAD_QUEUED
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты загрузок: чем меньше число, тем раньше выполняется загрузка
+PRIORITY_TEXT = 0
+PRIORITY_PHOTO = 1
+PRIORITY_DOCUMENT = 2
+PRIORITY_VIDEO = 3
+
+# Расширения документов, которые загружаются вместе с текстовыми записями
+TEXT_EXTENSIONS = {"txt", "md", "log", "csv", "json"}
+
+
+class UploadJob:
+    """Задание на загрузку одного файла"""
+    def __init__(
+        self,
+        user_id: int,
+        local_path: str,
+        remote_path: str,
+        priority: int = PRIORITY_DOCUMENT,
+        overwrite: bool = False,
+        progress_callback: Optional[Callable[[int], Any]] = None,
+        on_complete: Optional[Callable[["UploadJob"], Awaitable[Any]]] = None,
+        on_error: Optional[Callable[["UploadJob", Exception], Awaitable[Any]]] = None,
+        delete_after: bool = True,
+        telegram_file=None,
+        content_id: Optional[str] = None
+    ):
+        """
+        Args:
+            user_id: ID пользователя, от которого получен файл
+            local_path: Путь к локальному файлу
+            remote_path: Путь на Яндекс.Диске
+            priority: Приоритет загрузки (PRIORITY_*)
+            overwrite: Перезаписывать ли существующий файл
+            progress_callback: Функция для отображения прогресса (вызывается в цикле событий)
+            on_complete: Корутина, вызываемая после успешной загрузки или постановки
+                файла в очередь офлайн-операций (тогда job.queued=True)
+            on_error: Корутина, вызываемая, если загрузить файл не удалось
+            delete_after: Удалять ли локальный файл после обработки задания
+            telegram_file: Объект telegram.File, если файл еще не скачан; тогда он
+                передается на диск потоково, а local_path служит временной копией
+            content_id: file_unique_id файла в Telegram для поиска уже загруженной копии
+        """
+        self.user_id = user_id
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.priority = priority
+        self.overwrite = overwrite
+        self.progress_callback = progress_callback
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.delete_after = delete_after
+        self.telegram_file = telegram_file
+        self.content_id = content_id
+        # Хеши содержимого локального файла (вычисляются при дедупликации)
+        self.md5: Optional[str] = None
+        self.sha256: Optional[str] = None
+        self.attempts = 0
+        # Диск недоступен: файл ждет в очереди офлайн-операций и еще не загружен
+        self.queued = False
+        self.error: Optional[Exception] = None
+        self.done: Optional[asyncio.Future] = None
+
+
+class UploadScheduler:
+    """
+    Планировщик фоновых загрузок.
+
+    Задания хранятся в очередях по приоритетам; внутри приоритета
+    пользователи обслуживаются по кругу, поэтому одно большое видео или
+    пачка фотографий одного пользователя не задерживает остальных.
+    Число одновременных загрузок и суммарная полоса ограничены.
+    """
+    def __init__(
+        self,
+        async_yadisk: AsyncYaDiskHelper,
+        workers: int = UPLOAD_SCHEDULER_WORKERS,
+        bandwidth_limit: int = UPLOAD_BANDWIDTH_LIMIT,
+        max_attempts: int = UPLOAD_MAX_ATTEMPTS,
+        url_upload: bool = YADISK_URL_UPLOAD,
+        url_upload_min_size: int = YADISK_URL_UPLOAD_MIN_SIZE,
+        dedup: bool = CONTENT_DEDUP
+    ):
+        """
+        Args:
+            async_yadisk: Асинхронный клиент Яндекс.Диска
+            workers: Количество одновременных загрузок
+            bandwidth_limit: Общий лимит полосы в байтах в секунду (0 - без ограничения)
+            max_attempts: Количество попыток при ошибках соединения
+            url_upload: Поручать скачивание файлов из Telegram Яндекс.Диску
+            url_upload_min_size: Минимальный размер файла для загрузки по ссылке (байт)
+            dedup: Копировать на стороне диска файлы, которые уже были загружены
+        """
+        self.async_yadisk = async_yadisk
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.url_upload = url_upload
+        self.url_upload_min_size = url_upload_min_size
+        self.dedup = dedup
+        self.rate_limiter = BandwidthLimiter(bandwidth_limit) if bandwidth_limit > 0 else None
+        # priority -> user_id -> очередь заданий пользователя
+        self._queues: Dict[int, "OrderedDict[int, Deque[UploadJob]]"] = {}
+        self._pending = 0
+        # Ключ: user_id, Значение: количество заданий пользователя в очереди и в работе
+        self._user_jobs: Dict[int, int] = {}
+        self._condition: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending_count(self) -> int:
+        """Количество заданий, ожидающих загрузки"""
+        return self._pending
+
+    def has_jobs(self, user_id: int) -> bool:
+        """Проверяет, есть ли у пользователя незавершенные загрузки"""
+        return user_id in self._user_jobs
+
+    def _start(self) -> None:
+        """Запускает фоновые задачи загрузки в текущем цикле событий"""
+        if self._tasks:
+            return
+        self._condition = asyncio.Condition()
+        for number in range(self.workers):
+            # Задачи не должны наследовать контекст обработчика, который первым поставил загрузку
+            self._tasks.append(asyncio.create_task(
+                self._worker(), name=f"upload-worker-{number}", context=contextvars.Context()
+            ))
+        logger.info(f"Планировщик загрузок запущен: {self.workers} потоков загрузки")
+
+    async def submit(self, job: UploadJob) -> UploadJob:
+        """
+        Ставит задание в очередь и сразу возвращает управление.
+
+        Дождаться результата можно через await job.done (True при успешной загрузке).
+        """
+        self._start()
+        job.done = asyncio.get_running_loop().create_future()
+
+        user_queues = self._queues.setdefault(job.priority, OrderedDict())
+        user_queues.setdefault(job.user_id, deque()).append(job)
+        self._pending += 1
+        self._user_jobs[job.user_id] = self._user_jobs.get(job.user_id, 0) + 1
+        logger.debug(f"Загрузка {job.remote_path} поставлена в очередь (приоритет {job.priority}, в очереди {self._pending})")
+
+        async with self._condition:
+            self._condition.notify()
+        return job
+
+    def _next_job(self) -> UploadJob:
+        """Выбирает следующее задание: самый высокий приоритет, пользователи по кругу"""
+        for priority in sorted(self._queues):
+            user_queues = self._queues[priority]
+            if not user_queues:
+                continue
+            user_id, jobs = user_queues.popitem(last=False)
+            job = jobs.popleft()
+            if jobs:
+                # Пользователь с оставшимися заданиями уходит в конец круга
+                user_queues[user_id] = jobs
+            self._pending -= 1
+            return job
+        raise LookupError("Очередь загрузок пуста")
+
+    async def _worker(self) -> None:
+        """Фоновая задача, последовательно выполняющая задания из очереди"""
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._pending > 0)
+                job = self._next_job()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Непредвиденная ошибка в планировщике загрузок: {str(e)}", exc_info=True)
+            finally:
+                remaining = self._user_jobs.pop(job.user_id, 1) - 1
+                if remaining:
+                    self._user_jobs[job.user_id] = remaining
+
+    async def _process(self, job: UploadJob) -> None:
+        """Выполняет задание: потоковая передача и/или загрузка из локального файла"""
+        success = copied = fetched = False
+        try:
+            with api_call_scope(f"upload {job.remote_path}"):
+                if self.dedup and not job.overwrite and not self.async_yadisk.offline_mode:
+                    success = copied = await self._copy_duplicate(job)
+                if not success and job.telegram_file is not None and self._can_fetch_by_url(job):
+                    success = fetched = await self._fetch_by_url(job)
+                if not success and job.telegram_file is not None:
+                    success = await self._stream(job)
+                if not success and job.error is None:
+                    success = await self._upload_with_retries(job)
+                # Хеши считаются по локальной копии, пока она не удалена
+                # (файл, ушедший в очередь офлайн-операций, уже перемещен)
+                if (success and self.dedup and not (copied or fetched)
+                        and job.sha256 is None and os.path.exists(job.local_path)):
+                    job.md5, job.sha256 = await asyncio.to_thread(file_hashes, job.local_path)
+        finally:
+            if job.delete_after and os.path.exists(job.local_path):
+                try:
+                    os.unlink(job.local_path)
+                except OSError as e:
+                    logger.warning(f"Не удалось удалить временный файл {job.local_path}: {e}")
+
+        if success:
+            if job.queued:
+                logger.info(f"Файл поставлен в очередь офлайн-операций: {job.remote_path}")
+            else:
+                logger.info(f"Файл загружен в фоне: {job.remote_path}")
+            callback = job.on_complete(job) if job.on_complete else None
+        else:
+            logger.error(f"Не удалось загрузить файл {job.remote_path}: {str(job.error)}")
+            callback = job.on_error(job, job.error) if job.on_error else None
+
+        if not job.done.done():
+            job.done.set_result(success)
+
+        if callback is not None:
+            try:
+                await callback
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике завершения загрузки {job.remote_path}: {str(e)}", exc_info=True)
+
+        if success and self.dedup and not (copied or job.queued):
+            await self._remember_content(job)
+
+    async def _copy_duplicate(self, job: UploadJob) -> bool:
+        """Копирует уже загруженный файл с тем же содержимым; при неудаче вернет False"""
+        index = get_content_index()
+        entry = await asyncio.to_thread(index.find, job.content_id)
+        if entry is None and job.telegram_file is None and os.path.exists(job.local_path):
+            # Файл уже скачан: ищем копию по SHA-256 содержимого
+            job.md5, job.sha256 = await asyncio.to_thread(file_hashes, job.local_path)
+            entry = await asyncio.to_thread(index.find, None, job.sha256)
+        if entry is None:
+            return False
+
+        try:
+            # Файл на диске могли удалить или заменить: сверяем MD5 перед копированием
+            md5, _, _ = await self.async_yadisk.get_file_hashes(entry.path)
+            if md5 != entry.md5:
+                logger.info(f"Файл {entry.path} изменился на диске, удаляем его из индекса содержимого")
+                await asyncio.to_thread(index.remove, entry.sha256)
+                return False
+            job.remote_path = await self.async_yadisk.copy_file(entry.path, job.remote_path)
+        except asyncio.CancelledError:
+            raise
+        except yadisk.exceptions.PathNotFoundError:
+            logger.info(f"Файл {entry.path} удален с диска, удаляем его из индекса содержимого")
+            await asyncio.to_thread(index.remove, entry.sha256)
+            return False
+        except Exception as e:
+            logger.warning(f"Не удалось скопировать {entry.path} в {job.remote_path}: {str(e)}. Загружаем файл")
+            return False
+
+        logger.info(f"Повторный файл скопирован на диске из {entry.path}: {job.remote_path}")
+        # Связываем с записью новый file_unique_id, если копия найдена по содержимому
+        await asyncio.to_thread(index.put, entry, job.content_id)
+        if job.progress_callback is not None:
+            job.progress_callback(100)
+        return True
+
+    async def _remember_content(self, job: UploadJob) -> None:
+        """
+        Добавляет загруженный файл в индекс содержимого, сверив MD5 с метаданными диска.
+
+        job.remote_path к этому моменту указывает на файл, в который легла загрузка
+        (при существующем файле диск выбирает новое имя), поэтому хеши и путь
+        записи берутся у одного и того же файла.
+        """
+        if self.async_yadisk.offline_mode:
+            return
+        try:
+            md5, sha256, size = await self.async_yadisk.get_file_hashes(job.remote_path)
+        except Exception as e:
+            logger.warning(f"Не удалось получить метаданные {job.remote_path}: {str(e)}")
+            return
+        if not md5 or not sha256:
+            return
+        if job.md5 is not None and (job.md5 != md5 or job.sha256 != sha256):
+            logger.warning(f"Хеши {job.remote_path} на диске не совпадают с локальной копией, файл не добавлен в индекс")
+            return
+        await asyncio.to_thread(get_content_index().put, ContentEntry(sha256, md5, size, job.remote_path), job.content_id)
+
+    def _can_fetch_by_url(self, job: UploadJob) -> bool:
+        """Проверяет, можно ли поручить скачивание файла из Telegram самому Яндекс.Диску"""
+        file_path = job.telegram_file.file_path or ""
+        return (
+            self.url_upload
+            and not job.overwrite
+            and not self.async_yadisk.offline_mode
+            and file_path.startswith(("http://", "https://"))
+            and (job.telegram_file.file_size or 0) >= self.url_upload_min_size
+        )
+
+    async def _fetch_by_url(self, job: UploadJob) -> bool:
+        """Загружает файл по ссылке Telegram на стороне Яндекс.Диска; при неудаче вернет False"""
+        try:
+            remote_path = await self.async_yadisk.upload_from_url(job.telegram_file.file_path, job.remote_path)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Загрузка {job.remote_path} по ссылке не удалась: {str(e)}. Передаем файл через бота")
+            return False
+        if remote_path is None:
+            logger.warning(f"Загрузка {job.remote_path} по ссылке не удалась. Передаем файл через бота")
+            return False
+        job.remote_path = remote_path
+        if job.progress_callback is not None:
+            job.progress_callback(100)
+        return True
+
+    async def _stream(self, job: UploadJob) -> bool:
+        """Передает файл из Telegram на диск, не дожидаясь окончания скачивания"""
+        try:
+            if self.async_yadisk.offline_mode:
+                # Диск недоступен: только скачиваем файл, загрузка уйдет в очередь офлайн-операций
+                await job.telegram_file.download_to_drive(job.local_path)
+                return False
+            job.attempts += 1
+            remote_path = await stream_telegram_file(
+                self.async_yadisk,
+                job.telegram_file,
+                job.remote_path,
+                job.local_path,
+                overwrite=job.overwrite,
+                progress_callback=job.progress_callback,
+                rate_limiter=self.rate_limiter
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.error = e
+            return False
+        if remote_path is None:
+            return False
+        # При существующем файле диск сохраняет загрузку под новым именем
+        job.remote_path = remote_path
+        return True
+
+    async def _upload_with_retries(self, job: UploadJob) -> bool:
+        """Загружает локальный файл, повторяя попытку при ошибках соединения"""
+        while True:
+            job.attempts += 1
+            last_attempt = job.attempts >= self.max_attempts
+            try:
+                # На последней попытке при ошибке соединения файл уходит в очередь офлайн-операций
+                remote_path = await self.async_yadisk.upload_file(
+                    job.local_path,
+                    job.remote_path,
+                    job.progress_callback,
+                    job.overwrite,
+                    max_retries=1,
+                    rate_limiter=self.rate_limiter,
+                    queue_on_failure=last_attempt
+                )
+                if remote_path == UPLOAD_QUEUED:
+                    # Диск недоступен: файл будет загружен под исходным именем после восстановления связи
+                    job.queued = True
+                else:
+                    job.remote_path = remote_path
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if last_attempt or not self.async_yadisk.yadisk_helper.is_connection_error(e):
+                    job.error = e
+                    return False
+                delay = 2 ** job.attempts
+                logger.warning(f"Попытка {job.attempts}/{self.max_attempts} загрузки {job.remote_path} не удалась: {str(e)}. Повтор через {delay} сек.")
+                await asyncio.sleep(delay)
+
+    async def stop(self) -> None:
+        """Останавливает фоновые задачи загрузки"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+# Единственный планировщик загрузок на процесс
+_upload_scheduler: Optional[UploadScheduler] = None
+
+
+def get_upload_scheduler() -> UploadScheduler:
+    """Возвращает общий для всего процесса планировщик загрузок"""
+    global _upload_scheduler
+    if _upload_scheduler is None:
+        _upload_scheduler = UploadScheduler(get_async_yadisk())
+    return _upload_scheduler
@@ -1,21 +1,64 @@
+import io
 import logging
 import os
 import yadisk
-import tempfile
 import time
-import random
-import socket
-from config.config import YANDEX_DISK_TOKEN
+import threading
+from config.config import YANDEX_DISK_TOKEN, YADISK_POOL_SIZE
+from src.utils.api_metrics import record_api_call
+from src.utils.bandwidth import ThrottledReader
+from src.utils.known_folders import KnownFolders
+from src.utils.meeting_log import MeetingLogManager
+from src.utils.upload_outbox import UploadOutbox
+import posixpath
 import re
+import requests
+from yadisk.sessions.requests_session import RequestsSession
 
 logger = logging.getLogger(__name__)
 
+# Результат upload_file, если файл поставлен в очередь офлайн-операций и будет загружен позже
+UPLOAD_QUEUED = "queued"
+
+class PooledRequestsSession(RequestsSession):
+    """Сессия requests с настроенным пулом keep-alive соединений
+    
+    yadisk создает отдельный requests.Session для каждого потока,
+    поэтому адаптер с пулом монтируется при первом обращении в потоке.
+    """
+    def __init__(self, pool_size: int = YADISK_POOL_SIZE):
+        super().__init__()
+        self.pool_size = pool_size
+    
+    def send_request(self, method, url, **kwargs):
+        # Каждое обращение учитывается в счетчике текущего обработчика
+        record_api_call(method, url)
+        return super().send_request(method, url, **kwargs)
+    
+    @property
+    def requests_session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            session = super().requests_session
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size
+            )
+            session.mount("https://", adapter)
+            return session
+        return self._local.session
+
 class YaDiskHelper:
     def __init__(self, skip_connection_check=False):
-        # Инициализируем клиент Яндекс.Диска
-        self.disk = yadisk.YaDisk(token=YANDEX_DISK_TOKEN)
+        # Инициализируем клиент Яндекс.Диска с общим пулом соединений
+        self.disk = yadisk.YaDisk(token=YANDEX_DISK_TOKEN, session=PooledRequestsSession())
         # Флаг для работы в офлайн режиме
         self.offline_mode = False
+        # Локальные файлы встреч с отложенной синхронизацией
+        self.meeting_logs = MeetingLogManager(self)
+        # Очередь операций, отложенных из-за недоступности диска
+        self.outbox = UploadOutbox(self)
+        # Папки, существование которых уже подтверждено
+        self.known_folders = KnownFolders()
         
         if not skip_connection_check:
             self._check_connection()
@@ -25,23 +68,29 @@ class YaDiskHelper:
     def set_offline_mode(self, offline=True):
         """Устанавливает режим работы без Яндекс.Диска"""
         if offline:
-            logger.warning("Яндекс.Диск переключен в ОФЛАЙН режим. Все операции с диском будут симулированы.")
+            logger.warning("Яндекс.Диск переключен в ОФЛАЙН режим. Загрузки будут поставлены в очередь и отправлены после восстановления соединения.")
         else:
             logger.info("Яндекс.Диск переключен в ОНЛАЙН режим.")
         self.offline_mode = offline
     
+    @staticmethod
+    def is_connection_error(error: Exception) -> bool:
+        """Проверяет, вызвана ли ошибка недоступностью сети или Яндекс.Диска"""
+        if isinstance(error, (yadisk.exceptions.YaDiskConnectionError, yadisk.exceptions.RequestTimeoutError)):
+            return True
+        error_msg = str(error).lower()
+        return "timeout" in error_msg or "connection" in error_msg
+    
     def _check_connection(self):
         """Проверяет подключение к Яндекс.Диску"""
         try:
             logger.info("Проверка подключения к Яндекс.Диску...")
-            socket_timeout = socket.getdefaulttimeout()
-            socket.setdefaulttimeout(20)  # увеличиваем таймаут сокета
             
-            if not self.disk.check_token():
+            # Увеличенный таймаут задается только для этого запроса
+            if not self.disk.check_token(timeout=20.0):
                 raise ValueError("Неправильный токен Яндекс.Диска!")
             
             logger.info("Подключение к Яндекс.Диску успешно установлено")
-            socket.setdefaulttimeout(socket_timeout)  # восстанавливаем исходный таймаут
             self.offline_mode = False
         except Exception as e:
             logger.error(f"Ошибка при проверке подключения к Яндекс.Диску: {str(e)}")
@@ -61,19 +110,15 @@ class YaDiskHelper:
         """
         try:
             logger.info(f"Тестирование соединения с Яндекс.Диском (таймаут: {timeout}с)...")
-            socket_timeout = socket.getdefaulttimeout()
-            socket.setdefaulttimeout(timeout)
             
-            # Проверяем доступность сервиса
-            result = self.disk.get_disk_info()
+            # Проверяем доступность сервиса; таймаут задается для запроса, а не для всех сокетов процесса
+            result = self.disk.get_disk_info(timeout=timeout, n_retries=0)
             
-            socket.setdefaulttimeout(socket_timeout)
             logger.info(f"Соединение с Яндекс.Диском успешно (свободно {result['total_space'] - result['used_space']} байт)")
             self.offline_mode = False
             return True
         except Exception as e:
             logger.error(f"Ошибка при тестировании соединения с Яндекс.Диском: {str(e)}")
-            socket.setdefaulttimeout(socket_timeout)
             # Автоматически переключаемся в офлайн режим при ошибке соединения
             self.set_offline_mode(True)
             return False
@@ -81,27 +126,42 @@ class YaDiskHelper:
     def ensure_folder_exists(self, path):
         """Проверяет существование папки и создает ее при необходимости"""
         if self.offline_mode:
-            logger.info(f"[ОФЛАЙН] Симуляция создания директории: {path}")
+            logger.info(f"[ОФЛАЙН] Создание директории поставлено в очередь: {path}")
+            self.outbox.enqueue_mkdir(path)
             return True
             
-        if not self.disk.exists(path):
+        return self._ensure_folder_now(path)
+    
+    def _ensure_folder_now(self, path):
+        """Создает папку и все недостающие родительские папки
+        
+        Папка создается сразу, без предварительной проверки: существующая папка
+        дает ошибку 409, а отсутствующий родитель создается рекурсивно.
+        
+        Returns:
+            bool: True, если папка была создана, False, если она уже существовала
+        """
+        path = "/" + path.replace("disk:", "").strip("/")
+        if path in self.known_folders:
+            return False
+        
+        try:
+            self.disk.mkdir(path)
+            logger.info(f"Создана директория: {path}")
+            created = True
+        except yadisk.exceptions.PathExistsError:
+            created = False
+        except yadisk.exceptions.ParentNotFoundError:
             logger.info(f"Создаем директорию: {path}")
-            # Создаем каждый уровень папок
-            parts = path.strip('/').split('/')
-            current_path = ""
-            for part in parts:
-                if part:
-                    current_path = f"{current_path}/{part}"
-                    if not self.disk.exists(current_path):
-                        try:
-                            self.disk.mkdir(current_path)
-                        except Exception as e:
-                            if "уже существует" in str(e).lower() or "already exists" in str(e).lower():
-                                logger.warning(f"Папка {current_path} уже существует. Продолжаем.")
-                            else:
-                                raise
-            return True
-        return False
+            self._ensure_folder_now(posixpath.dirname(path))
+            try:
+                self.disk.mkdir(path)
+                created = True
+            except yadisk.exceptions.PathExistsError:
+                created = False
+        
+        self.known_folders.add(path)
+        return created
     
     def search_folder(self, parent_path: str, query: str):
         """Ищет папки в указанном пути по запросу"""
@@ -139,17 +199,13 @@ class YaDiskHelper:
         folder_path = f"{parent_path}/{safe_folder_name}"
         
         if self.offline_mode:
-            logger.info(f"[ОФЛАЙН] Симуляция создания папки: {folder_path}")
+            logger.info(f"[ОФЛАЙН] Создание папки поставлено в очередь: {folder_path}")
+            self.outbox.enqueue_mkdir(folder_path)
             return folder_path
             
         try:
-            # Проверяем существование родительской папки
-            if not self.disk.exists(parent_path):
-                self.ensure_folder_exists(parent_path)
-            
-            if not self.disk.exists(folder_path):
-                logger.info(f"Создаем папку: {folder_path}")
-                self.disk.mkdir(folder_path)
+            if self._ensure_folder_now(folder_path):
+                logger.info(f"Создана папка: {folder_path}")
             else:
                 logger.info(f"Папка уже существует: {folder_path}")
             
@@ -158,35 +214,143 @@ class YaDiskHelper:
             logger.error(f"Ошибка при создании папки: {str(e)}", exc_info=True)
             raise ValueError(f"Не удалось создать папку: {str(e)}")
     
-    def upload_file(self, local_path: str, remote_path: str, progress_callback=None, overwrite=False):
-        """Загружает файл на Яндекс.Диск"""
+    def upload_file(self, local_path: str, remote_path: str, progress_callback=None, overwrite=False,
+                    max_retries=3, rate_limiter=None, queue_on_failure=True):
+        """Загружает файл на Яндекс.Диск
         
-        # В режиме офлайн только логируем действия
+        Если диск недоступен, файл сохраняется в очередь и будет загружен
+        фоновым потоком после восстановления соединения. При queue_on_failure=False
+        ошибка соединения пробрасывается вызывающему коду, который повторит попытку сам.
+        
+        Returns:
+            str: Путь, по которому файл загружен (при существующем файле выбирается новое имя),
+                или UPLOAD_QUEUED, если файл поставлен в очередь
+        """
+        # В режиме офлайн ставим загрузку в очередь
         if self.offline_mode:
             file_size = os.path.getsize(local_path) if os.path.exists(local_path) else 0
-            logger.info(f"[ОФЛАЙН] Симуляция загрузки файла: {remote_path} ({file_size} байт)")
-            return True
-            
-        retry_count = 0
-        max_retries = 3
-        retry_delay = 2  # секунды
+            logger.info(f"[ОФЛАЙН] Загрузка файла поставлена в очередь: {remote_path} ({file_size} байт)")
+            self.outbox.enqueue_upload(local_path, remote_path, overwrite=overwrite)
+            return UPLOAD_QUEUED
+        
+        # Пока в очереди ждет прежняя версия файла, новая идет за ней, иначе очередь затрет ее устаревшей
+        if self.outbox.has_pending(remote_path):
+            logger.info(f"Загрузка {remote_path} поставлена в очередь за ожидающей версией")
+            self.outbox.enqueue_upload(local_path, remote_path, overwrite=overwrite)
+            return UPLOAD_QUEUED
         
-        # Проверяем существование файла перед загрузкой для предотвращения перезаписи
-        if not overwrite and self.disk.exists(remote_path):
+        try:
+            return self._upload_now(local_path, remote_path, progress_callback, overwrite, max_retries, rate_limiter)
+        except Exception as e:
+            if not self.is_connection_error(e) or not queue_on_failure:
+                raise
+            logger.warning(f"Яндекс.Диск недоступен, загрузка {remote_path} поставлена в очередь: {str(e)}")
+            self.set_offline_mode(True)
+            self.outbox.enqueue_upload(local_path, remote_path, overwrite=overwrite)
+            return UPLOAD_QUEUED
+    
+    def _upload_optimistic(self, upload, remote_path: str, overwrite=False) -> str:
+        """Выполняет загрузку без предварительных проверок существования
+        
+        Проверки заменены обработкой ошибок: при отсутствии родительской папки (409)
+        она создается, а при существующем файле (409) выбирается новое имя.
+        upload вызывается не более двух раз и только до начала передачи данных.
+        
+        Returns:
+            str: Путь, по которому файл был загружен
+        """
+        parent_path = posixpath.dirname(remote_path)
+        try:
+            upload(remote_path)
+        except yadisk.exceptions.ParentNotFoundError:
+            self.known_folders.discard(parent_path)
+            self._ensure_folder_now(parent_path)
+            upload(remote_path)
+        except yadisk.exceptions.PathExistsError:
+            if overwrite:
+                raise
             # Меняем путь, добавляя дополнительную уникальность через временную метку
             base_path, ext = os.path.splitext(remote_path)
             remote_path = f"{base_path}_{int(time.time()*1000000)}{ext}"
             logger.warning(f"Обнаружен существующий файл, генерируем новое имя: {remote_path}")
+            upload(remote_path)
+        
+        self.known_folders.add(parent_path)
+        return remote_path
+    
+    def upload_stream(self, chunks, remote_path: str, overwrite=False, timeout=300.0):
+        """Загружает файл на Яндекс.Диск из итератора блоков байт
+        
+        Итератор можно прочитать только один раз, поэтому повторных попыток нет:
+        при ошибке вызывающий код должен загрузить файл другим способом.
+        
+        Returns:
+            str: Путь, по которому файл загружен (при существующем файле выбирается новое имя)
+        """
+        logger.info(f"Потоковая загрузка файла: {remote_path}")
+        # При ошибке получения ссылки итератор еще не прочитан, поэтому его можно передать повторно
+        return self._upload_optimistic(
+            lambda path: self.disk.upload(lambda: chunks, path, overwrite=overwrite, n_retries=0, timeout=timeout),
+            remote_path,
+            overwrite
+        )
+    
+    def start_upload_from_url(self, url: str, remote_path: str) -> tuple:
+        """Запускает загрузку файла по ссылке: Яндекс.Диск скачивает его сам
+        
+        Операция асинхронная, ее статус проверяется через get_operation_status.
+        Перезапись не поддерживается: при существующем файле выбирается новое имя.
+        
+        Returns:
+            tuple: (ссылка на операцию, путь, по которому будет сохранен файл)
+        """
+        logger.info(f"Загрузка файла по ссылке на стороне Яндекс.Диска: {remote_path}")
+        operation = {}
+        
+        def upload(path):
+            operation["link"] = self.disk.upload_url(url, path, n_retries=0)
+        
+        remote_path = self._upload_optimistic(upload, remote_path)
+        return operation["link"].href, remote_path
+    
+    def copy_file(self, src_path: str, remote_path: str, timeout=300.0) -> str:
+        """Копирует файл на стороне Яндекс.Диска
+        
+        Returns:
+            str: Путь копии (при существующем файле выбирается новое имя)
+        """
+        logger.info(f"Копирование файла на Яндекс.Диске: {src_path} -> {remote_path}")
+        return self._upload_optimistic(
+            lambda path: self.disk.copy(src_path, path, n_retries=0, poll_timeout=timeout),
+            remote_path
+        )
+    
+    def get_file_hashes(self, path: str) -> tuple:
+        """Возвращает (md5, sha256, size) файла из метаданных Яндекс.Диска"""
+        meta = self.disk.get_meta(path, fields=["md5", "sha256", "size"])
+        return meta.md5, meta.sha256, meta.size
+    
+    def get_operation_status(self, operation_link: str) -> str:
+        """Возвращает статус асинхронной операции: in-progress, success или failed"""
+        return self.disk.get_operation_status(operation_link)
+    
+    def _upload_now(self, local_path: str, remote_path: str, progress_callback=None, overwrite=False, max_retries=3,
+                    rate_limiter=None):
+        """Загружает файл на Яндекс.Диск с повторными попытками при сетевых ошибках
+        
+        Файл передается через ThrottledReader: он соблюдает общий лимит полосы
+        (если передан rate_limiter) и сообщает о прогрессе через progress_callback.
+        
+        Returns:
+            str: Путь, по которому файл загружен (при существующем файле выбирается новое имя)
+        """
+        retry_count = 0
+        retry_delay = 2  # секунды
         
         while retry_count < max_retries:
             try:
                 logger.debug(f"Загрузка файла: {remote_path}")
                 
-                # Проверяем существование родительской папки
-                parent_path = os.path.dirname(remote_path)
-                if not self.disk.exists(parent_path):
-                    self.ensure_folder_exists(parent_path)
-                
                 # Определяем размер файла для настройки таймаута
                 file_size = os.path.getsize(local_path)
                 
@@ -206,19 +370,17 @@ class YaDiskHelper:
                 
                 logger.info(f"Установлен таймаут {timeout}с для файла размером {file_size} байт")
                 
-                self.disk.upload(
-                    local_path, 
-                    remote_path, 
-                    overwrite=overwrite, 
-                    progress_callback=progress_callback,
-                    timeout=timeout
-                )
-                return True
+                with open(local_path, 'rb') as f:
+                    reader = ThrottledReader(f, rate_limiter, progress_callback)
+                    return self._upload_optimistic(
+                        lambda path: self.disk.upload(reader, path, overwrite=overwrite, timeout=timeout),
+                        remote_path,
+                        overwrite
+                    )
             except Exception as e:
                 retry_count += 1
-                error_msg = str(e).lower()
                 
-                if retry_count < max_retries and ("timeout" in error_msg or "connection" in error_msg):
+                if retry_count < max_retries and self.is_connection_error(e):
                     logger.warning(f"Попытка {retry_count}/{max_retries}: Ошибка при загрузке файла: {str(e)}. Повторная попытка через {retry_delay} сек.")
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Увеличиваем время ожидания для следующей попытки
@@ -234,130 +396,49 @@ class YaDiskHelper:
             
         return self.disk.get_download_link(path)
     
-    def _create_temp_file(self, content=''):
-        """Создает временный файл с заданным содержимым"""
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, encoding='utf-8') as tmp_file:
-            tmp_path = tmp_file.name
-            tmp_file.write(content)
-        return tmp_path
-    
-    def create_text_file(self, path: str, content: str = ""):
-        """Создает текстовый файл по указанному пути"""
+    def read_text_file(self, path: str) -> str:
+        """Скачивает текстовый файл с Яндекс.Диска и возвращает его содержимое
+        
+        Returns:
+            str: Содержимое файла, пустая строка, если файла нет, или None в офлайн-режиме
+        """
         if self.offline_mode:
-            logger.info(f"[ОФЛАЙН] Симуляция создания текстового файла: {path}")
-            return True
+            logger.info(f"[ОФЛАЙН] Чтение текстового файла недоступно: {path}")
+            return None
             
+        buffer = io.BytesIO()
         try:
-            # Проверяем существование родительской папки
-            parent_path = os.path.dirname(path)
-            if not self.disk.exists(parent_path):
-                self.ensure_folder_exists(parent_path)
-            
-            # Проверяем существует ли уже такой файл
-            if self.disk.exists(path):
-                logger.warning(f"Файл {path} уже существует. Используем append_to_text_file вместо create_text_file.")
-                return self.append_to_text_file(path, content)
-            
-            # Создаем временный файл
-            tmp_path = self._create_temp_file(content)
-            
-            # Загружаем временный файл на Яндекс.Диск
-            self.disk.upload(tmp_path, path)
-            
-            # Удаляем временный файл
-            os.unlink(tmp_path)
-            
-            logger.debug(f"Создан текстовый файл: {path}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Ошибка при создании текстового файла: {str(e)}", exc_info=True)
-            # Если файл уже существует, не бросаем исключение, а используем append
-            if "already exists" in str(e).lower() or "уже существует" in str(e).lower():
-                logger.warning(f"Файл {path} уже существует. Пробуем добавить содержимое к существующему файлу.")
-                try:
-                    return self.append_to_text_file(path, content)
-                except Exception as append_error:
-                    logger.error(f"Не удалось добавить содержимое к существующему файлу: {str(append_error)}", exc_info=True)
-                    raise
-            raise
+            self.disk.download(path, buffer)
+        except yadisk.exceptions.PathNotFoundError:
+            return ""
+        return buffer.getvalue().decode('utf-8')
+    
+    def create_text_file(self, path: str, content: str = ""):
+        """Создает текстовый файл встречи по указанному пути
+        
+        Файл ведется локально и отправляется на Яндекс.Диск при синхронизации.
+        Если файл уже существует, содержимое добавляется в его конец.
+        """
+        self.meeting_logs.append(path, content)
+        logger.debug(f"Создан текстовый файл: {path}")
+        return True
     
     def append_to_text_file(self, path: str, content: str):
-        """Добавляет текст в существующий файл"""
-        if self.offline_mode:
-            logger.info(f"[ОФЛАЙН] Симуляция добавления текста в файл: {path}")
-            logger.debug(f"[ОФЛАЙН] Содержимое: {content[:100]}...")
-            return True
-            
-        tmp_path = None
-        retry_count = 0
-        max_retries = 3
-        retry_delay = 2  # секунды
+        """Добавляет текст в конец файла встречи
         
-        while retry_count < max_retries:
-            try:
-                existing_content = ""
-                
-                # Проверяем существование файла
-                if self.disk.exists(path):
-                    try:
-                        # Скачиваем существующий файл
-                        tmp_path = self._create_temp_file()
-                        self.disk.download(path, tmp_path)
-                        
-                        # Читаем содержимое
-                        with open(tmp_path, 'r', encoding='utf-8') as f:
-                            existing_content = f.read()
-                        
-                        # Удаляем временный файл после чтения
-                        os.unlink(tmp_path)
-                        tmp_path = None
-                    except Exception as e:
-                        logger.warning(f"Не удалось прочитать существующий файл: {str(e)}")
-                        if tmp_path and os.path.exists(tmp_path):
-                            os.unlink(tmp_path)
-                            tmp_path = None
-                
-                # Создаем новый временный файл с объединенным содержимым
-                new_content = existing_content
-                if new_content and not new_content.endswith("\n"):
-                    new_content += "\n"
-                new_content += content
-                
-                tmp_path = self._create_temp_file(new_content)
-                
-                # В случае ошибки при записи, создаем новый файл с другим именем
-                if self.disk.exists(path) and retry_count > 0:
-                    # Генерируем новое имя файла с временной меткой
-                    dir_path = os.path.dirname(path)
-                    base_name = os.path.basename(path)
-                    name, ext = os.path.splitext(base_name)
-                    timestamp = int(time.time() * 1000000)
-                    new_path = f"{dir_path}/{name}_{timestamp}{ext}"
-                    logger.warning(f"Создание нового файла вместо обновления: {new_path}")
-                    path = new_path
-                
-                # Загружаем на Яндекс.Диск без перезаписи при первой попытке, с перезаписью при повторе
-                overwrite_flag = retry_count > 0
-                logger.info(f"Запись в файл {path} (перезапись: {overwrite_flag})")
-                self.disk.upload(tmp_path, path, overwrite=overwrite_flag, timeout=60.0)
-                
-                return True
-            except Exception as e:
-                retry_count += 1
-                error_msg = str(e).lower()
-                
-                if retry_count < max_retries and ("timeout" in error_msg or "connection" in error_msg or "resource already exists" in error_msg):
-                    logger.warning(f"Попытка {retry_count}/{max_retries}: Ошибка при добавлении текста в файл: {str(e)}. Повторная попытка через {retry_delay} сек.")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Увеличиваем время ожидания для следующей попытки
-                else:
-                    logger.error(f"Ошибка при добавлении текста в файл после {retry_count} попыток: {str(e)}", exc_info=True)
-                    raise
-            finally:
-                # Удаляем временный файл в блоке finally для гарантированной очистки
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+        Запись выполняется в локальную копию файла, на Яндекс.Диск
+        файл отправляется целиком после задержки MEETING_LOG_SYNC_DELAY.
+        """
+        self.meeting_logs.append(path, content)
+        return True
+    
+    def flush_text_file(self, path: str) -> bool:
+        """Немедленно синхронизирует файл встречи с Яндекс.Диском"""
+        return self.meeting_logs.flush(path)
+    
+    def close_text_file(self, path: str) -> bool:
+        """Выполняет финальную синхронизацию файла встречи и освобождает локальную копию"""
+        return self.meeting_logs.close(path)
     
     def rename_folder(self, old_path: str, new_name: str):
         """Переименовывает папку"""
@@ -370,13 +451,32 @@ class YaDiskHelper:
             return new_path
             
         try:
-            # Проверяем существование новой папки
-            if self.disk.exists(new_path):
+            # Переименовываем без перезаписи: занятое имя дает ошибку 409
+            try:
+                self.disk.move(old_path, new_path)
+            except yadisk.exceptions.PathExistsError:
                 raise ValueError(f"Папка с именем {new_name} уже существует")
-            
-            # Переименовываем
-            self.disk.move(old_path, new_path)
+            self.known_folders.discard(old_path)
+            self.known_folders.add(new_path)
             return new_path
         except Exception as e:
             logger.error(f"Ошибка при переименовании папки: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
+
+
+# Единственный экземпляр помощника на процесс
+_yadisk_helper = None
+_yadisk_helper_lock = threading.Lock()
+
+def get_yadisk_helper() -> YaDiskHelper:
+    """Возвращает общий для всего процесса экземпляр YaDiskHelper
+    
+    Все модули используют один клиент, поэтому у них общий пул соединений
+    и общий флаг офлайн-режима. Проверку соединения выполняет main().
+    """
+    global _yadisk_helper
+    if _yadisk_helper is None:
+        with _yadisk_helper_lock:
+            if _yadisk_helper is None:
+                _yadisk_helper = YaDiskHelper(skip_connection_check=True)
+    return _yadisk_helper
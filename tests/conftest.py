@@ -0,0 +1,21 @@
+"""
+Общие настройки тестов.
+Тесты запускаются из корня репозитория командой python -m pytest -q;
+сохранение состояния отключено, а данные бота пишутся во временный каталог.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STATE_PERSIST", "0")
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Каталог data/ бота создается во временной папке теста"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,164 @@
+"""Тесты альбомов: подпись и ожидание подписи выставляются до окончания загрузки"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.handlers.media_handlers import album_handler
+from src.handlers.media_handlers.common import AWAITING_TEXT, AWAITING_CAPTION
+from src.utils import state_manager as state_manager_module
+from src.utils.media_sequence import MediaSequence
+from src.utils.state_manager import SessionState, state_manager
+
+USER_ID = 777
+
+
+class FakeStatus:
+    def __init__(self):
+        self.texts = []
+
+    async def edit_text(self, text, **kwargs):
+        self.texts.append(text)
+
+
+class FakeMessage:
+    def __init__(self, caption=None, fail_reply=False):
+        self.media_group_id = "album-1"
+        self.caption = caption
+        self.effective_attachment = None
+        self.fail_reply = fail_reply
+        self.status = FakeStatus()
+
+    async def reply_text(self, text, **kwargs):
+        if self.fail_reply:
+            raise RuntimeError("Telegram недоступен")
+        self.status.texts.append(text)
+        return self.status
+
+
+class FakeScheduler:
+    """Планировщик, загрузки которого завершаются по команде теста"""
+    def __init__(self):
+        self.jobs = []
+
+    async def submit(self, job):
+        job.done = asyncio.get_running_loop().create_future()
+        self.jobs.append(job)
+        return job
+
+    def finish_all(self):
+        for job in self.jobs:
+            job.done.set_result(True)
+
+
+class FakeDisk:
+    def __init__(self):
+        self.lines = []
+
+    async def append_to_text_file(self, path, content):
+        self.lines.append(content)
+        return True
+
+
+@pytest.fixture
+def fakes(monkeypatch, tmp_path):
+    scheduler = FakeScheduler()
+    disk = FakeDisk()
+    # Маленький блок номеров, чтобы альбом резервировал новые блоки в базе
+    sequence = MediaSequence(tmp_path / "media_sequences.sqlite3", block_size=2)
+
+    async def prepare_upload_source(context, file_id, suffix):
+        # Первые файлы альбома готовятся дольше последних
+        await asyncio.sleep(0.05 / (int(file_id[len("file"):]) + 1))
+        return None, f"/tmp/{file_id}{suffix}", False
+
+    monkeypatch.setattr(album_handler, "MEDIA_GROUP_WINDOW", 0.05)
+    monkeypatch.setattr(album_handler, "prepare_upload_source", prepare_upload_source)
+    monkeypatch.setattr(album_handler, "get_upload_scheduler", lambda: scheduler)
+    monkeypatch.setattr(album_handler, "get_disk", lambda context: disk)
+    monkeypatch.setattr(state_manager_module, "get_media_sequence", lambda: sequence)
+    session = SessionState("/root", "/root/Клиент", "Клиент", USER_ID, timestamp="20250101_120000")
+    yield scheduler, disk, session
+    state_manager.remove_data(USER_ID, AWAITING_TEXT)
+    album_handler._pending_albums.clear()
+
+
+async def send_album(message, session, count=3):
+    """Присылает альбом и возвращает задачу его обработки"""
+    tasks = []
+    context = SimpleNamespace(application=SimpleNamespace(create_task=lambda coro: tasks.append(asyncio.ensure_future(coro))))
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=USER_ID), message=message)
+    for number in range(count):
+        await album_handler.collect_album_item(update, context, f"file{number}", None, "photo", session)
+    return tasks[0]
+
+
+async def wait_for(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_caption_prompt_is_set_before_uploads_finish(fakes):
+    scheduler, _, session = fakes
+
+    async def scenario():
+        message = FakeMessage()
+        task = await send_album(message, session)
+        await wait_for(lambda: len(scheduler.jobs) == 3)
+        # Загрузки еще идут, а бот уже ждет подпись и сообщил об этом
+        assert state_manager.get_data(USER_ID, AWAITING_TEXT) == AWAITING_CAPTION
+        assert "Хотите добавить подпись к альбому?" in message.status.texts[-1]
+        scheduler.finish_all()
+        await task
+        return message.status.texts[-1]
+
+    final_text = asyncio.run(scenario())
+    assert final_text.startswith("🖼 Альбом сохранен: 3 из 3 файлов.")
+
+
+def test_caption_is_written_when_album_window_closes(fakes):
+    scheduler, disk, session = fakes
+
+    async def scenario():
+        task = await send_album(FakeMessage(caption="Стенд партнера"), session)
+        await wait_for(lambda: len(scheduler.jobs) == 3)
+        assert disk.lines == ["Подпись к альбому (3 фото): Стенд партнера"]
+        assert session.file_count == 3
+        assert state_manager.get_data(USER_ID, AWAITING_TEXT) is None
+        scheduler.finish_all()
+        await task
+
+    asyncio.run(scenario())
+
+
+def test_failed_status_reply_does_not_leave_album_pending(fakes):
+    scheduler, _, session = fakes
+
+    async def scenario():
+        task = await send_album(FakeMessage(fail_reply=True), session)
+        await wait_for(lambda: len(scheduler.jobs) == 3)
+        scheduler.finish_all()
+        await task
+
+    asyncio.run(scenario())
+    assert album_handler._pending_albums == {}
+
+
+def test_file_numbers_follow_album_order(fakes):
+    scheduler, _, session = fakes
+
+    async def scenario():
+        task = await send_album(FakeMessage(), session, count=5)
+        await wait_for(lambda: len(scheduler.jobs) == 5)
+        scheduler.finish_all()
+        await task
+
+    asyncio.run(scenario())
+    # Файлы ставятся в очередь в обратном порядке, а номера идут по порядку альбома
+    assert [job.local_path for job in scheduler.jobs][0] == "/tmp/file4.jpg"
+    numbers = {job.local_path: job.remote_path[-8:-4] for job in scheduler.jobs}
+    assert [numbers[f"/tmp/file{number}.jpg"] for number in range(5)] == ["0001", "0002", "0003", "0004", "0005"]
@@ -0,0 +1,43 @@
+"""Тесты движков распознавания речи: версии для кэша расшифровок"""
+
+import logging
+import os
+
+import pytest
+
+from src.utils.asr_backends import AsrBackend, GoogleAsrBackend, VoskAsrBackend, create_asr_backend
+
+
+def make_model(path, am=b"model-v1"):
+    (path / "am").mkdir(parents=True, exist_ok=True)
+    (path / "conf").mkdir(exist_ok=True)
+    (path / "am" / "final.mdl").write_bytes(am)
+    (path / "conf" / "model.conf").write_text("--sample-frequency=16000\n")
+
+
+def test_base_backend_is_abstract():
+    with pytest.raises(TypeError):
+        AsrBackend()
+
+
+def test_vosk_version_changes_with_model(tmp_path):
+    make_model(tmp_path)
+    old_version = VoskAsrBackend(str(tmp_path)).version
+
+    # Новая модель в том же каталоге
+    make_model(tmp_path, am=b"model-v2 bigger")
+    os.utime(tmp_path / "am" / "final.mdl", ns=(1, 1))
+    new_version = VoskAsrBackend(str(tmp_path)).version
+
+    assert old_version.startswith(f"vosk:{tmp_path}:")
+    assert new_version != old_version
+
+
+def test_fallback_to_google_is_logged_and_versioned(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING):
+        backend = create_asr_backend("vosk")
+
+    assert isinstance(backend, GoogleAsrBackend)
+    assert "Используется Google Speech Recognition" in caplog.text
+    versions = {backend.version, GoogleAsrBackend().version, VoskAsrBackend(str(tmp_path)).version}
+    assert len(versions) == 3
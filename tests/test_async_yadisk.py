@@ -0,0 +1,121 @@
+"""Нагрузочный тест асинхронного фасада: медленный Яндекс.Диск не блокирует других пользователей"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.handlers.file_handler import handle_text
+from src.utils.async_yadisk import ASYNC_YADISK_KEY, AsyncYaDiskHelper
+from src.utils.state_manager import SessionState, state_manager
+
+# Длительность одного медленного вызова Яндекс.Диска (сек)
+SLOW_CALL = 1.0
+
+
+class SlowDiskHelper:
+    """Синхронный помощник Яндекс.Диска, у которого загрузка файла занимает SLOW_CALL секунд"""
+    offline_mode = False
+
+    def __init__(self):
+        self.lines = []
+
+    def upload_file(self, local_path, remote_path, *args):
+        time.sleep(SLOW_CALL)
+        return True
+
+    def get_download_link(self, path):
+        time.sleep(SLOW_CALL)
+        return "https://example.com"
+
+    def append_to_text_file(self, path, content):
+        self.lines.append(content)
+        return True
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def make_update(user_id, text):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=FakeMessage(text))
+
+
+@pytest.fixture
+def users():
+    user_ids = list(range(1000, 1050))
+    for user_id in user_ids:
+        state_manager.set_session(user_id, SessionState("/root", f"/root/{user_id}", str(user_id), user_id))
+    yield user_ids
+    for user_id in user_ids:
+        state_manager.clear_session(user_id)
+
+
+def test_slow_uploads_do_not_block_other_users(users, tmp_path):
+    helper = SlowDiskHelper()
+    disk = AsyncYaDiskHelper(helper)
+    context = SimpleNamespace(bot_data={ASYNC_YADISK_KEY: disk})
+    local_file = tmp_path / "video.mp4"
+    local_file.write_bytes(b"0" * 1024)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(loop.time())
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        started = loop.time()
+        # Пользователи загружают большие файлы, пул загрузок занят целиком
+        uploads = [
+            asyncio.create_task(disk.upload_file(str(local_file), f"/root/{user_id}/video.mp4"))
+            for user_id in users[:8]
+        ]
+        await asyncio.sleep(0.05)
+
+        async def timed_note(update):
+            note_started = loop.time()
+            await handle_text(update, context)
+            return loop.time() - note_started
+
+        # Остальные пользователи в это же время пишут заметки
+        updates = [make_update(user_id, f"заметка {user_id}") for user_id in users[8:]]
+        latencies = await asyncio.gather(*(timed_note(update) for update in updates))
+
+        await asyncio.gather(*uploads)
+        total = loop.time() - started
+        ticker_task.cancel()
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        return updates, latencies, total, max(gaps)
+
+    updates, latencies, total, max_gap = asyncio.run(scenario())
+
+    assert all(update.message.replies == ["📝 Добавлено в отчёт."] for update in updates)
+    assert len(helper.lines) == len(updates)
+    # Каждый пользователь получил ответ сразу, пока загрузки еще идут
+    assert max(latencies) < 0.1
+    # 8 загрузок в пуле из 4 потоков - две волны, цикл событий ни разу не замирал
+    assert total < 2 * SLOW_CALL + 0.5
+    assert max_gap < 0.2
+
+
+def test_slow_call_times_out_without_blocking():
+    disk = AsyncYaDiskHelper(SlowDiskHelper(), call_timeout=0.1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await disk.get_download_link("/root/file.txt")
+        return loop.time() - started
+
+    assert asyncio.run(scenario()) < SLOW_CALL / 2
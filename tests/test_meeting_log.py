@@ -0,0 +1,82 @@
+"""Тесты локальных файлов встреч: содержимое файла на Яндекс.Диске не затирается"""
+
+import threading
+import time
+
+from src.utils.meeting_log import MeetingLogManager
+
+
+class FakeHelper:
+    """Помощник Яндекс.Диска с файлами в памяти"""
+    def __init__(self, files=None, offline=False, read_delay=0.0):
+        self.files = dict(files or {})
+        self.offline_mode = offline
+        self.read_delay = read_delay
+        self.reads = 0
+
+    def read_text_file(self, path):
+        if self.offline_mode:
+            return None
+        self.reads += 1
+        time.sleep(self.read_delay)
+        return self.files.get(path, "")
+
+    def upload_file(self, local_path, remote_path, overwrite=False):
+        with open(local_path, encoding="utf-8") as f:
+            self.files[remote_path] = f.read()
+        return True
+
+
+def test_offline_append_does_not_overwrite_remote(tmp_path):
+    helper = FakeHelper({"/m/log.txt": "старая запись\n"}, offline=True)
+    logs = MeetingLogManager(helper, base_dir=tmp_path, sync_delay=60)
+
+    logs.append("/m/log.txt", "новая запись")
+    assert not logs.flush("/m/log.txt")
+    assert helper.files["/m/log.txt"] == "старая запись\n"
+    assert not (tmp_path / "m" / "log.txt").exists()
+
+    helper.offline_mode = False
+    assert logs.close("disk:/m/log.txt")
+    assert helper.files["/m/log.txt"] == "старая запись\nновая запись\n"
+
+
+def test_failed_remote_read_keeps_appends_pending(tmp_path):
+    helper = FakeHelper({"/m/log.txt": "старая запись\n"})
+
+    def failing_read(path):
+        raise ConnectionError("timeout")
+
+    helper.read_text_file = failing_read
+    logs = MeetingLogManager(helper, base_dir=tmp_path, sync_delay=60)
+    logs.append("/m/log.txt", "новая запись")
+    assert not logs.flush("/m/log.txt")
+    assert helper.files["/m/log.txt"] == "старая запись\n"
+
+
+def test_remote_read_does_not_block_other_meetings(tmp_path):
+    helper = FakeHelper(read_delay=0.5)
+    # Локальная копия второй встречи уже есть, ее скачивать не нужно
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "log.txt").write_text("b\n", encoding="utf-8")
+    logs = MeetingLogManager(helper, base_dir=tmp_path, sync_delay=60)
+    slow = threading.Thread(target=logs.append, args=("/a/log.txt", "a"))
+    slow.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    logs.append("/b/log.txt", "b")
+    assert time.monotonic() - started < 0.2
+    slow.join()
+
+
+def test_restore_syncs_pending_records(tmp_path):
+    helper = FakeHelper({"/m/log.txt": "старая запись\n"}, offline=True)
+    logs = MeetingLogManager(helper, base_dir=tmp_path, sync_delay=60)
+    logs.append("/m/log.txt", "до перезапуска")
+
+    helper.offline_mode = False
+    restarted = MeetingLogManager(helper, base_dir=tmp_path, sync_delay=60)
+    assert restarted.restore() == 1
+    assert restarted.flush("/m/log.txt")
+    assert helper.files["/m/log.txt"] == "старая запись\nдо перезапуска\n"
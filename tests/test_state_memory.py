@@ -0,0 +1,148 @@
+"""Тесты памяти состояний: 5 000 пользователей на трехдневной выставке"""
+
+import asyncio
+import random
+import time
+import tracemalloc
+
+import pytest
+
+from src.handlers import command_handler
+from src.utils import state_manager as state_manager_module
+from src.utils.state_manager import SessionState, StateManager
+
+USERS = 5_000
+DAYS = 3
+# Доля пользователей, работающих на стенде в течение дня
+ACTIVE_SHARE = 0.7
+MESSAGES_PER_DAY = 12
+HOUR = 3600
+
+
+class FakeClock:
+    """Подменяет модуль time в state_manager: время выставки идет по команде теста"""
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+
+
+class FakeDisk:
+    """Файлы встреч синхронизируются, кроме перечисленных в unsynced"""
+    def __init__(self):
+        self.closed = []
+        self.unsynced = set()
+
+    async def close_text_file(self, path):
+        if path in self.unsynced:
+            return False
+        self.closed.append(path)
+        return True
+
+
+class FakeScheduler:
+    def __init__(self, busy_users=()):
+        self.busy_users = set(busy_users)
+
+    def has_jobs(self, user_id):
+        return user_id in self.busy_users
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    clock = FakeClock()
+    manager = StateManager()
+    monkeypatch.setattr(state_manager_module, "time", clock)
+    monkeypatch.setattr(command_handler, "state_manager", manager)
+    monkeypatch.setattr(command_handler, "get_upload_scheduler", lambda: FakeScheduler())
+    return manager, clock
+
+
+def start_meeting(manager, user_id, day):
+    session = SessionState("/Выставка", f"/Выставка/Стенд {user_id % 200}", f"Стенд {user_id % 200}", user_id,
+                           timestamp=f"2025060{day + 1}_{user_id:06d}")
+    manager.set_session(user_id, session)
+    manager.set_data(user_id, "folders", [f"Клиент {number}" for number in range(30)])
+
+
+def test_three_day_show_memory_stays_bounded(manager):
+    manager, clock = manager
+    rng = random.Random(1)
+    bot, disk = FakeBot(), FakeDisk()
+    memory = []
+
+    async def night_sweep():
+        await command_handler.sweep_idle_sessions(bot, disk)
+
+    tracemalloc.start()
+    try:
+        for day in range(DAYS):
+            clock.now = day * 24 * HOUR + 9 * HOUR
+            active = rng.sample(range(1, USERS + 1), int(USERS * ACTIVE_SHARE))
+            for user_id in active:
+                if manager.get_session(user_id) is None:
+                    start_meeting(manager, user_id, day)
+            for _ in range(MESSAGES_PER_DAY):
+                clock.now += 40 * 60
+                for user_id in active:
+                    manager.get_session(user_id).add_message("Заметка о посетителе стенда " * 6, author="Менеджер")
+                    manager.set_data(user_id, "awaiting_text", "caption")
+                    manager.remove_data(user_id, "awaiting_text")
+            # Треть пользователей завершает встречу вечером сама
+            for user_id in active[::3]:
+                manager.clear_session(user_id)
+                manager.clear_data(user_id)
+
+            # Ночная проверка неактивных встреч
+            clock.now = (day + 1) * 24 * HOUR + 8 * HOUR
+            asyncio.run(night_sweep())
+            memory.append(tracemalloc.get_traced_memory()[0])
+            active_today = set(active)
+    finally:
+        tracemalloc.stop()
+
+    # В памяти только встречи, активные в последние сутки, и ни одних временных данных старше data_ttl
+    assert set(manager.sessions) <= active_today
+    assert not manager.data
+    # Первая ночь включает разовые расходы (первую проверку, рост таблиц);
+    # дальше память не растет от дня к дню, хотя встречи сменяются
+    assert memory[-1] <= memory[1] * 1.1
+    # Каждая удаленная встреча закрыта и пользователь уведомлен
+    assert len(disk.closed) == len(bot.sent) > 0
+
+
+def test_busy_or_unsynced_sessions_are_not_evicted(manager, monkeypatch):
+    manager, clock = manager
+    for user_id in (1, 2, 3):
+        start_meeting(manager, user_id, 0)
+    bot, disk = FakeBot(), FakeDisk()
+    disk.unsynced.add(manager.sessions[2].txt_file_path)
+    monkeypatch.setattr(command_handler, "get_upload_scheduler", lambda: FakeScheduler(busy_users={1}))
+
+    clock.now = manager.session_ttl + 1
+    asyncio.run(command_handler.sweep_idle_sessions(bot, disk))
+
+    assert set(manager.sessions) == {1, 2}
+    assert bot.sent == [3]
+
+
+def test_new_activity_does_not_evict_other_sessions(manager):
+    manager, clock = manager
+    start_meeting(manager, 1, 0)
+    clock.now = manager.session_ttl + 1
+    # Запись новых данных не удаляет чужую встречу: это делает только фоновая проверка
+    start_meeting(manager, 2, 0)
+    assert set(manager.sessions) == {1, 2}
+    assert manager.idle_sessions() == [1]
@@ -0,0 +1,75 @@
+"""Тесты маршрутизации текста: исправление расшифровки - только ответ на ее сообщение"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.handlers.file_handler import handle_text
+from src.handlers.media_handlers.common import (
+    AWAITING_TEXT, AWAITING_TRANSCRIPTION_EDIT, TRANSCRIPTION_MESSAGE_ID
+)
+from src.utils.async_yadisk import ASYNC_YADISK_KEY
+from src.utils.state_manager import SessionState, state_manager
+
+USER_ID = 555
+# Идентификатор сообщения бота с автоматической расшифровкой
+STATUS_MESSAGE_ID = 42
+
+
+class FakeDisk:
+    def __init__(self):
+        self.lines = []
+
+    async def append_to_text_file(self, path, content):
+        self.lines.append(content)
+        return True
+
+
+class FakeMessage:
+    def __init__(self, text, reply_to=None):
+        self.text = text
+        self.reply_to_message = SimpleNamespace(message_id=reply_to) if reply_to is not None else None
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+@pytest.fixture
+def disk():
+    state_manager.set_session(USER_ID, SessionState("/root", "/root/Клиент", "Клиент", USER_ID))
+    # Голосовое сообщение распознано, бот предложил исправить расшифровку
+    state_manager.set_data(USER_ID, AWAITING_TEXT, AWAITING_TRANSCRIPTION_EDIT)
+    state_manager.set_data(USER_ID, TRANSCRIPTION_MESSAGE_ID, STATUS_MESSAGE_ID)
+    yield FakeDisk()
+    state_manager.clear_session(USER_ID)
+    state_manager.clear_data(USER_ID)
+
+
+def send(disk, text, reply_to=None):
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=USER_ID), message=FakeMessage(text, reply_to))
+    asyncio.run(handle_text(update, SimpleNamespace(bot_data={ASYNC_YADISK_KEY: disk})))
+    return update.message.replies
+
+
+def test_plain_note_after_transcription_is_not_an_edit(disk):
+    assert send(disk, "Клиент просит прайс") == ["📝 Добавлено в отчёт."]
+    assert disk.lines == ["Клиент просит прайс"]
+    # Ожидание исправления снято: следующая заметка тоже попадает в отчёт как есть
+    assert state_manager.get_data(USER_ID, AWAITING_TEXT) is None
+    assert state_manager.get_data(USER_ID, TRANSCRIPTION_MESSAGE_ID) is None
+    send(disk, "И образцы продукции", reply_to=STATUS_MESSAGE_ID)
+    assert disk.lines[-1] == "И образцы продукции"
+
+
+def test_reply_to_transcription_updates_it(disk):
+    assert send(disk, "Клиент просит прайс на 2026 год", reply_to=STATUS_MESSAGE_ID) == ["✏️ Обновил расшифровку в отчёте."]
+    assert disk.lines == ["Исправленная расшифровка голосового сообщения: Клиент просит прайс на 2026 год"]
+    assert state_manager.get_data(USER_ID, AWAITING_TEXT) is None
+    assert state_manager.get_data(USER_ID, TRANSCRIPTION_MESSAGE_ID) is None
+
+
+def test_reply_to_another_message_is_a_note(disk):
+    send(disk, "Визитка у коллеги", reply_to=STATUS_MESSAGE_ID + 1)
+    assert disk.lines == ["Визитка у коллеги"]
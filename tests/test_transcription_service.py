@@ -0,0 +1,56 @@
+"""Тесты пула распознавания: зависшая задача не губит задачи других пользователей"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.utils.transcription_service import TranscriptionService
+
+
+def sleep_and_return(seconds, value):
+    """Задача пула: ждет и возвращает значение"""
+    time.sleep(seconds)
+    return value
+
+
+@pytest.fixture
+def service():
+    service = TranscriptionService(workers=2, max_queue=0, timeout=4.0)
+    yield service
+    service.stop()
+
+
+def test_hung_task_does_not_fail_concurrent_tasks(service):
+    async def scenario():
+        # Процессы пула запускаются и загружают движок до начала отсчета таймаутов
+        await asyncio.gather(*(service._execute(sleep_and_return, 0, None) for _ in range(2)))
+
+        hung = asyncio.ensure_future(service._execute(sleep_and_return, 60, "зависла"))
+        await asyncio.sleep(3)
+        # Задача другого пользователя выполняется в момент перезапуска пула (через 4 сек)
+        neighbour = asyncio.ensure_future(service._execute(sleep_and_return, 2, "соседняя задача"))
+        hung_result = await asyncio.gather(hung, return_exceptions=True)
+        return hung_result[0], await neighbour
+
+    hung_result, neighbour_result = asyncio.run(scenario())
+    assert isinstance(hung_result, asyncio.TimeoutError)
+    assert neighbour_result == "соседняя задача"
+
+
+def test_backend_version_does_not_wait_for_a_slot(service):
+    async def scenario():
+        service.start()
+        # Оба места заняты записями пользователей
+        busy = [asyncio.ensure_future(service._execute(sleep_and_return, 3, None)) for _ in range(2)]
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        version = await service.get_backend_version()
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*busy)
+        return version, elapsed
+
+    version, elapsed = asyncio.run(scenario())
+    assert version
+    # Версия вычислена первой задачей пула, а не после освобождения места
+    assert elapsed < 3
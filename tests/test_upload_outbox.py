@@ -0,0 +1,83 @@
+"""Тесты очереди отложенных операций Яндекс.Диска"""
+
+import socket
+
+import pytest
+
+from src.utils.upload_outbox import UploadOutbox
+from src.utils.yadisk_helper import YaDiskHelper
+
+
+class FakeDisk:
+    """Клиент Яндекс.Диска с файлами в памяти"""
+    def __init__(self):
+        self.files = {}
+        self.fail_paths = set()
+        self.request_kwargs = []
+
+    def upload(self, f, path, overwrite=False, timeout=None, **kwargs):
+        if path in self.fail_paths:
+            raise ValueError("Недопустимое имя файла")
+        self.files[path] = f.read()
+
+    def get_meta(self, path, **kwargs):
+        raise KeyError(path)
+
+    def get_disk_info(self, **kwargs):
+        self.request_kwargs.append(kwargs)
+        return {"total_space": 10, "used_space": 1}
+
+
+@pytest.fixture
+def helper(tmp_path):
+    helper = YaDiskHelper(skip_connection_check=True)
+    helper.disk = FakeDisk()
+    helper.outbox = UploadOutbox(helper, db_path=tmp_path / "outbox.sqlite3", payload_dir=tmp_path / "outbox")
+    return helper
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_direct_upload_waits_behind_pending_snapshot(helper, tmp_path):
+    # Снимок файла встречи поставлен в очередь без соединения
+    helper.set_offline_mode(True)
+    helper.upload_file(write(tmp_path, "v1.txt", "строка 1\n"), "/m/log.txt", overwrite=True)
+
+    # Соединение восстановлено раньше, чем очередь отправлена
+    helper.set_offline_mode(False)
+    helper.upload_file(write(tmp_path, "v2.txt", "строка 1\nстрока 2\n"), "/m/log.txt", overwrite=True)
+    assert "/m/log.txt" not in helper.disk.files
+    assert helper.outbox.pending_count() == 1
+
+    helper.outbox.drain()
+    assert helper.disk.files["/m/log.txt"] == "строка 1\nстрока 2\n".encode("utf-8")
+    assert helper.outbox.pending_count() == 0
+
+
+def test_failing_operation_is_parked_and_unblocks_group(helper, tmp_path):
+    helper.outbox.max_attempts = 1
+    helper.disk.fail_paths.add("/m/bad.jpg")
+    helper.set_offline_mode(True)
+    helper.upload_file(write(tmp_path, "bad.jpg", "bad"), "/m/bad.jpg")
+    helper.upload_file(write(tmp_path, "good.jpg", "good"), "/m/good.jpg")
+    helper.set_offline_mode(False)
+
+    assert helper.outbox.drain() == 1
+    assert helper.disk.files["/m/good.jpg"] == b"good"
+    assert helper.outbox.pending_count() == 0
+    conn = helper.outbox._get_connection()
+    failed = conn.execute("SELECT remote_path, attempts FROM failed_operations").fetchall()
+    assert [tuple(row) for row in failed] == [("/m/bad.jpg", 1)]
+
+
+def test_connection_probe_keeps_global_socket_timeout(helper):
+    socket.setdefaulttimeout(None)
+    helper.set_offline_mode(True)
+    assert helper.test_connection(timeout=3.0)
+    assert not helper.offline_mode
+    assert socket.getdefaulttimeout() is None
+    assert helper.disk.request_kwargs == [{"timeout": 3.0, "n_retries": 0}]
@@ -0,0 +1,143 @@
+"""Тесты планировщика загрузок: путь, под которым файл сохранен на диске"""
+
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+import yadisk
+
+from src.utils import upload_scheduler
+from src.utils.async_yadisk import AsyncYaDiskHelper
+from src.utils.content_index import ContentIndex
+from src.utils.upload_outbox import UploadOutbox
+from src.utils.upload_scheduler import UploadJob, UploadScheduler
+from src.utils.yadisk_helper import YaDiskHelper
+from tests.test_url_upload import CONTENT, FileHost
+
+TARGET = "/Встречи/Клиент/file_0001.mp4"
+
+
+class FakeDisk:
+    """Яндекс.Диск в памяти: существующий файл без overwrite дает 409"""
+    def __init__(self):
+        self.files = {}
+
+    def upload(self, source, path, overwrite=False, **kwargs):
+        if path in self.files and not overwrite:
+            raise yadisk.exceptions.PathExistsError()
+        self.files[path] = b"".join(source()) if callable(source) else source.read()
+
+    def get_meta(self, path, **kwargs):
+        content = self.files[path]
+        return SimpleNamespace(md5=hashlib.md5(content).hexdigest(), sha256=hashlib.sha256(content).hexdigest(),
+                               size=len(content))
+
+
+@pytest.fixture
+def helper(tmp_path):
+    helper = YaDiskHelper(skip_connection_check=True)
+    helper.disk = FakeDisk()
+    helper.outbox = UploadOutbox(helper, db_path=tmp_path / "outbox.sqlite3", payload_dir=tmp_path / "outbox")
+    # На диске уже лежит другой файл с тем же именем
+    helper.disk.files[TARGET] = b"old"
+    return helper
+
+
+def run_job(helper, make_job, dedup=False):
+    """Выполняет задание в планировщике и возвращает (успех, задание, путь из on_complete)"""
+    scheduler = UploadScheduler(AsyncYaDiskHelper(helper), workers=1, url_upload=False, dedup=dedup)
+    reported = []
+
+    async def on_complete(job):
+        reported.append(job.remote_path)
+
+    async def scenario():
+        job = make_job()
+        job.on_complete = on_complete
+        await scheduler.submit(job)
+        success = await asyncio.wait_for(job.done, timeout=10)
+        # После завершения задания планировщик еще добавляет файл в индекс содержимого
+        while scheduler.has_jobs(job.user_id):
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return success, job
+
+    success, job = asyncio.run(scenario())
+    return success, job, reported
+
+
+def test_renamed_local_upload_reports_actual_path(helper, tmp_path):
+    local_file = tmp_path / "video.mp4"
+    local_file.write_bytes(CONTENT)
+
+    success, job, reported = run_job(helper, lambda: UploadJob(1, str(local_file), TARGET))
+
+    assert success
+    assert job.remote_path != TARGET
+    assert helper.disk.files[job.remote_path] == CONTENT
+    assert helper.disk.files[TARGET] == b"old"
+    assert reported == [job.remote_path]
+
+
+def test_renamed_streamed_upload_reports_actual_path(helper, tmp_path):
+    host = FileHost()
+    try:
+        telegram_file = SimpleNamespace(file_path=host.url, file_size=len(CONTENT))
+        success, job, reported = run_job(
+            helper, lambda: UploadJob(1, str(tmp_path / "spool.mp4"), TARGET, telegram_file=telegram_file)
+        )
+    finally:
+        host.close()
+
+    assert success
+    assert job.remote_path != TARGET
+    assert helper.disk.files[job.remote_path] == CONTENT
+    assert reported == [job.remote_path]
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_content_index_points_at_renamed_file(helper, tmp_path, monkeypatch, streamed):
+    index = ContentIndex(tmp_path / "content_index.sqlite3")
+    monkeypatch.setattr(upload_scheduler, "get_content_index", lambda: index)
+    host = FileHost()
+    try:
+        if streamed:
+            telegram_file = SimpleNamespace(file_path=host.url, file_size=len(CONTENT))
+            make_job = lambda: UploadJob(1, str(tmp_path / "spool.mp4"), TARGET, telegram_file=telegram_file,
+                                         content_id="video-1")
+        else:
+            local_file = tmp_path / "video.mp4"
+            local_file.write_bytes(CONTENT)
+            make_job = lambda: UploadJob(1, str(local_file), TARGET, content_id="video-1")
+        success, job, _ = run_job(helper, make_job, dedup=True)
+    finally:
+        host.close()
+
+    assert success
+    assert job.remote_path != TARGET
+    # В индекс попал файл, в который легла загрузка, а не прежний файл с тем же именем
+    entry = index.find("video-1")
+    assert entry.path == job.remote_path
+    assert entry.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert index.find(sha256=hashlib.sha256(b"old").hexdigest()) is None
+
+
+def test_offline_upload_is_reported_as_queued(helper, tmp_path, monkeypatch):
+    index = ContentIndex(tmp_path / "content_index.sqlite3")
+    monkeypatch.setattr(upload_scheduler, "get_content_index", lambda: index)
+    local_file = tmp_path / "video.mp4"
+    local_file.write_bytes(CONTENT)
+    helper.set_offline_mode(True)
+
+    success, job, reported = run_job(helper, lambda: UploadJob(1, str(local_file), TARGET, content_id="video-1"),
+                                     dedup=True)
+
+    # Файл не сохранен на диске, а ждет в очереди офлайн-операций
+    assert success
+    assert job.queued
+    assert job.remote_path == TARGET
+    assert reported == [TARGET]
+    assert helper.disk.files[TARGET] == b"old"
+    assert helper.outbox.pending_count() == 1
+    assert index.find("video-1") is None
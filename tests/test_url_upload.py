@@ -0,0 +1,129 @@
+"""Тесты загрузки по ссылке: Яндекс.Диск сам скачивает файл с файлового сервера Telegram"""
+
+import asyncio
+import functools
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.async_yadisk import AsyncYaDiskHelper
+from src.utils.upload_outbox import UploadOutbox
+from src.utils.upload_scheduler import UploadJob, UploadScheduler
+from src.utils.yadisk_helper import YaDiskHelper
+
+CONTENT = b"video" * 50_000
+
+
+class FileHost:
+    """Файловый сервер Telegram на локальном порту"""
+    def __init__(self):
+        self.requests = []
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host.requests.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(CONTENT)))
+                self.end_headers()
+                self.wfile.write(CONTENT)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/file/bot-token/videos/file_1.mp4"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeYandexDisk:
+    """
+    Яндекс.Диск в памяти.
+
+    upload_url запускает операцию, которая скачивает файл по ссылке в отдельном
+    потоке; mode задает исход: success, failed или hang (операция не завершается).
+    """
+    def __init__(self, mode="success"):
+        self.mode = mode
+        self.files = {}
+        self.relayed = []
+        self.operations = {}
+
+    def upload_url(self, url, path, **kwargs):
+        link = f"https://cloud-api.yandex.net/v1/disk/operations/{len(self.operations) + 1}"
+        self.operations[link] = "in-progress"
+
+        def fetch():
+            if self.mode == "hang":
+                return
+            if self.mode == "failed":
+                self.operations[link] = "failed"
+                return
+            with urllib.request.urlopen(url) as response:
+                self.files[path] = response.read()
+            self.operations[link] = "success"
+
+        threading.Thread(target=fetch, daemon=True).start()
+        return SimpleNamespace(href=link)
+
+    def get_operation_status(self, link, **kwargs):
+        return self.operations[link]
+
+    def upload(self, get_chunks, path, overwrite=False, **kwargs):
+        # Передача через бота: данные приходят блоками из потоковой загрузки
+        self.files[path] = b"".join(get_chunks())
+        self.relayed.append(path)
+
+
+@pytest.fixture
+def file_host():
+    host = FileHost()
+    yield host
+    host.close()
+
+
+def run_upload(tmp_path, file_host, mode):
+    """Загружает файл через планировщик и возвращает (успех, задание, диск)"""
+    helper = YaDiskHelper(skip_connection_check=True)
+    helper.disk = FakeYandexDisk(mode)
+    helper.outbox = UploadOutbox(helper, db_path=tmp_path / "outbox.sqlite3", payload_dir=tmp_path / "outbox")
+    disk = AsyncYaDiskHelper(helper)
+    # Короткий таймаут операции, чтобы зависшая загрузка по ссылке быстро уступала передаче через бота
+    disk.upload_from_url = functools.partial(disk.upload_from_url, timeout=1.0, poll_interval=0.1)
+    scheduler = UploadScheduler(disk, workers=1, url_upload=True, url_upload_min_size=0, dedup=False)
+    telegram_file = SimpleNamespace(file_path=file_host.url, file_size=len(CONTENT))
+
+    async def scenario():
+        job = await scheduler.submit(UploadJob(
+            1, str(tmp_path / "spool.mp4"), "/Встречи/Клиент/file_0001.mp4", telegram_file=telegram_file
+        ))
+        success = await asyncio.wait_for(job.done, timeout=10)
+        await scheduler.stop()
+        return success, job
+
+    success, job = asyncio.run(scenario())
+    return success, job, helper.disk
+
+
+def test_url_upload_is_fetched_by_disk(tmp_path, file_host):
+    success, job, disk = run_upload(tmp_path, file_host, "success")
+    assert success
+    assert disk.files[job.remote_path] == CONTENT
+    # Байты не проходили через бот: файл с сервера Telegram скачал только диск
+    assert disk.relayed == []
+    assert len(file_host.requests) == 1
+
+
+@pytest.mark.parametrize("mode", ["failed", "hang"])
+def test_failed_url_upload_falls_back_to_relay(tmp_path, file_host, mode):
+    success, job, disk = run_upload(tmp_path, file_host, mode)
+    assert success
+    assert disk.relayed == [job.remote_path]
+    assert disk.files[job.remote_path] == CONTENT